@@ -0,0 +1,7 @@
+"""Allow `python -m src <command>`; see src/cli.py."""
+
+import sys
+
+from src.cli import main
+
+sys.exit(main())
@@ -19,37 +19,27 @@ Decision Rule:
 """
 
 import pandas as pd
-import yaml
 from pathlib import Path
 from typing import Tuple
 
-# Load config
-CONFIG_PATH = Path(__file__).parent.parent.parent / "config.yaml"
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-
-def load_config() -> dict:
-    """Load configuration from YAML."""
-    if CONFIG_PATH.exists():
-        with open(CONFIG_PATH) as f:
-            return yaml.safe_load(f)
-    # Fallback defaults
-    return {
-        "paths": {
-            "data_dir": "data",
-            "processed_dir": "data/processed",
-            "opentargets_dir": "data/opentargets",
-        }
-    }
+from src.utils.config import load_config
+from src.utils.profiling import add_profile_argument, profile_step
+from src.utils.intermediate import read_intermediate
+from src.utils.memo import memoize, enable_cache
 
 
 def load_cancer_diseases(config: dict) -> pd.DataFrame:
     """Load cancer diseases from Phase 1 output."""
-    path = Path(config["paths"]["processed_dir"]) / "cancer_diseases_mesh_crosswalk.parquet"
-    if not path.exists():
-        raise FileNotFoundError(f"Run Phase 1 first: {path}")
-    return pd.read_parquet(path)
+    return read_intermediate(config, "cancer_diseases_mesh_crosswalk", hint="Run Phase 1 first")
 
 
+@memoize(
+    inputs=lambda config: [Path(config["paths"]["opentargets_dir"]) / "association_overall_direct"],
+    ignore=("config",)
+)
 def load_associations(config: dict) -> pd.DataFrame:
     """Load gene-disease associations."""
     assoc_dir = Path(config["paths"]["opentargets_dir"]) / "association_overall_direct"
@@ -265,13 +255,15 @@ def generate_report(
     return report_text
 
 
-def main():
+def run(config: dict | None = None) -> str:
+    """Run the audit and return the report text."""
+    if config is None:
+        config = load_config()
+
     print("=" * 60)
     print("AUDIT: Investigating Missing MeSH Mappings")
     print("=" * 60)
 
-    config = load_config()
-
     # 1. Load data
     print("\n1. Loading cancer diseases...")
     diseases = load_cancer_diseases(config)
@@ -332,6 +324,23 @@ def main():
     top_missing.to_csv(top_missing_path, index=False)
     print(f"Top missing diseases saved to: {top_missing_path}")
 
+    return report
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Audit diseases missing MeSH mappings")
+    add_profile_argument(parser)
+    parser.add_argument("--cache", action="store_true", help="Reuse cached associations (paths.cache_dir)")
+    args = parser.parse_args()
+
+    config = load_config()
+    if args.cache:
+        enable_cache(config)
+    with profile_step("audit_missing_mesh", config, enabled=args.profile):
+        run(config)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+"""
+Gene-set enrichment over the MeSH hierarchy.
+
+Which cancer sites is a gene list (e.g. a patent's claimed genes) enriched
+for? The index stores, for every MeSH term and every membership threshold
+(enrichment.thresholds), the genes associated with the term as a packed
+bitset over the gene universe, plus the same bits transposed:
+
+    bits[h, t, b]       bit j of byte b: gene 8·b + j is in term t at threshold h
+    gene_bits[h, g, b]  bit j of byte b: gene g is in term 8·b + j
+
+(np.packbits, little bit order.)
+
+The universe is every Entrez gene in the final TSV. A gene is in a term at
+a threshold when its score and evidence there reach min_score and
+min_evidence. With enrichment.rollup a term also holds the genes of its
+descendants, scored as in the subtree rankings (best score, summed
+evidence).
+
+A query maps its genes to universe positions and gathers their rows of
+gene_bits. Unpacked, that is a genes × terms membership matrix, and one
+np.add.reduceat over the genes of each set yields the overlap of every set
+with every term. Thousands of sets are tested at once, in blocks of sets.
+
+Statistics per (set, term), with N universe genes, K term genes, n set
+genes in the universe and k overlapping:
+- p_value: hypergeometric upper tail P(X >= k), i.e. the one-sided
+  (enrichment) Fisher's exact test. hypergeometric_sf sums the pmf away
+  from the mode with its term ratio, for all cells at once
+- fdr: Benjamini-Hochberg over the terms tested for that set (K > 0)
+- expected (n·K/N), fold_enrichment (k/expected), odds_ratio
+
+Outputs (data/processed/enrichment<suffix>/, memory-mapped on load):
+- bits.npy, gene_bits.npy, sizes.npy: bitsets and term sizes, one slice
+  per threshold
+- mesh_ids.npy, mesh_names.npy, gene_ids.npy: ID maps
+- enrichment.json: thresholds, rollup, universe and term counts
+
+Usage:
+    python -m src enrichment                  # build the indexes
+    python -m src enrich 7157 672 675 --min-score 0.1
+    python -m src enrich --sets claims.gmt -o claims_enrichment.tsv
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import (
+    load_config, ensure_dir, get_hierarchy_prefixes, hierarchy_suffix,
+    get_association_types, association_suffix,
+)
+from src.utils.profiling import add_profile_argument, profile_step
+from src.pipeline.extract_mesh import hierarchy_output_path
+from src.pipeline.figures import load_final
+from src.pipeline.rankings import group_values, subtree_members
+from src.pipeline.aggregators import segments
+
+
+DEFAULT_THRESHOLDS = [{"min_score": 0.0, "min_evidence": 0}]
+ARRAYS = ("bits", "gene_bits", "sizes", "mesh_ids", "mesh_names", "gene_ids")
+OUTPUT_COLUMNS = [
+    "set_id", "disease_mesh_id", "mesh_name", "term_size", "set_size", "overlap",
+    "expected", "fold_enrichment", "odds_ratio", "p_value", "fdr",
+]
+
+# Query genes × terms unpacked per block (bytes)
+BLOCK_CELLS = 1 << 24
+
+# Tail sums stop once a term adds less than this fraction
+TAIL_EPSILON = 1e-17
+
+
+@dataclass
+class EnrichmentIndex:
+    """Packed gene bitsets per MeSH term and threshold (see module docstring)."""
+
+    bits: np.ndarray
+    gene_bits: np.ndarray
+    sizes: np.ndarray
+    mesh_ids: np.ndarray
+    mesh_names: np.ndarray
+    gene_ids: np.ndarray
+    thresholds: list[dict]
+    rollup: bool
+
+    def threshold(self, min_score: float | None = None, min_evidence: int | None = None) -> int:
+        """
+        Position of a precomputed threshold (None = that of the first one).
+
+        Raises:
+            ValueError: if the threshold was not precomputed
+        """
+        first = self.thresholds[0]
+        wanted = (
+            first["min_score"] if min_score is None else min_score,
+            first["min_evidence"] if min_evidence is None else min_evidence,
+        )
+        for h, t in enumerate(self.thresholds):
+            if np.isclose(t["min_score"], wanted[0]) and t["min_evidence"] == wanted[1]:
+                return h
+        available = ", ".join(f"score>={t['min_score']}/evidence>={t['min_evidence']}" for t in self.thresholds)
+        raise ValueError(
+            f"Threshold score>={wanted[0]}/evidence>={wanted[1]} not in the index "
+            f"(enrichment.thresholds: {available})"
+        )
+
+
+def get_thresholds(config: dict) -> list[dict]:
+    """enrichment.thresholds with defaults filled in."""
+    thresholds = config.get("enrichment", {}).get("thresholds") or DEFAULT_THRESHOLDS
+    return [
+        {"min_score": float(t.get("min_score", 0.0)), "min_evidence": int(t.get("min_evidence", 0))}
+        for t in thresholds
+    ]
+
+
+def term_gene_values(final: pd.DataFrame, hierarchy: pd.DataFrame | None) -> pd.DataFrame:
+    """
+    Score and evidence of every (term, gene) pair.
+
+    Args:
+        final: Final 5-column dataset
+        hierarchy: MeSH hierarchy (mesh_id, tree_number) to roll terms up
+            over their subtrees; None keeps direct associations only
+
+    Returns:
+        DataFrame with term, gene_entrez_id, score (best), evidence (summed)
+    """
+    if hierarchy is None:
+        return group_values(final, "disease_mesh_id", "gene_entrez_id") \
+            .rename(columns={"disease_mesh_id": "term"})
+    subtree = subtree_members(hierarchy).merge(final, left_on="mesh_id", right_on="disease_mesh_id")
+    return group_values(subtree, "root", "gene_entrez_id").rename(columns={"root": "term"})
+
+
+def build_index(
+    final: pd.DataFrame,
+    hierarchy: pd.DataFrame | None,
+    thresholds: list[dict],
+    rollup: bool = True
+) -> EnrichmentIndex:
+    """
+    Build bitsets for every term and threshold.
+
+    Args:
+        final: Final 5-column dataset (its genes are the universe)
+        hierarchy: MeSH hierarchy (mesh_id, tree_number, mesh_name), for the
+            roll-up and term names; None for direct associations only
+        thresholds: From get_thresholds
+        rollup: Roll terms up over their subtrees (needs hierarchy)
+    """
+    rollup = rollup and hierarchy is not None
+    gene_ids = np.unique(final["gene_entrez_id"].to_numpy(dtype=np.int64))
+    values = term_gene_values(final, hierarchy if rollup else None)
+    mesh_ids, terms = np.unique(values["term"].to_numpy(dtype=str), return_inverse=True)
+    genes = np.searchsorted(gene_ids, values["gene_entrez_id"].to_numpy(dtype=np.int64))
+
+    bits, gene_bits, sizes = [], [], []
+    score, evidence = values["score"].to_numpy(), values["evidence"].to_numpy()
+    for t in thresholds:
+        keep = (score >= t["min_score"]) & (evidence >= t["min_evidence"])
+        member = np.zeros((len(gene_ids), len(mesh_ids)), dtype=bool)
+        member[genes[keep], terms[keep]] = True
+        bits.append(np.packbits(member.T, axis=1, bitorder="little"))
+        gene_bits.append(np.packbits(member, axis=1, bitorder="little"))
+        sizes.append(member.sum(axis=0))
+
+    names = pd.Series(dtype=str)
+    if hierarchy is not None and "mesh_name" in hierarchy.columns:
+        names = hierarchy.drop_duplicates("mesh_id").set_index("mesh_id")["mesh_name"]
+    mesh_names = pd.Series(mesh_ids).map(names).fillna("").to_numpy(dtype=str)
+
+    return EnrichmentIndex(
+        bits=np.stack(bits),
+        gene_bits=np.stack(gene_bits),
+        sizes=np.stack(sizes).astype(np.int64),
+        mesh_ids=mesh_ids,
+        mesh_names=mesh_names,
+        gene_ids=gene_ids,
+        thresholds=thresholds,
+        rollup=rollup,
+    )
+
+
+def save_index(index: EnrichmentIndex, output_dir: Path) -> None:
+    """Save the index as .npy arrays plus enrichment.json."""
+    ensure_dir(output_dir)
+    for array in ARRAYS:
+        np.save(output_dir / f"{array}.npy", getattr(index, array))
+    with open(output_dir / "enrichment.json", "w") as f:
+        json.dump({
+            "thresholds": index.thresholds,
+            "rollup": index.rollup,
+            "genes": len(index.gene_ids),
+            "terms": len(index.mesh_ids),
+        }, f, indent=2)
+
+
+def load_index(output_dir: Path) -> EnrichmentIndex:
+    """Load an index, memory-mapped (a query only reads the words it tests)."""
+    meta_path = output_dir / "enrichment.json"
+    if not meta_path.exists():
+        raise FileNotFoundError(f"Run the enrichment stage first: {meta_path}")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    arrays = {a: np.load(output_dir / f"{a}.npy", mmap_mode="r") for a in ARRAYS}
+    return EnrichmentIndex(**arrays, thresholds=meta["thresholds"], rollup=meta["rollup"])
+
+
+def encode_sets(index: EnrichmentIndex, set_ids, genes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Universe positions of the query genes, grouped by set.
+
+    Args:
+        set_ids: Set ID of every (set, gene) row
+        genes: Entrez gene ID of every row
+
+    Returns:
+        (set labels in first-seen order, set number of every position,
+        positions sorted by set; genes outside the universe and repeats
+        are dropped)
+    """
+    codes, labels = pd.factorize(pd.Series(set_ids), sort=False)
+    genes = pd.to_numeric(pd.Series(genes), errors="coerce").to_numpy(dtype=np.float64)
+    known = ~np.isnan(genes)
+    codes, genes = codes[known], genes[known].astype(np.int64)
+
+    positions = np.searchsorted(index.gene_ids, genes)
+    positions = np.minimum(positions, len(index.gene_ids) - 1)
+    hit = index.gene_ids[positions] == genes
+    keys = np.sort(codes[hit].astype(np.int64) * len(index.gene_ids) + positions[hit])
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+    return np.asarray(labels), keys // len(index.gene_ids), keys % len(index.gene_ids)
+
+
+# Byte → its 8 bits as the 8 bytes of a uint64, so adding rows counts 8
+# terms per uint64 addition (each byte lane holds one term's count)
+_SPREAD = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder="little").view(np.uint64).ravel()
+
+# Genes summed per lane before a byte could overflow
+_LANE_MAX = 255
+
+
+def overlaps(gene_bits: np.ndarray, n_terms: int, positions: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Overlap of every set with every term.
+
+    Args:
+        gene_bits: One threshold's transposed bitsets (genes × term bytes)
+        n_terms: Number of terms
+        positions: Universe positions of the sets' genes, grouped by set
+        starts: Start of each (non-empty) set in positions
+
+    Returns:
+        int64 array (sets × terms)
+    """
+    # Split sets into pieces of at most _LANE_MAX genes, add per piece in
+    # byte lanes, then add the pieces of each set
+    sizes = np.diff(np.append(starts, len(positions)))
+    pieces = (sizes + _LANE_MAX - 1) // _LANE_MAX
+    first = np.cumsum(pieces) - pieces
+    piece_starts = np.repeat(starts, pieces) + _LANE_MAX * (np.arange(pieces.sum()) - np.repeat(first, pieces))
+
+    lanes = np.add.reduceat(_SPREAD[gene_bits[positions]], piece_starts, axis=0)
+    counts = lanes.view(np.uint8)[:, :n_terms]
+    if len(piece_starts) == len(starts):
+        return counts.astype(np.int64)
+    return np.add.reduceat(counts, first, axis=0, dtype=np.int64)
+
+
+def _log_factorials(n: int) -> np.ndarray:
+    """log(i!) for i = 0..n."""
+    from scipy.special import gammaln
+    return gammaln(np.arange(n + 1, dtype=np.float64) + 1)
+
+
+def _tail(x: np.ndarray, n_universe: int, K: np.ndarray, n: np.ndarray, step: int) -> np.ndarray:
+    """
+    sum(pmf(x), pmf(x + step), ...) / pmf(x) per cell, walking away from
+    the mode so the terms only shrink. Each term is the previous one times
+    the pmf ratio; a cell stops once its terms no longer change the sum.
+    """
+    x, K, n = x.astype(np.float64), K.astype(np.float64), n.astype(np.float64)
+    out = np.empty(len(x))
+    cells = np.arange(len(x))
+    total, term = np.ones(len(x)), np.ones(len(x))
+    while len(cells):
+        if step > 0:
+            term *= (K - x) * (n - x) / ((x + 1) * (n_universe - K - n + x + 1))
+        else:
+            term *= x * (n_universe - K - n + x) / ((K - x + 1) * (n - x + 1))
+        total += term
+        x += step
+        done = term < total * TAIL_EPSILON
+        out[cells[done]] = total[done]
+        keep = ~done
+        cells, x, K, n, term, total = cells[keep], x[keep], K[keep], n[keep], term[keep], total[keep]
+    return out
+
+
+def hypergeometric_sf(k, n_universe: int, K, n, max_p: float = 1.0) -> np.ndarray:
+    """
+    P(X >= k) for X ~ Hypergeometric(n_universe, K, n), elementwise.
+
+    Upper tails (k above the mode) are summed upwards from pmf(k); lower
+    ones are 1 minus the sum from pmf(k - 1) downwards. pmf is taken in log
+    space from a log-factorial table, so small p-values do not underflow
+    until 1e-308.
+
+    Args:
+        max_p: Cells with pmf(k) > max_p (so p > max_p) are not summed and
+            left at 1
+    """
+    k, K, n = (np.asarray(a, dtype=np.int64) for a in np.broadcast_arrays(k, K, n))
+    shape = k.shape
+    k, K, n = k.ravel(), K.ravel(), n.ravel()
+    p = np.ones(len(k))
+    log_factorial = _log_factorials(n_universe)
+
+    def log_pmf(x, K, n):
+        return (
+            log_factorial[K] - log_factorial[x] - log_factorial[K - x]
+            + log_factorial[n_universe - K] - log_factorial[n - x] - log_factorial[n_universe - K - n + x]
+            - log_factorial[n_universe] + log_factorial[n] + log_factorial[n_universe - n]
+        )
+
+    tested = np.flatnonzero(k > np.maximum(0, n + K - n_universe))
+    log_first = log_pmf(k[tested], K[tested], n[tested])
+    keep = log_first <= np.log(max_p) if max_p < 1.0 else np.ones(len(tested), dtype=bool)
+    tested, log_first = tested[keep], log_first[keep]
+    k, K, n = k[tested], K[tested], n[tested]
+
+    upper = k > (n + 1) * (K + 1) // (n_universe + 2)  # above the mode
+    p_tested = np.empty(len(tested))
+    p_tested[upper] = np.exp(log_first[upper] + np.log(_tail(k[upper], n_universe, K[upper], n[upper], 1)))
+    lower = ~upper
+    x = k[lower] - 1
+    below = np.exp(log_pmf(x, K[lower], n[lower]) + np.log(_tail(x, n_universe, K[lower], n[lower], -1)))
+    p_tested[lower] = 1.0 - below
+    p[tested] = p_tested
+    return np.clip(p, 0.0, 1.0).reshape(shape)
+
+
+def benjamini_hochberg(rows: np.ndarray, p: np.ndarray, m: int) -> np.ndarray:
+    """
+    Benjamini-Hochberg q-values, each row (set) adjusted over m tests.
+
+    Only cells whose p-value may give q <= some cut-off need to be passed:
+    every cell of a row with a smaller p-value must be included, and cells
+    left out only had p-values above the cut-off. The q-values at or below
+    the cut-off are then exact.
+
+    Args:
+        rows: Row (set) of every cell
+        p: p-value of every cell
+        m: Tests per row
+
+    Returns:
+        q-values aligned with p
+    """
+    order = np.lexsort((p, rows))
+    _, rank = segments(rows[order])
+    q = np.minimum(p[order] * m / (rank + 1), 1.0)
+    # Step-up: running minimum from each row's largest p-value down
+    q = pd.Series(q[::-1]).groupby(rows[order][::-1]).cummin().to_numpy()[::-1]
+    result = np.empty(len(p))
+    result[order] = q
+    return result
+
+
+def enrich_sets(
+    index: EnrichmentIndex,
+    set_ids,
+    genes,
+    threshold: int = 0,
+    max_fdr: float | None = None
+) -> pd.DataFrame:
+    """
+    Test many gene sets against every term.
+
+    Args:
+        index: EnrichmentIndex
+        set_ids, genes: One row per (set, Entrez gene)
+        threshold: Position in index.thresholds (EnrichmentIndex.threshold)
+        max_fdr: Only report rows with fdr <= max_fdr (None = every term
+            with an overlap)
+
+    Returns:
+        DataFrame with OUTPUT_COLUMNS, by set (input order) then p_value
+    """
+    labels, set_codes, positions = encode_sets(index, set_ids, genes)
+    tested = np.flatnonzero(np.asarray(index.sizes[threshold]) > 0)
+    gene_bits = np.asarray(index.gene_bits[threshold])
+    term_sizes = np.asarray(index.sizes[threshold])[tested]
+    n_universe = len(index.gene_ids)
+
+    set_sizes = np.bincount(set_codes, minlength=len(labels))
+    set_starts = np.concatenate(([0], np.cumsum(set_sizes)))
+    nonempty = np.flatnonzero(set_sizes)
+
+    # Blocks of sets whose genes × terms fit BLOCK_CELLS
+    per_block = max(BLOCK_CELLS // max(len(index.mesh_ids), 1), 1)
+    block_ends = np.searchsorted(set_starts[nonempty + 1], set_starts[nonempty] + per_block, side="right")
+
+    frames = []
+    start = 0
+    while start < len(nonempty):
+        stop = max(int(block_ends[start]), start + 1)
+        sets = nonempty[start:stop]
+        lo, hi = set_starts[sets[0]], set_starts[sets[-1] + 1]
+        k = overlaps(gene_bits, len(index.mesh_ids), positions[lo:hi], set_starts[sets] - lo)[:, tested]
+        n = set_sizes[sets]
+
+        # Only overlapping cells can be reported; p is 1 elsewhere
+        rows, cols = np.nonzero(k)
+        p = hypergeometric_sf(k[rows, cols], n_universe, term_sizes[cols], n[rows], 1.0 if max_fdr is None else max_fdr)
+        if max_fdr is not None:
+            candidate = p <= max_fdr
+            rows, cols, p = rows[candidate], cols[candidate], p[candidate]
+        q = benjamini_hochberg(rows, p, len(tested))
+        if max_fdr is not None:
+            significant = q <= max_fdr
+            rows, cols, p, q = rows[significant], cols[significant], p[significant], q[significant]
+        k_kept, K, n_kept = k[rows, cols], term_sizes[cols], n[rows]
+        expected = n_kept * K / n_universe
+        with np.errstate(divide="ignore", invalid="ignore"):
+            odds = (k_kept * (n_universe - K - n_kept + k_kept)) / ((n_kept - k_kept) * (K - k_kept))
+        frames.append(pd.DataFrame({
+            "set_id": labels[sets[rows]],
+            "disease_mesh_id": index.mesh_ids[tested[cols]],
+            "mesh_name": index.mesh_names[tested[cols]],
+            "term_size": K,
+            "set_size": n_kept,
+            "overlap": k_kept,
+            "expected": expected,
+            "fold_enrichment": k_kept / expected,
+            "odds_ratio": odds,
+            "p_value": p,
+            "fdr": q,
+            "_set": sets[rows],
+        }))
+        start = stop
+
+    if not frames:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+    result = pd.concat(frames, ignore_index=True)
+    return result.sort_values(["_set", "p_value"], kind="stable").drop(columns="_set").reset_index(drop=True)
+
+
+def enrich(
+    index: EnrichmentIndex,
+    genes,
+    threshold: int = 0,
+    max_fdr: float | None = None
+) -> pd.DataFrame:
+    """
+    Test one gene list against every term.
+
+    Returns:
+        enrich_sets columns (without set_id) plus overlap_genes, the
+        query's Entrez IDs in each term
+    """
+    genes = pd.to_numeric(pd.Series(list(genes)), errors="coerce").dropna().astype(np.int64).to_numpy()
+    result = enrich_sets(index, np.zeros(len(genes), dtype=np.int64), genes, threshold, max_fdr)
+    result = result.drop(columns="set_id")
+
+    _, _, positions = encode_sets(index, np.zeros(len(genes), dtype=np.int64), genes)
+    rows = np.searchsorted(index.mesh_ids, result["disease_mesh_id"].to_numpy(dtype=str))
+    members = np.unpackbits(np.asarray(index.bits[threshold])[rows], axis=1, count=len(index.gene_ids), bitorder="little")
+    hits = members[:, positions].astype(bool)
+    result["overlap_genes"] = [",".join(map(str, index.gene_ids[positions[h]])) for h in hits]
+    return result
+
+
+def read_gene_sets(path: Path, set_column: str = "set_id", gene_column: str = "gene_entrez_id") -> tuple[np.ndarray, np.ndarray]:
+    """
+    Read gene sets from a GMT file (name, description, genes...) or a CSV,
+    TSV or Parquet table with one (set, gene) pair per row.
+
+    Returns:
+        (set_ids, genes), one entry per pair
+    """
+    if path.suffix == ".gmt":
+        set_ids, genes = [], []
+        with open(path) as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) > 2:
+                    set_ids.extend([fields[0]] * (len(fields) - 2))
+                    genes.extend(fields[2:])
+        return np.array(set_ids, dtype=object), np.array(genes, dtype=object)
+
+    if path.suffix == ".parquet":
+        table = pd.read_parquet(path, columns=[set_column, gene_column])
+    else:
+        sep = "\t" if path.suffix in (".tsv", ".txt") or path.name.endswith(".tsv.gz") else ","
+        table = pd.read_csv(path, sep=sep, usecols=[set_column, gene_column], dtype=str)
+    return table[set_column].to_numpy(), table[gene_column].to_numpy()
+
+
+def enrichment_dir(config: dict, suffix: str = "") -> Path:
+    """Index directory for an output suffix (association type + hierarchy)."""
+    return Path(config["paths"]["processed_dir"]) / f"enrichment{suffix}"
+
+
+def run(config: dict | None = None, verbose: bool = True) -> dict[str, EnrichmentIndex]:
+    """
+    Build enrichment indexes for every final TSV (hierarchy × association type).
+
+    Args:
+        config: Configuration dict (loads from file if None)
+        verbose: Print progress messages
+
+    Returns:
+        Dict of output suffix -> EnrichmentIndex
+    """
+    if config is None:
+        config = load_config()
+
+    thresholds = get_thresholds(config)
+    rollup = config.get("enrichment", {}).get("rollup", True)
+    mesh_dir = Path(config["paths"]["mesh_dir"])
+    prefixes = get_hierarchy_prefixes(config)
+
+    if verbose:
+        print(f"Enrichment: gene bitsets per MeSH term at {len(thresholds)} threshold(s)"
+              f"{', rolled up over subtrees' if rollup else ''}")
+        print("-" * 40)
+
+    outputs = {}
+    for prefix in prefixes:
+        hierarchy_path = hierarchy_output_path(mesh_dir, prefix)
+        hierarchy = pd.read_csv(hierarchy_path) if hierarchy_path.exists() else None
+        if rollup and hierarchy is None and verbose:
+            print(f"  {hierarchy_path.name} not found, indexing direct associations only (run the mesh step)")
+
+        for assoc_type in get_association_types(config):
+            suffix = association_suffix(assoc_type) + hierarchy_suffix(prefixes, prefix)
+            final = load_final(config, suffix)
+            index = build_index(final, hierarchy, thresholds, rollup)
+            output_dir = enrichment_dir(config, suffix)
+            save_index(index, output_dir)
+
+            if verbose:
+                print(f"  {prefix} {assoc_type}: {len(index.mesh_ids):,} terms × {len(index.gene_ids):,} genes, "
+                      f"{index.bits.nbytes / 1e6:,.1f} MB of bitsets")
+                print(f"  Saved: {output_dir}")
+            outputs[suffix] = index
+
+    return outputs
+
+
+def query(
+    config: dict,
+    genes: list | None = None,
+    sets_path: Path | None = None,
+    output_path: Path | None = None,
+    min_score: float | None = None,
+    min_evidence: int | None = None,
+    max_fdr: float | None = None,
+    prefix: str | None = None,
+    assoc_type: str | None = None,
+    top: int = 20,
+    verbose: bool = True
+) -> pd.DataFrame:
+    """
+    Enrichment of one gene list (printed) or of a file of gene sets (written).
+
+    Args:
+        config: Configuration dict
+        genes: Entrez gene IDs of a single query
+        sets_path: Gene sets file (see read_gene_sets)
+        output_path: Results TSV for sets_path (default:
+            <processed_dir>/enrichment_<file stem>.tsv)
+        min_score, min_evidence: Membership threshold (must be precomputed;
+            default: the first of enrichment.thresholds)
+        max_fdr: Reported FDR cut-off (default: enrichment.max_fdr)
+        prefix: Hierarchy (default: the primary one)
+        assoc_type: Association type (default: the first configured one)
+        top: Rows printed for a single query
+        verbose: Print progress messages
+
+    Returns:
+        The results DataFrame
+    """
+    import time
+
+    enrichment_config = config.get("enrichment", {})
+    prefixes = get_hierarchy_prefixes(config)
+    prefix = prefix or prefixes[0]
+    if prefix not in prefixes:
+        raise ValueError(f"Hierarchy {prefix} is not configured (mesh.hierarchies: {', '.join(prefixes)})")
+    assoc_type = assoc_type or get_association_types(config)[0]
+    max_fdr = enrichment_config.get("max_fdr", 0.05) if max_fdr is None else max_fdr
+
+    index = load_index(enrichment_dir(config, association_suffix(assoc_type) + hierarchy_suffix(prefixes, prefix)))
+    threshold = index.threshold(min_score, min_evidence)
+    chosen = index.thresholds[threshold]
+    label = f"score>={chosen['min_score']}, evidence>={chosen['min_evidence']}"
+
+    if sets_path is None:
+        result = enrich(index, genes, threshold, max_fdr)
+        if verbose:
+            print(f"{len(genes)} genes vs {prefix} {assoc_type} terms ({label}, FDR <= {max_fdr})")
+            print("-" * 40)
+            print(result.head(top).to_string(index=False) if len(result) else "  No enriched terms")
+        return result
+
+    set_ids, set_genes = read_gene_sets(
+        Path(sets_path),
+        enrichment_config.get("set_column", "set_id"),
+        enrichment_config.get("gene_column", "gene_entrez_id"),
+    )
+    start = time.perf_counter()
+    result = enrich_sets(index, set_ids, set_genes, threshold, max_fdr)
+    elapsed = time.perf_counter() - start
+    output_path = output_path or Path(config["paths"]["processed_dir"]) / f"enrichment_{Path(sets_path).stem}.tsv"
+    result.to_csv(output_path, sep="\t", index=False)
+
+    if verbose:
+        n_sets = pd.Series(set_ids).nunique()
+        print(f"Enrichment: {n_sets:,} gene sets vs {prefix} {assoc_type} terms ({label}, FDR <= {max_fdr})")
+        print("-" * 40)
+        print(f"  {len(result):,} enriched (set, term) pairs in {elapsed:.2f}s "
+              f"({n_sets / max(elapsed, 1e-9):,.0f} sets/s)")
+        print(f"  Saved: {output_path}")
+    return result
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Gene-set enrichment over MeSH terms")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Build the indexes from the final TSVs")
+    add_profile_argument(build)
+
+    test = sub.add_parser("query", help="Test a gene list or a file of gene sets")
+    test.add_argument("genes", nargs="*", help="Entrez gene IDs")
+    test.add_argument("--sets", type=Path, default=None, help="Gene sets (GMT, or CSV/TSV/Parquet set/gene pairs)")
+    test.add_argument("-o", "--output", type=Path, default=None, help="Results TSV for --sets")
+    test.add_argument("--min-score", type=float, default=None)
+    test.add_argument("--min-evidence", type=int, default=None)
+    test.add_argument("--max-fdr", type=float, default=None)
+    test.add_argument("--hierarchy", default=None, help="Hierarchy prefix (default: the primary one)")
+    test.add_argument("--association-type", choices=["direct", "indirect"], default=None)
+
+    args = parser.parse_args()
+    config = load_config()
+
+    if args.command == "build":
+        with profile_step("enrichment", config, enabled=args.profile):
+            run(config, verbose=True)
+        return
+
+    if not args.genes and args.sets is None:
+        parser.error("give Entrez gene IDs or --sets")
+    query(
+        config, args.genes, args.sets, args.output, args.min_score, args.min_evidence,
+        args.max_fdr, args.hierarchy, args.association_type
+    )
+
+
+if __name__ == "__main__":
+    main()
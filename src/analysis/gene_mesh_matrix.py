@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Sparse gene × MeSH matrices and site-similarity queries.
+
+Exports the final gene-MeSH table as sparse matrices (rows = MeSH terms,
+columns = Entrez genes) for score and evidence, with the row and column ID
+maps alongside. Similarity between MeSH terms or between genes is computed
+with sparse matrix products, so the all-diseases × all-genes comparison
+never materializes a dense pivot.
+
+Outputs (data/processed/matrices/):
+- score_csr.npz, score_csc.npz: ot_score, MeSH × gene
+- evidence_csr.npz, evidence_csc.npz: evidence_count, MeSH × gene
+- mesh_ids.csv: row index → disease_mesh_id, mesh_level
+- gene_ids.csv: column index → gene_entrez_id
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import load_config, ensure_dir
+from src.pipeline.rankings import group_values
+
+
+METRICS = ("cosine", "jaccard")
+VALUES = ("score", "evidence")
+
+
+@dataclass
+class GeneMeshMatrix:
+    """Score and evidence matrices (MeSH × gene) with their ID maps."""
+
+    score: sp.csr_matrix
+    evidence: sp.csr_matrix
+    mesh_ids: np.ndarray
+    gene_ids: np.ndarray
+    mesh_levels: np.ndarray
+
+    def values(self, value: str = "score") -> sp.csr_matrix:
+        """Get the score or evidence matrix."""
+        if value not in VALUES:
+            raise ValueError(f"Unknown value: {value!r} (expected one of {', '.join(VALUES)})")
+        return self.score if value == "score" else self.evidence
+
+    def mesh_index(self, mesh_id: str) -> int:
+        """Row index of a MeSH ID."""
+        idx = np.searchsorted(self.mesh_ids, mesh_id)
+        if idx >= len(self.mesh_ids) or self.mesh_ids[idx] != mesh_id:
+            raise KeyError(f"MeSH ID not in matrix: {mesh_id}")
+        return int(idx)
+
+    def gene_index(self, gene_id: int) -> int:
+        """Column index of an Entrez gene ID."""
+        idx = np.searchsorted(self.gene_ids, gene_id)
+        if idx >= len(self.gene_ids) or self.gene_ids[idx] != gene_id:
+            raise KeyError(f"Gene ID not in matrix: {gene_id}")
+        return int(idx)
+
+
+def build_matrices(final: pd.DataFrame) -> GeneMeshMatrix:
+    """
+    Build sparse matrices from the final 5-column dataset.
+
+    Args:
+        final: DataFrame with disease_mesh_id, gene_entrez_id, mesh_level,
+            ot_score, evidence_count. Repeated gene-mesh pairs (one Ensembl
+            gene mapped to several Entrez IDs) become one entry with the best
+            score and the total evidence, as in the rankings.
+
+    Returns:
+        GeneMeshMatrix with sorted MeSH and gene ID maps
+
+    Raises:
+        ValueError: if a score lies outside [0, 1]
+    """
+    # csr_matrix adds duplicate coordinates, so collapse the pairs first
+    pairs = group_values(final, "disease_mesh_id", "gene_entrez_id")
+    scores = pairs["score"].to_numpy(dtype=np.float64)
+    if len(scores) and (scores.min() < 0 or scores.max() > 1):
+        raise ValueError(f"ot_score outside [0, 1]: {scores.min()}..{scores.max()}")
+
+    mesh_ids, rows = np.unique(pairs["disease_mesh_id"].to_numpy(dtype=str), return_inverse=True)
+    gene_ids, cols = np.unique(pairs["gene_entrez_id"].to_numpy(dtype=np.int64), return_inverse=True)
+    shape = (len(mesh_ids), len(gene_ids))
+
+    def to_csr(values: np.ndarray) -> sp.csr_matrix:
+        return sp.csr_matrix((values, (rows, cols)), shape=shape)
+
+    levels = final.drop_duplicates("disease_mesh_id").set_index("disease_mesh_id")["mesh_level"]
+    mesh_levels = levels.reindex(mesh_ids).to_numpy(dtype=np.int64)
+
+    return GeneMeshMatrix(
+        score=to_csr(scores),
+        evidence=to_csr(pairs["evidence"].to_numpy(dtype=np.float64)),
+        mesh_ids=mesh_ids,
+        gene_ids=gene_ids,
+        mesh_levels=mesh_levels,
+    )
+
+
+def save_matrices(matrix: GeneMeshMatrix, output_dir: Path) -> None:
+    """Write CSR/CSC matrices and ID maps to output_dir."""
+    ensure_dir(output_dir)
+    for value in VALUES:
+        m = matrix.values(value)
+        sp.save_npz(output_dir / f"{value}_csr.npz", m.tocsr())
+        sp.save_npz(output_dir / f"{value}_csc.npz", m.tocsc())
+
+    pd.DataFrame({
+        "disease_mesh_id": matrix.mesh_ids,
+        "mesh_level": matrix.mesh_levels,
+    }).to_csv(output_dir / "mesh_ids.csv", index_label="row")
+    pd.DataFrame({
+        "gene_entrez_id": matrix.gene_ids,
+    }).to_csv(output_dir / "gene_ids.csv", index_label="col")
+
+
+def load_matrices(input_dir: Path) -> GeneMeshMatrix:
+    """Load matrices written by save_matrices."""
+    if not (input_dir / "score_csr.npz").exists():
+        raise FileNotFoundError(f"Matrices not found: {input_dir}. Run: python -m src.analysis.gene_mesh_matrix export")
+
+    mesh_map = pd.read_csv(input_dir / "mesh_ids.csv", dtype={"disease_mesh_id": str})
+    gene_map = pd.read_csv(input_dir / "gene_ids.csv")
+
+    return GeneMeshMatrix(
+        score=sp.load_npz(input_dir / "score_csr.npz").tocsr(),
+        evidence=sp.load_npz(input_dir / "evidence_csr.npz").tocsr(),
+        mesh_ids=mesh_map["disease_mesh_id"].to_numpy(dtype=str),
+        gene_ids=gene_map["gene_entrez_id"].to_numpy(dtype=np.int64),
+        mesh_levels=mesh_map["mesh_level"].to_numpy(dtype=np.int64),
+    )
+
+
+def _prepare(m: sp.csr_matrix, metric: str) -> tuple[sp.csr_matrix, np.ndarray | None]:
+    """
+    Prepare a row-major matrix for similarity products.
+
+    cosine: rows scaled to unit L2 norm (dot product = cosine similarity)
+    jaccard: binarized (every stored gene-mesh pair counts, even with score 0),
+        plus row nonzero counts for the union term
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric!r} (expected one of {', '.join(METRICS)})")
+
+    if metric == "cosine":
+        norms = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sp.diags(1.0 / norms) @ m, None
+
+    binary = m.copy().tocsr()
+    binary.data = np.ones_like(binary.data)
+    return binary, np.diff(binary.indptr).astype(np.float64)
+
+
+def _block_similarity(
+    x: sp.csr_matrix,
+    sizes: np.ndarray | None,
+    rows: np.ndarray
+) -> np.ndarray:
+    """Dense similarity block between the given rows and all rows of x."""
+    block = (x[rows] @ x.T).toarray()
+    if sizes is not None:
+        union = sizes[rows][:, None] + sizes[None, :] - block
+        np.divide(block, union, out=block, where=union > 0)
+    return block
+
+
+def top_k_neighbours(
+    m: sp.csr_matrix,
+    ids: np.ndarray,
+    k: int = 10,
+    metric: str = "cosine",
+    queries: np.ndarray | None = None,
+    block_size: int = 1024
+) -> pd.DataFrame:
+    """
+    Top-k most similar rows for each query row.
+
+    Similarities are computed block by block (block_size query rows at a
+    time) and reduced with a partial sort, so memory stays at
+    block_size × n_rows regardless of matrix size.
+
+    Args:
+        m: Row-major sparse matrix (rows are the entities compared)
+        ids: Row ID map
+        k: Neighbours per query
+        metric: cosine or jaccard
+        queries: Row indices to query (default: all rows)
+        block_size: Query rows per block
+
+    Returns:
+        DataFrame with query, neighbour, similarity, rank (1 = most similar)
+    """
+    x, sizes = _prepare(m, metric)
+    n = x.shape[0]
+    queries = np.arange(n) if queries is None else np.asarray(queries)
+    k = min(k, n - 1)
+
+    out_query, out_neighbour, out_sim, out_rank = [], [], [], []
+    if k <= 0:
+        queries = queries[:0]
+
+    for start in range(0, len(queries), block_size):
+        rows = queries[start:start + block_size]
+        sims = _block_similarity(x, sizes, rows)
+        sims[np.arange(len(rows)), rows] = -np.inf  # Exclude self
+
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_sims = np.take_along_axis(top_sims, order, axis=1)
+
+        out_query.append(np.repeat(rows, k))
+        out_neighbour.append(top.ravel())
+        out_sim.append(top_sims.ravel())
+        out_rank.append(np.tile(np.arange(1, k + 1), len(rows)))
+
+    if not out_query:
+        return pd.DataFrame(columns=["query", "neighbour", "similarity", "rank"])
+
+    return pd.DataFrame({
+        "query": ids[np.concatenate(out_query)],
+        "neighbour": ids[np.concatenate(out_neighbour)],
+        "similarity": np.concatenate(out_sim),
+        "rank": np.concatenate(out_rank),
+    })
+
+
+def similar_mesh(
+    matrix: GeneMeshMatrix,
+    mesh_id: str,
+    k: int = 10,
+    metric: str = "cosine",
+    value: str = "score"
+) -> pd.DataFrame:
+    """Top-k MeSH terms whose gene profiles are most similar to mesh_id."""
+    rows = np.array([matrix.mesh_index(mesh_id)])
+    return top_k_neighbours(matrix.values(value), matrix.mesh_ids, k, metric, queries=rows)
+
+
+def similar_genes(
+    matrix: GeneMeshMatrix,
+    gene_id: int,
+    k: int = 10,
+    metric: str = "cosine",
+    value: str = "score"
+) -> pd.DataFrame:
+    """Top-k genes whose MeSH profiles are most similar to gene_id."""
+    rows = np.array([matrix.gene_index(gene_id)])
+    genes = matrix.values(value).T.tocsr()
+    return top_k_neighbours(genes, matrix.gene_ids, k, metric, queries=rows)
+
+
+def mesh_similarity_matrix(
+    matrix: GeneMeshMatrix,
+    metric: str = "cosine",
+    value: str = "score"
+) -> pd.DataFrame:
+    """
+    Full MeSH × MeSH similarity matrix.
+
+    Only the MeSH axis is small enough to return densely (hundreds of
+    terms); use top_k_neighbours for genes.
+    """
+    x, sizes = _prepare(matrix.values(value), metric)
+    sims = _block_similarity(x, sizes, np.arange(x.shape[0]))
+    return pd.DataFrame(sims, index=matrix.mesh_ids, columns=matrix.mesh_ids)
+
+
+def run(config: dict | None = None, suffix: str = "", verbose: bool = True) -> GeneMeshMatrix:
+    """
+    Export sparse matrices for a final TSV.
+
+    Args:
+        config: Configuration dict (loads from file if None)
+        suffix: Hierarchy suffix of the final TSV (e.g. "_c04_557")
+        verbose: Print progress messages
+
+    Returns:
+        GeneMeshMatrix
+    """
+    if config is None:
+        config = load_config()
+
+    processed_dir = Path(config["paths"]["processed_dir"])
+    input_path = processed_dir / f"gene_disease_mesh_final{suffix}.tsv"
+    if not input_path.exists():
+        raise FileNotFoundError(f"Run Step 3 first: {input_path}")
+
+    if verbose:
+        print("Exporting sparse gene × MeSH matrices")
+        print("-" * 40)
+        print("  Loading final dataset...")
+    final = pd.read_csv(input_path, sep="\t", dtype={"disease_mesh_id": str})
+
+    matrix = build_matrices(final)
+    output_dir = processed_dir / f"matrices{suffix}"
+    save_matrices(matrix, output_dir)
+
+    if verbose:
+        print(f"    {len(matrix.mesh_ids):,} MeSH terms × {len(matrix.gene_ids):,} genes")
+        print(f"    {matrix.score.nnz:,} nonzeros ({matrix.score.nnz / max(np.prod(matrix.score.shape), 1) * 100:.2f}% dense)")
+        print(f"  Saved: {output_dir}")
+
+    return matrix
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Sparse gene × MeSH matrices and similarity queries")
+    parser.add_argument("--suffix", default="", help="Hierarchy output suffix (e.g. _c04_557)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("export", help="Export matrices from the final TSV")
+
+    similar = sub.add_parser("similar", help="Top-k similar MeSH terms or genes")
+    target = similar.add_mutually_exclusive_group(required=True)
+    target.add_argument("--mesh", help="Query MeSH ID (e.g. D001943)")
+    target.add_argument("--gene", type=int, help="Query Entrez gene ID (e.g. 7157)")
+    similar.add_argument("--k", type=int, default=10)
+    similar.add_argument("--metric", choices=METRICS, default="cosine")
+    similar.add_argument("--value", choices=VALUES, default="score")
+
+    args = parser.parse_args()
+    config = load_config()
+
+    if args.command == "export":
+        run(config, suffix=args.suffix, verbose=True)
+        return
+
+    matrix = load_matrices(Path(config["paths"]["processed_dir"]) / f"matrices{args.suffix}")
+    if args.mesh:
+        result = similar_mesh(matrix, args.mesh, args.k, args.metric, args.value)
+    else:
+        result = similar_genes(matrix, args.gene, args.k, args.metric, args.value)
+    print(result.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
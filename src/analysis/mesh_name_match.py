@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Suggest MeSH descriptors for diseases without a MeSH xref, by name.
+
+Most OT cancer diseases have no MeSH xref (see docs/AUDIT_FINDINGS.md), but
+their names are often close to a MeSH heading or entry term ("breast
+carcinoma, hormone-sensitive" vs "Breast Neoplasms" / "Breast Cancer").
+
+Names and terms are normalized to token sets (lowercase, punctuation
+stripped, plurals folded, cancer/tumor/neoplasm treated as one word) and
+weighted by IDF over the MeSH terms. An inverted index (a sparse term ×
+token matrix) retrieves candidates: only terms sharing at least one
+informative token with a name are ever scored, via one sparse product,
+so there is no all-pairs comparison. Tokens in more than
+name_match.max_postings terms (e.g. "neoplasm") still count toward the
+score but are not used for retrieval; names made only of such tokens
+("Carcinoma") are still found through a hash join on their token set.
+
+Confidence is the cosine similarity of the IDF-weighted token sets:
+1.0 when a name and a term have the same tokens in any order
+("Neoplasms, Breast" = "breast cancer").
+
+Output (data/processed/mesh_name_suggestions.tsv):
+diseaseId, diseaseName, rank, mesh_id, mesh_name, matched_term, term_kind,
+confidence
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import load_config
+from src.utils.profiling import add_profile_argument, profile_step
+from src.utils.intermediate import read_intermediate
+from src.utils.catalog import preflight
+from src.pipeline.extract_mesh import download_mesh, scan_mesh_terms, scan_mesh_hierarchies
+
+
+STOPWORDS = {"of", "the", "and", "or", "with", "in", "by", "to", "for", "a", "an", "nos"}
+# Words treated as one token; the generic neoplasm words are interchangeable
+# in OT names ("cancer", "tumor") and MeSH headings ("Neoplasms")
+SYNONYMS = {
+    "cancer": "neoplasm", "tumor": "neoplasm", "tumour": "neoplasm", "neoplasia": "neoplasm",
+    "malignancy": "neoplasm", "carcinomata": "carcinoma",
+}
+
+
+def signatures(rows: np.ndarray, hashes: np.ndarray, n_rows: int) -> np.ndarray:
+    """
+    Order-independent hash of each row's token set (sum of per-token hashes).
+
+    Args:
+        rows: Row of each token, non-decreasing (as tokenize returns them)
+        hashes: uint64 hash of each token
+        n_rows: Number of rows
+
+    Returns:
+        uint64 per row (0 for rows without tokens)
+    """
+    out = np.zeros(n_rows, dtype="uint64")
+    if len(rows):
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        out[rows[starts]] = np.add.reduceat(hashes, starts)
+    return out
+
+
+def tokenize(names: pd.Series) -> pd.DataFrame:
+    """
+    Normalized tokens of each name.
+
+    Returns:
+        DataFrame with row (position in names) and token, one row per distinct token
+    """
+    words = (
+        pd.Series(names, dtype="string").reset_index(drop=True).fillna("").str.lower()
+        .str.replace(r"[^a-z0-9]+", " ", regex=True).str.split()
+    )
+    tokens = words.explode().dropna()
+    tokens = tokens[~tokens.isin(STOPWORDS)]
+    # Plurals: "neoplasms" → "neoplasm", "tumours" → "tumour" (not "-ss", "-us", "-is")
+    tokens = tokens.where(
+        ~(tokens.str.len().gt(3) & tokens.str.endswith("s") & ~tokens.str[-2:].isin(["ss", "us", "is"])),
+        tokens.str[:-1],
+    )
+    tokens = tokens.replace(SYNONYMS)
+    return pd.DataFrame({"row": tokens.index.to_numpy(), "token": tokens.to_numpy()}) \
+        .drop_duplicates().reset_index(drop=True)
+
+
+@dataclass
+class TermIndex:
+    """MeSH terms with their IDF-weighted token vectors (rows unit-normalized)."""
+
+    terms: pd.DataFrame
+    vocabulary: pd.Index
+    idf: np.ndarray
+    vectors: sp.csr_matrix
+    postings: sp.csr_matrix
+    token_hashes: np.ndarray
+    signatures: np.ndarray
+
+    @classmethod
+    def from_terms(cls, terms: pd.DataFrame, max_postings: int = 1000) -> "TermIndex":
+        """
+        Build the index from scan_mesh_terms output.
+
+        Args:
+            terms: mesh_id, mesh_name, term, kind
+            max_postings: Tokens in more terms than this are not used for retrieval
+        """
+        terms = terms.reset_index(drop=True)
+        tokens = tokenize(terms["term"])
+        codes, vocabulary = pd.factorize(tokens["token"])
+        df = np.bincount(codes, minlength=len(vocabulary))
+        idf = np.log((1 + len(terms)) / (1 + df)) + 1
+
+        vectors = _weighted(tokens["row"].to_numpy(), codes, idf, (len(terms), len(vocabulary)))
+        # Inverted index: binary term × token matrix over the selective tokens
+        retrieval = df[codes] <= max_postings
+        postings = sp.csr_matrix(
+            (np.ones(retrieval.sum(), dtype="float32"), (tokens["row"].to_numpy()[retrieval], codes[retrieval])),
+            shape=(len(terms), len(vocabulary)),
+        )
+        token_hashes = np.random.default_rng(0).integers(1, 2**63, len(vocabulary), dtype="uint64")
+        return cls(
+            terms=terms, vocabulary=pd.Index(vocabulary), idf=idf, vectors=vectors, postings=postings,
+            token_hashes=token_hashes,
+            signatures=signatures(tokens["row"].to_numpy(), token_hashes[codes], len(terms)),
+        )
+
+    def vectorize(self, names: pd.Series, tokens: pd.DataFrame | None = None) -> sp.csr_matrix:
+        """IDF-weighted, unit-normalized token vectors of names (unknown tokens dropped)."""
+        if tokens is None:
+            tokens = tokenize(names)
+        codes = self.vocabulary.get_indexer(tokens["token"])
+        known = codes >= 0
+        # Unknown tokens still lengthen the name, so a name with extra words
+        # scores below an exact match: give them the maximum IDF
+        norms = np.zeros(len(names))
+        np.add.at(norms, tokens["row"].to_numpy(), np.where(known, self.idf[np.maximum(codes, 0)], self.idf.max()) ** 2)
+        vectors = _weighted(
+            tokens["row"].to_numpy()[known], codes[known], self.idf, (len(names), len(self.vocabulary)),
+            norms=np.sqrt(norms),
+        )
+        return vectors
+
+    def match(self, names: pd.Series, min_confidence: float = 0.5) -> pd.DataFrame:
+        """
+        Score every (name, term) pair that shares an indexed token.
+
+        Returns:
+            DataFrame with row (position in names), term_row (row in terms), confidence
+        """
+        tokens = tokenize(names)
+        queries = self.vectorize(names, tokens)
+
+        # Candidate pairs: names × terms sharing a selective token, plus
+        # exact token-set matches
+        candidates = ((queries > 0).astype("float32") @ self.postings.T).tocoo()
+        # (a name with a token unknown to the index has no exact match)
+        codes = self.vocabulary.get_indexer(tokens["token"])
+        name_signatures = signatures(
+            tokens["row"].to_numpy(), self.token_hashes[np.maximum(codes, 0)], len(names)
+        )
+        unknown = np.unique(tokens["row"].to_numpy()[codes < 0])
+        name_signatures[unknown] = 0
+        exact = pd.DataFrame({"row": np.arange(len(names)), "signature": name_signatures}) \
+            .query("signature != 0") \
+            .merge(pd.DataFrame({"term_row": np.arange(len(self.terms)), "signature": self.signatures}), on="signature")
+        pairs = np.unique(np.concatenate([
+            candidates.row.astype("int64") * len(self.terms) + candidates.col,
+            exact["row"].to_numpy(dtype="int64") * len(self.terms) + exact["term_row"].to_numpy(),
+        ]))
+        rows, term_rows = pairs // len(self.terms), pairs % len(self.terms)
+
+        # Exact cosine for the candidates only
+        confidence = np.asarray(queries[rows].multiply(self.vectors[term_rows]).sum(axis=1)).ravel()
+        keep = confidence >= min_confidence
+        return pd.DataFrame({
+            "row": rows[keep], "term_row": term_rows[keep], "confidence": np.round(confidence[keep], 4)
+        })
+
+
+def _weighted(rows, codes, idf, shape, norms=None) -> sp.csr_matrix:
+    """Row-normalized IDF matrix from (row, token code) pairs."""
+    weights = idf[codes]
+    if norms is None:
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=shape[0]))
+    weights = weights / np.where(norms[rows] > 0, norms[rows], 1)
+    return sp.csr_matrix((weights, (rows, codes)), shape=shape)
+
+
+def suggest(
+    diseases: pd.DataFrame,
+    index: TermIndex,
+    k: int = 5,
+    min_confidence: float = 0.5
+) -> pd.DataFrame:
+    """
+    Ranked MeSH suggestions for each disease name.
+
+    Args:
+        diseases: diseaseId, diseaseName
+        index: TermIndex over the MeSH terms
+        k: Suggestions per disease (best term per descriptor)
+        min_confidence: Minimum cosine similarity
+
+    Returns:
+        DataFrame with diseaseId, diseaseName, rank, mesh_id, mesh_name,
+        matched_term, term_kind, confidence
+    """
+    diseases = diseases.reset_index(drop=True)
+    matches = index.match(diseases["diseaseName"], min_confidence)
+    terms = index.terms.iloc[matches["term_row"].to_numpy()].reset_index(drop=True)
+    matches = pd.concat([matches.reset_index(drop=True), terms], axis=1)
+
+    # Best term per (disease, descriptor); headings win ties over entry terms
+    matches = matches.sort_values(
+        ["row", "confidence", "kind", "mesh_id"], ascending=[True, False, False, True]
+    ).drop_duplicates(["row", "mesh_id"])
+    matches = matches.groupby("row").head(k)
+    matches["rank"] = matches.groupby("row").cumcount() + 1
+
+    matches = matches.merge(diseases[["diseaseId", "diseaseName"]], left_on="row", right_index=True)
+    return matches.rename(columns={"term": "matched_term", "kind": "term_kind"})[[
+        "diseaseId", "diseaseName", "rank", "mesh_id", "mesh_name", "matched_term", "term_kind", "confidence"
+    ]].reset_index(drop=True)
+
+
+def load_unmapped_diseases(config: dict, all_diseases: bool = False) -> pd.DataFrame:
+    """
+    Diseases without a MeSH xref.
+
+    Args:
+        config: Configuration dict
+        all_diseases: Use the full OT disease index instead of the Step 1
+            cancer diseases
+    """
+    if all_diseases:
+        from src.pipeline.extract_diseases import load_diseases, extract_mesh_ids
+        diseases = extract_mesh_ids(load_diseases(config))
+    else:
+        diseases = read_intermediate(config, "cancer_diseases_mesh_crosswalk", hint="Run Step 1 first")
+    return diseases[diseases["meshIds"].isna()][["diseaseId", "diseaseName"]]
+
+
+def run(config: dict | None = None, all_diseases: bool = False, verbose: bool = True) -> pd.DataFrame:
+    """
+    Suggest MeSH descriptors for unmapped diseases.
+
+    Args:
+        config: Configuration dict (loads from file if None)
+        all_diseases: Match every unmapped OT disease, not only cancers
+        verbose: Print progress messages
+
+    Returns:
+        Suggestions DataFrame (see suggest)
+    """
+    if config is None:
+        config = load_config()
+
+    match_config = config.get("name_match", {})
+    prefix = match_config.get("prefix")
+
+    if verbose:
+        print("MeSH name matcher: headings and entry terms → unmapped diseases")
+        print("-" * 40)
+
+    preflight(config, ["mesh"], verbose)
+    mesh_path = download_mesh(config)
+    terms = scan_mesh_terms(mesh_path)
+    if prefix:
+        in_branch = scan_mesh_hierarchies(mesh_path, [prefix])[prefix]["mesh_id"]
+        terms = terms[terms["mesh_id"].isin(set(in_branch))]
+    index = TermIndex.from_terms(terms, match_config.get("max_postings", 1000))
+    if verbose:
+        print(f"  {terms['mesh_id'].nunique():,} descriptors, {len(terms):,} terms, "
+              f"{len(index.vocabulary):,} tokens" + (f" (under {prefix})" if prefix else ""))
+
+    diseases = load_unmapped_diseases(config, all_diseases)
+    suggestions = suggest(
+        diseases, index,
+        k=match_config.get("k", 5),
+        min_confidence=match_config.get("min_confidence", 0.5),
+    )
+
+    output_path = Path(config["paths"]["processed_dir"]) / "mesh_name_suggestions.tsv"
+    suggestions.to_csv(output_path, sep="\t", index=False)
+    if verbose:
+        matched = suggestions["diseaseId"].nunique()
+        exact = suggestions.loc[suggestions["rank"] == 1, "confidence"].eq(1).sum()
+        print(f"  {len(diseases):,} unmapped diseases, {matched:,} with suggestions ({exact:,} exact)")
+        print(f"  Saved: {output_path}")
+
+    return suggestions
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Suggest MeSH descriptors for unmapped diseases by name")
+    parser.add_argument("--all-diseases", action="store_true", help="Every unmapped OT disease, not only cancers")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    config = load_config()
+    with profile_step("name_match", config, enabled=args.profile):
+        run(config, all_diseases=args.all_diseases, verbose=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Batch matcher: patent gene/MeSH annotations → gene-MeSH pairs.
+
+Reads a patent annotation file (CSV, TSV or Parquet with a patent ID, an
+Entrez gene ID and a MeSH descriptor ID per row) in chunks and joins each
+chunk against the final gene-MeSH dataset. Each (MeSH, gene) pair is packed
+into one int64 key (MeSH number << 32 | Entrez ID), so the join is a
+hash-table lookup on integers instead of a string merge.
+
+Optionally the patent's MeSH term is expanded along the hierarchy before
+matching:
+- up:   also match the term's ancestors (a patent on lung adenocarcinoma
+        matches Lung Neoplasms pairs)
+- down: also match its descendants (a patent on Lung Neoplasms matches
+        every lung subsite)
+- both: up and down
+
+Chunks are matched across a process pool; at most two chunks per worker
+are in flight and matches are written in input order as they complete, so
+memory stays bounded by the chunk size, not the file size.
+
+Output columns: patent_id, gene_entrez_id, query_mesh_id, disease_mesh_id,
+relation (exact/ancestor/descendant), mesh_level, ot_score, evidence_count
+
+Usage:
+    python -m src match patents.tsv -o patent_matches.tsv --expand down
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import (
+    load_config, get_hierarchy_prefixes, hierarchy_suffix, association_suffix, get_association_types,
+)
+from src.pipeline.extract_mesh import hierarchy_output_path
+from src.pipeline.figures import load_final
+from src.pipeline.rankings import group_values, subtree_members
+
+
+EXPANSIONS = ("none", "up", "down", "both")
+RELATIONS = np.array(["exact", "ancestor", "descendant"])
+OUTPUT_COLUMNS = [
+    "patent_id", "gene_entrez_id", "query_mesh_id", "disease_mesh_id",
+    "relation", "mesh_level", "ot_score", "evidence_count",
+]
+
+
+def parse_mesh_ids(ids) -> np.ndarray:
+    """
+    Integer part of MeSH descriptor IDs ("D001943" → 1943).
+
+    Returns:
+        int64 array; -1 where the ID is missing or not a descriptor ID
+    """
+    s = pd.Series(ids, dtype="string")
+    numeric = s.str.extract(r"^D(\d+)$", expand=False)
+    return pd.to_numeric(numeric, errors="coerce").fillna(-1).to_numpy(dtype="int64")
+
+
+def pair_keys(mesh_numbers: np.ndarray, genes: np.ndarray) -> np.ndarray:
+    """Pack (MeSH number, Entrez ID) into one int64 key."""
+    return (mesh_numbers.astype("int64") << 32) | genes.astype("int64")
+
+
+@dataclass
+class PairIndex:
+    """The final gene-MeSH pairs keyed by packed integer keys."""
+
+    keys: pd.Index
+    mesh_id: np.ndarray
+    mesh_level: np.ndarray
+    ot_score: np.ndarray
+    evidence_count: np.ndarray
+
+    @classmethod
+    def from_final(cls, final: pd.DataFrame) -> "PairIndex":
+        """Build from the final dataset (duplicate pairs: best score, total evidence)."""
+        pairs = group_values(final, "disease_mesh_id", "gene_entrez_id")
+        levels = final.drop_duplicates("disease_mesh_id").set_index("disease_mesh_id")["mesh_level"]
+        keys = pair_keys(parse_mesh_ids(pairs["disease_mesh_id"]), pairs["gene_entrez_id"].to_numpy())
+        return cls(
+            keys=pd.Index(keys),
+            mesh_id=pairs["disease_mesh_id"].to_numpy(),
+            mesh_level=pairs["disease_mesh_id"].map(levels).to_numpy(),
+            ot_score=pairs["score"].to_numpy(),
+            evidence_count=pairs["evidence"].to_numpy(),
+        )
+
+
+def build_expansion(hierarchy: pd.DataFrame | None, expand: str) -> pd.DataFrame:
+    """
+    Query MeSH number → matched MeSH number, with the relation code.
+
+    Terms outside the hierarchy only match themselves, so "exact" rows are
+    not listed here; match_chunk adds them for every annotation.
+
+    Returns:
+        DataFrame with query, target, relation (index into RELATIONS)
+    """
+    if expand not in EXPANSIONS:
+        raise ValueError(f"Unknown expansion: {expand!r} (expected one of {', '.join(EXPANSIONS)})")
+    empty = pd.DataFrame({"query": [], "target": [], "relation": []}, dtype="int64")
+    if expand == "none" or hierarchy is None:
+        return empty
+
+    members = subtree_members(hierarchy)
+    members = members[members["root"] != members["mesh_id"]]
+    roots, descendants = parse_mesh_ids(members["root"]), parse_mesh_ids(members["mesh_id"])
+
+    frames = []
+    if expand in ("up", "both"):
+        frames.append(pd.DataFrame({"query": descendants, "target": roots, "relation": 1}))
+    if expand in ("down", "both"):
+        frames.append(pd.DataFrame({"query": roots, "target": descendants, "relation": 2}))
+    return pd.concat(frames).drop_duplicates(["query", "target"]).astype("int64")
+
+
+def match_chunk(chunk: pd.DataFrame, index: PairIndex, expansion: pd.DataFrame) -> pd.DataFrame:
+    """
+    Match one chunk of annotations (patent_id, gene_entrez_id, mesh_id).
+
+    Returns:
+        Matches with OUTPUT_COLUMNS
+    """
+    genes = pd.to_numeric(chunk["gene_entrez_id"], errors="coerce")
+    mesh = parse_mesh_ids(chunk["mesh_id"])
+    valid = np.flatnonzero(genes.notna().to_numpy() & (mesh >= 0))
+    genes = genes.to_numpy()[valid].astype("int64")
+    mesh = mesh[valid]
+
+    # Row positions into the chunk, with the MeSH number to look up
+    rows, targets, relations = valid, mesh, np.zeros(len(valid), dtype="int64")
+    if len(expansion):
+        expanded = pd.DataFrame({"row": np.arange(len(valid)), "query": mesh}).merge(expansion, on="query")
+        expanded_rows = expanded["row"].to_numpy()
+        rows = np.concatenate([rows, valid[expanded_rows]])
+        genes = np.concatenate([genes, genes[expanded_rows]])
+        targets = np.concatenate([targets, expanded["target"].to_numpy()])
+        relations = np.concatenate([relations, expanded["relation"].to_numpy()])
+
+    pos = index.keys.get_indexer(pair_keys(targets, genes))
+    # Matches in annotation order, exact match first
+    hit = np.flatnonzero(pos >= 0)
+    hit = hit[np.argsort(rows[hit], kind="stable")]
+    rows, genes, relations, pos = rows[hit], genes[hit], relations[hit], pos[hit]
+
+    return pd.DataFrame({
+        "patent_id": chunk["patent_id"].to_numpy()[rows],
+        "gene_entrez_id": genes,
+        "query_mesh_id": chunk["mesh_id"].to_numpy()[rows],
+        "disease_mesh_id": index.mesh_id[pos],
+        "relation": RELATIONS[relations],
+        "mesh_level": index.mesh_level[pos],
+        "ot_score": index.ot_score[pos],
+        "evidence_count": index.evidence_count[pos],
+    }, columns=OUTPUT_COLUMNS)
+
+
+def iter_annotations(path: Path, columns: dict[str, str], chunk_size: int):
+    """
+    Read an annotation file in chunks, renamed to patent_id, gene_entrez_id, mesh_id.
+
+    Args:
+        path: CSV, TSV or Parquet file
+        columns: Standard name -> column name in the file
+        chunk_size: Rows per chunk
+    """
+    rename = {source: name for name, source in columns.items()}
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=list(rename)):
+            yield batch.to_pandas().rename(columns=rename)
+        return
+
+    sep = "\t" if path.suffix in (".tsv", ".txt") or path.name.endswith(".tsv.gz") else ","
+    reader = pd.read_csv(path, sep=sep, usecols=list(rename), dtype=str, chunksize=chunk_size)
+    for chunk in reader:
+        yield chunk.rename(columns=rename)
+
+
+# Set once per pool worker, so the index is not pickled with every chunk
+_worker_state = {}
+
+
+def _init_worker(index: PairIndex, expansion: pd.DataFrame) -> None:
+    _worker_state["index"] = index
+    _worker_state["expansion"] = expansion
+
+
+def _match_in_worker(chunk: pd.DataFrame) -> pd.DataFrame:
+    return match_chunk(chunk, _worker_state["index"], _worker_state["expansion"])
+
+
+def match_file(
+    chunks,
+    index: PairIndex,
+    expansion: pd.DataFrame,
+    workers: int = 1
+):
+    """
+    Match annotation chunks, yielding each chunk's matches in input order.
+
+    Args:
+        chunks: Iterable of annotation DataFrames (see iter_annotations)
+        index: PairIndex of the final dataset
+        expansion: From build_expansion
+        workers: Process pool size (1 matches in-process)
+    """
+    if workers == 1:
+        for chunk in chunks:
+            yield match_chunk(chunk, index, expansion)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index, expansion)) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(_match_in_worker, chunk))
+            # Bounded read-ahead: wait on the oldest chunk before reading more
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def run(
+    config: dict | None = None,
+    input_path: Path | None = None,
+    output_path: Path | None = None,
+    expand: str | None = None,
+    prefix: str | None = None,
+    assoc_type: str | None = None,
+    workers: int | None = None,
+    verbose: bool = True
+) -> dict:
+    """
+    Match a patent annotation file against the final gene-MeSH dataset.
+
+    Args:
+        config: Configuration dict (loads from file if None)
+        input_path: Annotation file (CSV, TSV or Parquet)
+        output_path: Matches TSV (default: <processed_dir>/patent_matches.tsv)
+        expand: Hierarchy expansion (default: patents.expand)
+        prefix: Hierarchy to match against (default: the primary one)
+        assoc_type: Association type (default: the first configured one)
+        workers: Process pool size (default: patents.workers or CPU count)
+        verbose: Print progress messages
+
+    Returns:
+        Dict with annotations, matches and the output path
+    """
+    if config is None:
+        config = load_config()
+
+    patent_config = config.get("patents", {})
+    prefixes = get_hierarchy_prefixes(config)
+    prefix = prefix or prefixes[0]
+    if prefix not in prefixes:
+        raise ValueError(f"Hierarchy {prefix} is not configured (mesh.hierarchies: {', '.join(prefixes)})")
+    assoc_type = assoc_type or get_association_types(config)[0]
+    expand = expand or patent_config.get("expand", "none")
+    workers = workers or patent_config.get("workers") or os.cpu_count() or 1
+    output_path = output_path or Path(config["paths"]["processed_dir"]) / "patent_matches.tsv"
+    columns = {
+        "patent_id": patent_config.get("patent_column", "patent_id"),
+        "gene_entrez_id": patent_config.get("gene_column", "gene_entrez_id"),
+        "mesh_id": patent_config.get("mesh_column", "mesh_id"),
+    }
+
+    if verbose:
+        print(f"Patent matcher: {input_path} → {prefix} {assoc_type} gene-MeSH pairs (expand: {expand})")
+        print("-" * 40)
+
+    final = load_final(config, association_suffix(assoc_type) + hierarchy_suffix(prefixes, prefix))
+    index = PairIndex.from_final(final)
+    hierarchy_path = hierarchy_output_path(Path(config["paths"]["mesh_dir"]), prefix)
+    if expand != "none" and not hierarchy_path.exists():
+        raise FileNotFoundError(f"Expansion needs the hierarchy CSV (run the mesh step): {hierarchy_path}")
+    expansion = build_expansion(pd.read_csv(hierarchy_path) if expand != "none" else None, expand)
+    if verbose:
+        print(f"  {len(index.keys):,} gene-MeSH pairs, {len(expansion):,} expansion edges")
+
+    chunks = iter_annotations(Path(input_path), columns, patent_config.get("chunk_size", 1_000_000))
+    counted = {"annotations": 0}
+
+    def counting(chunks):
+        for chunk in chunks:
+            counted["annotations"] += len(chunk)
+            yield chunk
+
+    n_matches = 0
+    header = True
+    with open(output_path, "w") as f:
+        for matches in match_file(counting(chunks), index, expansion, workers):
+            matches.to_csv(f, sep="\t", index=False, header=header)
+            header = False
+            n_matches += len(matches)
+        if header:
+            pd.DataFrame(columns=OUTPUT_COLUMNS).to_csv(f, sep="\t", index=False)
+
+    if verbose:
+        print(f"  {counted['annotations']:,} annotations → {n_matches:,} matches")
+        print(f"  Saved: {output_path}")
+
+    return {"annotations": counted["annotations"], "matches": n_matches, "output": output_path}
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Match patent gene/MeSH annotations against the gene-MeSH dataset")
+    parser.add_argument("input", type=Path, help="Annotation file (CSV, TSV or Parquet)")
+    parser.add_argument("-o", "--output", type=Path, default=None, help="Matches TSV")
+    parser.add_argument("--expand", choices=EXPANSIONS, default=None, help="Expand MeSH matches along the hierarchy")
+    parser.add_argument("--hierarchy", default=None, help="Hierarchy prefix (default: the primary one)")
+    parser.add_argument("--association-type", choices=["direct", "indirect"], default=None)
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size")
+    args = parser.parse_args()
+
+    config = load_config()
+    run(
+        config, args.input, args.output, expand=args.expand, prefix=args.hierarchy,
+        assoc_type=args.association_type, workers=args.workers
+    )
+
+
+if __name__ == "__main__":
+    main()
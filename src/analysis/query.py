@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+SQL over the pipeline outputs with an embedded DuckDB engine (optional).
+
+Every output is registered as a view that scans the file in place, so
+nothing is loaded up front and each query only reads the columns it uses:
+
+- final, final_<hierarchy>: gene_disease_mesh_final*.tsv
+- datatypes, datatypes_<hierarchy>: gene_disease_mesh_datatypes*.tsv
+- crosswalks/*.csv: disease_mesh_crosswalk*, ensembl_entrez
+- intermediate/*: cancer_diseases_mesh_crosswalk, gene_mesh_pre_entrez*
+  (Arrow IPC intermediates are memory-mapped and scanned as Arrow tables)
+- MeSH hierarchies: mesh_c04_588_site, mesh_c04_complete, ...
+- summaries/*.csv and cubes/*.parquet (cube_<name>), when present
+
+Requires duckdb (pip install duckdb); nothing else in the pipeline does.
+
+Usage:
+    python -m src query "SELECT mesh_level, count(*) FROM final GROUP BY 1"
+    python -m src query --views
+    python -m src query -f question.sql --format csv -o answer.csv
+
+Python:
+    from src.analysis.query import query
+    df = query('''
+        -- genes with score > 0.5 in every lung subsite
+        WITH lung AS (
+            SELECT DISTINCT mesh_id FROM mesh_c04_588_site
+            WHERE tree_number LIKE 'C04.588.894.797.520.%'
+        )
+        SELECT gene_entrez_id FROM final JOIN lung ON disease_mesh_id = mesh_id
+        WHERE ot_score > 0.5
+        GROUP BY gene_entrez_id
+        HAVING count(DISTINCT disease_mesh_id) = (SELECT count(*) FROM lung)
+    ''')
+"""
+
+import re
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import load_config
+
+
+def _import_duckdb():
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError(
+            "The query layer needs duckdb: pip install duckdb"
+        ) from e
+    return duckdb
+
+
+def _view_name(stem: str) -> str:
+    """SQL-safe view name from a file stem."""
+    return re.sub(r"\W", "_", stem).lower()
+
+
+def _quote(path: Path) -> str:
+    return "'" + str(path).replace("'", "''") + "'"
+
+
+def discover_views(config: dict) -> dict[str, Path]:
+    """
+    Map view names to the output files they scan (existing files only).
+
+    Returns:
+        Dict of view name -> path
+    """
+    processed_dir = Path(config["paths"]["processed_dir"])
+    mesh_dir = Path(config["paths"]["mesh_dir"])
+
+    views = {}
+    for path in sorted(processed_dir.glob("gene_disease_mesh_final*.tsv")):
+        views["final" + path.stem[len("gene_disease_mesh_final"):]] = path
+    for path in sorted(processed_dir.glob("gene_disease_mesh_datatypes*.tsv")):
+        views["datatypes" + path.stem[len("gene_disease_mesh_datatypes"):]] = path
+    for path in sorted((processed_dir / "crosswalks").glob("*.csv")):
+        views[_view_name(path.stem)] = path
+    intermediate_dir = processed_dir / "intermediate"
+    # Parquet first, so an Arrow file of the same name (the configured
+    # format if both exist) is the one registered
+    for pattern in ("*.parquet", "*.arrow"):
+        for path in sorted(intermediate_dir.glob(pattern)):
+            views[_view_name(path.stem)] = path
+    for path in sorted(mesh_dir.glob("mesh_*.csv")):
+        views[_view_name(path.stem)] = path
+    for path in sorted((processed_dir / "summaries").glob("*.csv")):
+        views[_view_name(path.stem)] = path
+    for path in sorted((processed_dir / "cubes").glob("*.parquet")):
+        views["cube_" + _view_name(path.stem)] = path
+    return views
+
+
+def connect(config: dict | None = None, database: str = ":memory:"):
+    """
+    Open a DuckDB connection with every pipeline output registered as a view.
+
+    Args:
+        config: Configuration dict (loads from file if None)
+        database: DuckDB database (default: in-memory)
+
+    Returns:
+        duckdb.DuckDBPyConnection
+    """
+    duckdb = _import_duckdb()
+    if config is None:
+        config = load_config()
+
+    con = duckdb.connect(database)
+    for name, path in discover_views(config).items():
+        if path.suffix == ".arrow":
+            import pyarrow.feather as feather
+            # Memory-mapped; DuckDB scans the Arrow buffers without copying
+            con.register(name, feather.read_table(path, memory_map=True))
+        elif path.suffix == ".parquet":
+            con.execute(f"CREATE VIEW {name} AS SELECT * FROM read_parquet({_quote(path)})")
+        else:
+            delim = "\\t" if path.suffix == ".tsv" else ","
+            con.execute(
+                f"CREATE VIEW {name} AS SELECT * FROM "
+                f"read_csv({_quote(path)}, delim='{delim}', header=true)"
+            )
+    return con
+
+
+def query(sql: str, config: dict | None = None, con=None):
+    """
+    Run a SQL query against the pipeline outputs.
+
+    Args:
+        sql: Query text
+        config: Configuration dict (used when con is None)
+        con: Existing connection from connect() (reuse it for many queries)
+
+    Returns:
+        pandas DataFrame
+    """
+    if con is None:
+        con = connect(config)
+    return con.execute(sql).df()
+
+
+def run(
+    config: dict | None = None,
+    sql: str | None = None,
+    output: Path | None = None,
+    fmt: str = "table",
+    list_views: bool = False
+):
+    """
+    Run a query and print or save the result; with list_views, show the views.
+
+    Returns:
+        Result DataFrame (None when listing views)
+    """
+    if config is None:
+        config = load_config()
+
+    if list_views:
+        for name, path in discover_views(config).items():
+            print(f"  {name:<36} {path}")
+        return None
+
+    result = query(sql, config)
+
+    if output is not None:
+        sep = "\t" if fmt == "tsv" else ","
+        result.to_csv(output, sep=sep, index=False)
+        print(f"  Saved: {output} ({len(result):,} rows)")
+    elif fmt == "table":
+        import pandas as pd
+        with pd.option_context("display.max_rows", 100, "display.width", 200):
+            print(result.to_string(index=False, max_rows=100))
+        print(f"({len(result):,} rows)")
+    else:
+        result.to_csv(sys.stdout, sep="\t" if fmt == "tsv" else ",", index=False)
+
+    return result
+
+
+def add_query_arguments(parser) -> None:
+    """Arguments shared by `python -m src query` and this module's CLI."""
+    parser.add_argument("sql", nargs="?", help="SQL query (or use -f)")
+    parser.add_argument("-f", "--file", type=Path, help="Read the query from a file")
+    parser.add_argument("-o", "--output", type=Path, help="Write the result to a file")
+    parser.add_argument("--format", choices=["table", "csv", "tsv"], default="table", help="Output format")
+    parser.add_argument("--views", action="store_true", help="List the registered views and exit")
+
+
+def query_from_args(args, config: dict):
+    """Run a query from parsed arguments (see add_query_arguments)."""
+    if args.views:
+        return run(config, list_views=True)
+    sql = args.file.read_text() if args.file else args.sql
+    if not sql:
+        raise ValueError("No query given (pass SQL or -f FILE)")
+    fmt = args.format
+    if args.output is not None and fmt == "table":
+        fmt = "tsv" if args.output.suffix == ".tsv" else "csv"
+    return run(config, sql=sql, output=args.output, fmt=fmt)
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="SQL over the pipeline outputs (DuckDB)")
+    add_query_arguments(parser)
+    args = parser.parse_args()
+
+    config = load_config()
+    query_from_args(args, config)
+
+
+if __name__ == "__main__":
+    main()
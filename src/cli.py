@@ -0,0 +1,219 @@
+"""
+Unified command-line entry point: python -m src <command> [options].
+
+Only the standard library is imported at startup. Config (yaml) is loaded
+when a command needs it, and a step's module (pandas, pyarrow, ...) only
+when that step actually runs, so --help, --dry-run and `status` return
+almost immediately.
+
+Examples:
+    python -m src run                         # Steps 1-3
+    python -m src run --steps crosswalk,entrez
+    python -m src run --parallel              # Steps 1-3 as a task graph
+    python -m src --dry-run run --steps diseases,crosswalk,entrez,figures
+    python -m src status
+    python -m src catalog                     # input catalog for fast preflight checks
+    python -m src query "SELECT count(*) FROM final"
+    python -m src match patents.tsv --expand down  # patent annotations → gene-MeSH pairs
+    python -m src enrichment                  # gene bitsets per MeSH term
+    python -m src enrich 7157 672 675 --min-score 0.1
+    python -m src enrich --sets claims.gmt    # thousands of gene sets at once
+    python -m src store commit -m "25.12"     # version the outputs (dedup across releases)
+    python -m src store checkout 25.09 -o /tmp/ot_25_09
+    python -m src cache info                  # memoized loader results (notebooks)
+    python -m src mesh --prefix C04 C04.588 C04.557
+    python -m src --config other.yaml figures --from-cubes
+    python -m src --profile run               # profiles in processed/profiles/
+"""
+
+import argparse
+import sys
+
+from src.pipeline.steps import STEPS, DEFAULT_STEPS, resolve_steps, step_status
+
+
+def _print_plan(names: list[str], config: dict) -> None:
+    """Print what would run and the state of its inputs/outputs."""
+    for name in names:
+        step = STEPS[name]
+        status = step_status(step, config)
+        state = "done" if status["done"] else ("ready" if status["ready"] else "blocked")
+        print(f"{name:<10} [{state}] {step.description}")
+        for missing in status["missing_inputs"]:
+            print(f"{'':<10}   missing input: {missing}")
+
+
+def _step_options(args: argparse.Namespace) -> dict:
+    """Step-specific keyword arguments from the parsed command line."""
+    options = {}
+    if getattr(args, "prefix", None):
+        options["prefixes"] = args.prefix
+    if getattr(args, "from_cubes", False):
+        options["from_cubes"] = True
+    if getattr(args, "check", False):
+        options["check"] = True
+    if getattr(args, "all_diseases", False):
+        options["all_diseases"] = True
+    if getattr(args, "workers", None):
+        options["workers"] = args.workers
+    return options
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser (no heavy imports)."""
+    parser = argparse.ArgumentParser(
+        prog="python -m src",
+        description="Open Targets Cancer MeSH pipeline"
+    )
+    parser.add_argument("--config", default=None, help="Config file (default: config.yaml in project root)")
+    parser.add_argument("--dry-run", action="store_true", help="Show the plan and input status without running")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Less output")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Write cProfile + tracemalloc output per step to <processed_dir>/profiles/"
+    )
+
+    sub = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    run = sub.add_parser("run", help="Run several steps in order")
+    run.add_argument(
+        "--steps", default=None,
+        help=f"Comma-separated steps (default: {','.join(DEFAULT_STEPS)}; available: {','.join(STEPS)})"
+    )
+    run.add_argument(
+        "--parallel", action="store_true", default=None,
+        help="Run Steps 1-3 as a concurrent task graph (default: pipeline.parallel)"
+    )
+    run.add_argument("--workers", type=int, default=None, help="Thread pool size for --parallel")
+
+    sub.add_parser("status", help="Show input/output status of every step")
+
+    # duckdb itself is only imported when a query runs
+    from src.analysis.query import add_query_arguments
+    add_query_arguments(sub.add_parser("query", help="SQL over the pipeline outputs (needs duckdb)"))
+
+    match = sub.add_parser("match", help="Match patent gene/MeSH annotations against the gene-MeSH dataset")
+    match.add_argument("input", help="Annotation file (CSV, TSV or Parquet)")
+    match.add_argument("-o", "--output", default=None, help="Matches TSV (default: <processed_dir>/patent_matches.tsv)")
+    match.add_argument(
+        "--expand", choices=["none", "up", "down", "both"], default=None,
+        help="Expand MeSH matches along the hierarchy (default: patents.expand)"
+    )
+    match.add_argument("--hierarchy", default=None, help="Hierarchy prefix (default: the primary one)")
+    match.add_argument("--association-type", choices=["direct", "indirect"], default=None)
+    match.add_argument("--workers", type=int, default=None, help="Process pool size")
+
+    enrich = sub.add_parser("enrich", help="Gene-set enrichment over MeSH terms (needs the enrichment step)")
+    enrich.add_argument("genes", nargs="*", help="Entrez gene IDs of one gene list")
+    enrich.add_argument("--sets", default=None, help="Gene sets file (GMT, or CSV/TSV/Parquet set/gene pairs)")
+    enrich.add_argument("-o", "--output", default=None, help="Results TSV for --sets (default: <processed_dir>/enrichment_<stem>.tsv)")
+    enrich.add_argument("--min-score", type=float, default=None, help="Membership threshold (one of enrichment.thresholds)")
+    enrich.add_argument("--min-evidence", type=int, default=None)
+    enrich.add_argument("--max-fdr", type=float, default=None, help="FDR cut-off (default: enrichment.max_fdr)")
+    enrich.add_argument("--hierarchy", default=None, help="Hierarchy prefix (default: the primary one)")
+    enrich.add_argument("--association-type", choices=["direct", "indirect"], default=None)
+
+    from src.utils.store import add_store_arguments
+    add_store_arguments(sub.add_parser("store", help="Versioned store of the outputs (commit, list, checkout)"))
+
+    from src.utils.memo import add_cache_arguments
+    add_cache_arguments(sub.add_parser("cache", help="Memoized loader results (info, clear)"))
+
+    for name, step in STEPS.items():
+        step_parser = sub.add_parser(name, help=step.description)
+        if name == "mesh":
+            step_parser.add_argument("--prefix", nargs="+", help="Tree prefix(es) to extract in one pass")
+        elif name == "catalog":
+            step_parser.add_argument("--check", action="store_true", help="Validate inputs and intermediate freshness")
+        elif name == "name_match":
+            step_parser.add_argument("--all-diseases", action="store_true", help="Every unmapped OT disease, not only cancers")
+        elif name == "figures":
+            step_parser.add_argument("--from-cubes", action="store_true", help="Reuse saved cubes")
+            step_parser.add_argument("--workers", type=int, default=None, help="Process pool size")
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI entry point."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    from src.utils.config import load_config
+    config = load_config(args.config)
+
+    if args.command == "status":
+        _print_plan(list(STEPS), config)
+        return 0
+
+    if args.command == "query":
+        from src.analysis.query import query_from_args
+        try:
+            query_from_args(args, config)
+        except ValueError as e:
+            parser.error(str(e))
+        return 0
+
+    if args.command == "match":
+        from pathlib import Path
+        from src.analysis.patent_match import run as match_patents
+        match_patents(
+            config, Path(args.input), Path(args.output) if args.output else None,
+            expand=args.expand, prefix=args.hierarchy, assoc_type=args.association_type,
+            workers=args.workers, verbose=not args.quiet
+        )
+        return 0
+
+    if args.command == "enrich":
+        if not args.genes and args.sets is None:
+            parser.error("enrich: give Entrez gene IDs or --sets")
+        from pathlib import Path
+        from src.analysis.enrichment import query as enrich_genes
+        try:
+            enrich_genes(
+                config, args.genes, Path(args.sets) if args.sets else None,
+                Path(args.output) if args.output else None,
+                min_score=args.min_score, min_evidence=args.min_evidence, max_fdr=args.max_fdr,
+                prefix=args.hierarchy, assoc_type=args.association_type, verbose=not args.quiet
+            )
+        except ValueError as e:
+            parser.error(str(e))
+        return 0
+
+    if args.command == "store":
+        from src.utils.store import store_from_args
+        try:
+            store_from_args(args, config)
+        except ValueError as e:
+            parser.error(str(e))
+        return 0
+
+    if args.command == "cache":
+        from src.utils.memo import cache_from_args
+        cache_from_args(args, config)
+        return 0
+
+    try:
+        names = resolve_steps(args.steps) if args.command == "run" else [args.command]
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.dry_run:
+        _print_plan(names, config)
+        return 0
+
+    if args.command == "run":
+        from src.pipeline import run_all
+        run_all.run(
+            config, steps=names, verbose=not args.quiet, profile=args.profile,
+            parallel=args.parallel, workers=args.workers
+        )
+        return 0
+
+    from src.pipeline.steps import run_step
+    run_step(args.command, config, verbose=not args.quiet, profile=args.profile, **_step_options(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,8 @@ Pipeline Step 3: Add Entrez Gene IDs and produce final output.
 This module:
 1. Downloads gene2ensembl from NCBI (if not cached)
 2. Filters to human genes (tax_id=9606)
-3. Maps Ensembl Gene IDs → Entrez Gene IDs
+3. Maps Ensembl Gene IDs → Entrez Gene IDs (array-indexed, many-to-many;
+   see entrez_index and ncbi.duplicate_policy)
 4. Produces final 5-column TSV for patent matching
 
 Final output columns:
@@ -18,13 +19,23 @@ Final output columns:
 
 import gzip
 import urllib.request
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from src.utils.config import load_config, ensure_dir
+from src.utils.config import (
+    load_config, ensure_dir, get_hierarchy_prefixes, hierarchy_suffix,
+    get_association_types, association_suffix, get_therapeutic_areas, area_suffix
+)
+from src.utils.profiling import add_profile_argument, profile_step
+from src.utils.intermediate import read_intermediate
+from src.utils.catalog import preflight
+from src.utils.memo import memoize
+from src.pipeline.entrez_index import EntrezIndex, DUPLICATE_POLICIES
+from src.pipeline.aggregators import get_aggregators
 
 
 GENE2ENSEMBL_URL = "https://ftp.ncbi.nlm.nih.gov/gene/DATA/gene2ensembl.gz"
@@ -50,6 +61,7 @@ def download_gene2ensembl(config: dict, force: bool = False) -> Path:
     return output_path
 
 
+@memoize(inputs=lambda gz_path, **_: [gz_path])
 def load_gene2ensembl(gz_path: Path, tax_id: int = HUMAN_TAX_ID) -> pd.DataFrame:
     """Load gene2ensembl and filter to human."""
     print(f"    Loading and filtering to tax_id={tax_id}...")
@@ -64,41 +76,259 @@ def load_gene2ensembl(gz_path: Path, tax_id: int = HUMAN_TAX_ID) -> pd.DataFrame
         'Ensembl_gene_identifier': 'ensemblGeneId'
     })
 
-    # Keep only gene-level mappings, dedupe
+    # Keep only gene-level mappings; every (Ensembl, Entrez) pair is kept,
+    # duplicates are resolved at mapping time (ncbi.duplicate_policy)
     gene_mapping = df[['entrezGeneId', 'ensemblGeneId']].drop_duplicates()
-    gene_mapping = gene_mapping.drop_duplicates(subset=['ensemblGeneId'], keep='first')
 
-    print(f"    {len(gene_mapping):,} human Ensembl → Entrez mappings")
+    multi = gene_mapping['ensemblGeneId'].duplicated(keep=False)
+    print(f"    {len(gene_mapping):,} human Ensembl → Entrez mappings "
+          f"({gene_mapping.loc[multi, 'ensemblGeneId'].nunique():,} Ensembl genes with several Entrez IDs)")
     return gene_mapping
 
 
+def get_duplicate_policy(config: dict) -> str:
+    """ncbi.duplicate_policy: all (default), first, min or unique."""
+    policy = config.get("ncbi", {}).get("duplicate_policy", "all")
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Unknown ncbi.duplicate_policy: {policy!r} (expected one of {', '.join(DUPLICATE_POLICIES)})")
+    return policy
+
+
+def _gather_entrez(
+    df: pd.DataFrame,
+    entrez_map: pd.DataFrame | EntrezIndex,
+    policy: str
+) -> tuple[pd.DataFrame, int]:
+    """Rows of df with an Entrez ID (entrezGeneId), and the number of input rows mapped."""
+    index = entrez_map if isinstance(entrez_map, EntrezIndex) else EntrezIndex.from_frame(entrez_map)
+    rows, entrez = index.lookup(df['targetId'].to_numpy(), policy)
+    mapped = df.take(rows).reset_index(drop=True)
+    mapped['entrezGeneId'] = entrez
+    return mapped, len(np.unique(rows))
+
+
+# Summed when several Ensembl genes collapse into one Entrez gene; every
+# other score column takes the max (as rankings.group_values)
+SUMMED_COLUMNS = ("evidenceCount", "evidence_sum", "disease_count")
+
+
+def _collapse_pairs(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    """
+    One row per (meshId, entrezGeneId): best score, total evidence.
+
+    Several Ensembl genes can map to the same Entrez ID, which would repeat
+    the pair. Rows keep their first-seen order.
+    """
+    keys = ["meshId", "entrezGeneId"]
+    if not df.duplicated(keys).any():
+        return df
+    agg = {"meshLevel": "min"}
+    agg.update({c: "sum" if c in SUMMED_COLUMNS or c.endswith("_evidence") else "max" for c in columns})
+    return df.groupby(keys, sort=False).agg(agg).reset_index()
+
+
+def map_to_entrez(
+    df: pd.DataFrame,
+    entrez_map: pd.DataFrame | EntrezIndex,
+    verbose: bool = True,
+    policy: str = "all",
+    columns: list[str] | None = None
+) -> pd.DataFrame:
+    """
+    Map a gene-mesh dataset to Entrez IDs and build the final 5-column table.
+
+    Rows without an Entrez ID are dropped; with policy "all" a gene with
+    several Entrez IDs yields one row per ID. Ensembl genes sharing an
+    Entrez ID are collapsed into one row per pair (max score, summed
+    evidence), as rankings.group_values does. Output is sorted by score.
+
+    Args:
+        df: Step 2 gene-mesh dataset
+        entrez_map: load_gene2ensembl DataFrame or a prebuilt EntrezIndex
+        verbose: Print progress messages
+        policy: Duplicate policy (entrez_index.DUPLICATE_POLICIES)
+        columns: Extra columns of df appended as they are (e.g. the
+            pipeline.aggregators score variants)
+    """
+    before = len(df)
+    df, mapped = _gather_entrez(df, entrez_map, policy)
+    columns = list(columns or [])
+    df = _collapse_pairs(df, ["score", "evidenceCount"] + columns)
+    if verbose:
+        print(f"    {mapped:,}/{before:,} have Entrez ID ({mapped/max(before, 1)*100:.1f}%), "
+              f"{len(df):,} rows ({policy})")
+
+    # Create final 5-column output
+    final = df[['meshId', 'entrezGeneId', 'meshLevel', 'score', 'evidenceCount'] + columns].copy()
+    final.columns = ['disease_mesh_id', 'gene_entrez_id', 'mesh_level', 'ot_score', 'evidence_count'] + columns
+
+    # Sort by score descending
+    return final.sort_values('ot_score', ascending=False).reset_index(drop=True)
+
+
+def write_datatype_outputs(
+    config: dict,
+    entrez_map: pd.DataFrame,
+    breakdowns: dict[str, pd.DataFrame] | None = None,
+    verbose: bool = True
+) -> dict[str, pd.DataFrame]:
+    """
+    Map the per-datatype breakdowns to Entrez and write
+    gene_disease_mesh_datatypes{suffix}.tsv.
+
+    Columns: disease_mesh_id, gene_entrez_id, mesh_level, then
+    <datatype>_score and <datatype>_evidence per datatype.
+
+    Args:
+        config: Configuration dict
+        entrez_map: Ensembl → Entrez mapping
+        breakdowns: Dict of prefix -> Step 2 breakdown; read from the
+            intermediate files if None
+        verbose: Print progress messages
+
+    Returns:
+        Dict of prefix -> breakdown table
+    """
+    processed_dir = Path(config["paths"]["processed_dir"])
+    prefixes = get_hierarchy_prefixes(config)
+    index = EntrezIndex.from_frame(entrez_map)
+    policy = get_duplicate_policy(config)
+
+    tables = {}
+    for prefix in prefixes:
+        suffix = hierarchy_suffix(prefixes, prefix)
+        if breakdowns is not None:
+            df = breakdowns[prefix]
+        else:
+            df = read_intermediate(config, f"gene_mesh_datatypes{suffix}", hint="Run Step 2 first")
+
+        df, _ = _gather_entrez(df, index, policy)
+        datatype_columns = [c for c in df.columns if c.endswith(("_score", "_evidence"))]
+        df = _collapse_pairs(df, datatype_columns)
+        table = df[['meshId', 'entrezGeneId', 'meshLevel'] + datatype_columns].rename(columns={
+            'meshId': 'disease_mesh_id',
+            'entrezGeneId': 'gene_entrez_id',
+            'meshLevel': 'mesh_level'
+        })
+        table = table.sort_values(['disease_mesh_id', 'gene_entrez_id']).reset_index(drop=True)
+
+        output_path = processed_dir / f"gene_disease_mesh_datatypes{suffix}.tsv"
+        table.to_csv(output_path, sep='\t', index=False)
+        if verbose:
+            print(f"  Saved: {output_path}")
+            print(f"    {len(table):,} rows, {len(datatype_columns) // 2} datatypes")
+
+        tables[prefix] = table
+
+    return tables
+
+
+def write_final_outputs(
+    config: dict,
+    entrez_map: pd.DataFrame,
+    gene_mesh: dict[str, pd.DataFrame] | None = None,
+    verbose: bool = True,
+    assoc_type: str = "direct",
+    area: str | None = None
+) -> dict[str, pd.DataFrame]:
+    """
+    Map each hierarchy's gene-mesh dataset to Entrez and write the final TSVs.
+
+    Args:
+        config: Configuration dict
+        entrez_map: Ensembl → Entrez mapping (load_gene2ensembl)
+        gene_mesh: Dict of prefix -> Step 2 output; read from the
+            intermediate files if None
+        verbose: Print progress messages
+        assoc_type: Association type; non-direct outputs get its suffix
+        area: Therapeutic-area name (opentargets.therapeutic_areas); its
+            hierarchies are written, non-primary areas with their suffix
+            (default: the primary area)
+
+    Returns:
+        Dict of prefix -> final 5-column DataFrame
+    """
+    processed_dir = Path(config["paths"]["processed_dir"])
+    crosswalks_dir = ensure_dir(processed_dir / "crosswalks")
+    areas = get_therapeutic_areas(config)
+    area_config = next((a for a in areas if a["name"] == area), areas[0])
+    prefixes = area_config["hierarchies"]
+    type_suffix = association_suffix(assoc_type) + area_suffix(areas, area_config["name"])
+
+    # Save crosswalk
+    entrez_map.to_csv(crosswalks_dir / "ensembl_entrez.csv", index=False)
+
+    # Built once, shared by every hierarchy
+    index = EntrezIndex.from_frame(entrez_map)
+    policy = get_duplicate_policy(config)
+    aggregators = get_aggregators(config)
+
+    finals = {}
+    for prefix in prefixes:
+        suffix = type_suffix + hierarchy_suffix(prefixes, prefix)
+
+        if gene_mesh is not None:
+            df = gene_mesh[prefix]
+        else:
+            # Load gene-mesh dataset from Step 2
+            if verbose:
+                print(f"  Loading {prefix} {assoc_type} gene-mesh dataset...")
+            df = read_intermediate(config, f"gene_mesh_pre_entrez{suffix}", hint="Run Step 2 first")
+        if verbose:
+            print(f"    {len(df):,} gene-mesh pairs")
+
+        if verbose:
+            print("  Mapping Ensembl → Entrez...")
+        final = map_to_entrez(df, index, verbose, policy, columns=aggregators)
+
+        # Score variants (pipeline.aggregators) go to their own table
+        if aggregators:
+            scores_path = processed_dir / f"gene_disease_mesh_scores{suffix}.tsv"
+            final.to_csv(scores_path, sep='\t', index=False)
+            final = final.drop(columns=aggregators)
+            if verbose:
+                print(f"  Saved: {scores_path} ({', '.join(aggregators)})")
+
+        # Save final output
+        output_path = processed_dir / f"gene_disease_mesh_final{suffix}.tsv"
+        final.to_csv(output_path, sep='\t', index=False)
+
+        if verbose:
+            print(f"  Saved: {output_path}")
+            print(f"    {len(final):,} rows")
+            print(f"    {final['disease_mesh_id'].nunique()} MeSH terms")
+            print(f"    {final['gene_entrez_id'].nunique()} genes")
+
+        finals[prefix] = final
+
+    return finals
+
+
 def run(config: dict | None = None, verbose: bool = True) -> pd.DataFrame:
     """
     Run the Entrez mapping and produce final output.
 
+    Produces gene_disease_mesh_final.tsv for the primary hierarchy and a
+    suffixed TSV (e.g. gene_disease_mesh_final_c04_557.tsv) for each
+    additional hierarchy in mesh.hierarchies. Indirect associations
+    (pipeline.association_type) get their own "_indirect" TSVs, each
+    additional therapeutic area its own suffixed TSVs (e.g.
+    gene_disease_mesh_final_cardiovascular.tsv), and
+    pipeline.datatype_breakdown adds gene_disease_mesh_datatypes*.tsv and
+    pipeline.aggregators gene_disease_mesh_scores*.tsv.
+
     Returns:
-        Final 4-column DataFrame
+        Final 5-column DataFrame for the primary area, association type and
+        hierarchy
     """
     if config is None:
         config = load_config()
 
-    processed_dir = Path(config["paths"]["processed_dir"])
-    crosswalks_dir = ensure_dir(processed_dir / "crosswalks")
-
     if verbose:
         print("Step 3: Adding Entrez Gene IDs")
         print("-" * 40)
 
-    # Load gene-mesh dataset from Step 2
-    input_path = processed_dir / "intermediate" / "gene_mesh_pre_entrez.parquet"
-    if not input_path.exists():
-        raise FileNotFoundError(f"Run Step 2 first: {input_path}")
-
-    if verbose:
-        print("  Loading gene-mesh dataset...")
-    df = pd.read_parquet(input_path)
-    if verbose:
-        print(f"    {len(df):,} gene-mesh pairs")
+    preflight(config, ["gene2ensembl"], verbose)
 
     # Download/load Entrez mapping
     if verbose:
@@ -106,51 +336,34 @@ def run(config: dict | None = None, verbose: bool = True) -> pd.DataFrame:
     gz_path = download_gene2ensembl(config)
     entrez_map = load_gene2ensembl(gz_path)
 
-    # Save crosswalk
-    entrez_map.to_csv(crosswalks_dir / "ensembl_entrez.csv", index=False)
-
-    # Merge
-    if verbose:
-        print("  Mapping Ensembl → Entrez...")
-    df = df.merge(
-        entrez_map.rename(columns={'ensemblGeneId': 'targetId'}),
-        on='targetId',
-        how='left'
-    )
-
-    # Drop rows without Entrez ID
-    before = len(df)
-    df = df.dropna(subset=['entrezGeneId'])
-    if verbose:
-        print(f"    {len(df):,}/{before:,} have Entrez ID ({len(df)/before*100:.1f}%)")
-
-    # Convert Entrez to int
-    df['entrezGeneId'] = df['entrezGeneId'].astype(int)
-
-    # Create final 5-column output
-    final = df[['meshId', 'entrezGeneId', 'meshLevel', 'score', 'evidenceCount']].copy()
-    final.columns = ['disease_mesh_id', 'gene_entrez_id', 'mesh_level', 'ot_score', 'evidence_count']
-
-    # Sort by score descending
-    final = final.sort_values('ot_score', ascending=False).reset_index(drop=True)
-
-    # Save final output
-    output_path = processed_dir / "gene_disease_mesh_final.tsv"
-    final.to_csv(output_path, sep='\t', index=False)
+    assoc_types = get_association_types(config)
+    primary = get_hierarchy_prefixes(config)[0]
+    areas = [area["name"] for area in get_therapeutic_areas(config)]
+    finals = {
+        (area, assoc_type): write_final_outputs(
+            config, entrez_map, verbose=verbose, assoc_type=assoc_type, area=area
+        )
+        for area in areas
+        for assoc_type in assoc_types
+    }
 
-    if verbose:
-        print(f"  Saved: {output_path}")
-        print(f"    {len(final):,} rows")
-        print(f"    {final['disease_mesh_id'].nunique()} MeSH terms")
-        print(f"    {final['gene_entrez_id'].nunique()} genes")
+    # Per-datatype breakdown (pipeline.datatype_breakdown)
+    if config.get("pipeline", {}).get("datatype_breakdown", False):
+        write_datatype_outputs(config, entrez_map, verbose=verbose)
 
-    return final
+    return finals[areas[0], assoc_types[0]][primary]
 
 
 def main():
     """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Step 3: add Entrez Gene IDs")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
     config = load_config()
-    run(config, verbose=True)
+    with profile_step("add_entrez", config, enabled=args.profile):
+        run(config, verbose=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+"""
+Score aggregators for collapsing OT diseases into a MeSH term.
+
+Step 2 always reports max(score) and sum(evidenceCount) per (gene, MeSH
+term). pipeline.aggregators adds score variants from the same join, each as
+an extra column of the gene-mesh intermediate and of
+gene_disease_mesh_scores*.tsv:
+
+    mean            mean score over the contributing diseases
+    disease_count   number of contributing OT diseases (associations)
+    harmonic_sum    Open Targets style harmonic sum: scores sorted
+                    descending, the i-th weighted 1/i², normalised so that
+                    HARMONIC_TERMS scores of 1 give 1
+    top<n>_mean     mean of the n highest scores (e.g. top3_mean)
+    max, evidence_sum
+                    the default score and evidence columns, under their
+                    aggregator names
+
+All of them are sorted segment reductions. Rows are numbered by integer
+group key and sorted by (key, -score) with one lexsort. Each group is then a
+contiguous segment and every aggregate is a single np.add.reduceat over
+segment starts. Only the top scores of each group are needed (top_rows), so
+streamed partials stay bounded by top_n rows per group.
+"""
+
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Scores entering the harmonic sum (later terms weigh < 1e-4 each)
+HARMONIC_TERMS = 100
+
+_TOP_MEAN = re.compile(r"top(\d+)_mean$")
+SIMPLE_AGGREGATORS = ("max", "mean", "evidence_sum", "disease_count", "harmonic_sum")
+
+
+def validate_aggregators(names: list[str]) -> list[str]:
+    """
+    Check aggregator names (SIMPLE_AGGREGATORS or top<n>_mean).
+
+    Raises:
+        ValueError: for unknown names
+    """
+    unknown = [n for n in names if n not in SIMPLE_AGGREGATORS and not _TOP_MEAN.match(n)]
+    if unknown:
+        raise ValueError(
+            f"Unknown aggregator(s): {', '.join(unknown)} "
+            f"(choose from {', '.join(SIMPLE_AGGREGATORS)}, top<n>_mean)"
+        )
+    return list(dict.fromkeys(names))
+
+
+def get_aggregators(config: dict) -> list[str]:
+    """Extra score aggregators from pipeline.aggregators (default: none)."""
+    return validate_aggregators(config.get("pipeline", {}).get("aggregators") or [])
+
+
+def top_n(names: list[str]) -> int:
+    """Scores per group the aggregators need (0 if none beyond the totals)."""
+    needed = [int(m.group(1)) for m in map(_TOP_MEAN.match, names) if m]
+    if "harmonic_sum" in names:
+        needed.append(HARMONIC_TERMS)
+    return max(needed, default=0)
+
+
+def segments(codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Segment starts and within-segment ranks of sorted integer keys.
+
+    Returns:
+        (starts of each run of equal codes, rank of every row in its run)
+    """
+    n = len(codes)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if n else np.array([], dtype="int64")
+    rank = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+    return starts, rank
+
+
+def top_rows(rows: pd.DataFrame, keys: list[str], n: int) -> pd.DataFrame:
+    """
+    The n highest-scoring rows of every group, sorted by group then score.
+
+    Args:
+        rows: Rows with the key columns and score
+        keys: Group columns
+        n: Rows kept per group
+    """
+    codes = rows.groupby(keys, sort=False).ngroup().to_numpy()
+    order = np.lexsort((-rows["score"].to_numpy(), codes))
+    _, rank = segments(codes[order])
+    return rows.iloc[order[rank < n]]
+
+
+@dataclass
+class Segments:
+    """Per-group totals plus each group's top scores as sorted segments."""
+
+    count: np.ndarray
+    score_sum: np.ndarray
+    score_max: np.ndarray
+    evidence_sum: np.ndarray
+    scores: np.ndarray  # top scores, grouped, descending within a group
+    starts: np.ndarray  # segment start of each group in scores
+    rank: np.ndarray    # rank of each entry of scores in its group (0 = best)
+
+
+def _top_mean(n: int):
+    def aggregate(s: Segments) -> np.ndarray:
+        return np.add.reduceat(np.where(s.rank < n, s.scores, 0.0), s.starts) / np.minimum(s.count, n)
+    return aggregate
+
+
+def _harmonic_sum(s: Segments) -> np.ndarray:
+    weights = 1.0 / (s.rank + 1.0) ** 2
+    weights[s.rank >= HARMONIC_TERMS] = 0.0
+    return np.add.reduceat(s.scores * weights, s.starts) / (1.0 / np.arange(1, HARMONIC_TERMS + 1) ** 2).sum()
+
+
+AGGREGATORS = {
+    "max": lambda s: s.score_max,
+    "mean": lambda s: s.score_sum / s.count,
+    "evidence_sum": lambda s: s.evidence_sum,
+    "disease_count": lambda s: s.count,
+    "harmonic_sum": _harmonic_sum,
+}
+
+
+def apply_aggregators(
+    gene_mesh: pd.DataFrame,
+    top: pd.DataFrame | None,
+    keys: list[str],
+    names: list[str]
+) -> pd.DataFrame:
+    """
+    Add one column per aggregator to a gene-mesh aggregate.
+
+    Args:
+        gene_mesh: Aggregate with the key columns, score (max),
+            evidenceCount (sum), associationCount and scoreSum (sum; dropped
+            from the result)
+        top: top_rows output for the same groups (keys + score), with at
+            least top_n(names) rows per group
+        keys: Group columns
+        names: Aggregator names (validate_aggregators)
+
+    Returns:
+        gene_mesh with the extra columns
+    """
+    if not names:
+        return gene_mesh
+    result = gene_mesh.copy()
+    if not len(result):
+        for name in names:
+            result[name] = pd.Series(dtype="float64")
+        return result.drop(columns="scoreSum", errors="ignore")
+
+    # Integer key = row position in gene_mesh; sort the top scores by it
+    if top is not None and len(top):
+        codes = pd.MultiIndex.from_frame(result[keys]).get_indexer(pd.MultiIndex.from_frame(top[keys]))
+        scores = top["score"].to_numpy(dtype="float64")
+        order = np.lexsort((-scores, codes))
+        codes, scores = codes[order], scores[order]
+    else:
+        codes, scores = np.zeros(0, dtype="int64"), np.zeros(0)
+    starts, rank = segments(codes)
+
+    segment = Segments(
+        count=result["associationCount"].to_numpy(),
+        score_sum=result["scoreSum"].to_numpy(dtype="float64") if "scoreSum" in result.columns else None,
+        score_max=result["score"].to_numpy(dtype="float64"),
+        evidence_sum=result["evidenceCount"].to_numpy(),
+        scores=scores,
+        starts=starts,
+        rank=rank,
+    )
+    for name in names:
+        match = _TOP_MEAN.match(name)
+        result[name] = (_top_mean(int(match.group(1))) if match else AGGREGATORS[name])(segment)
+    return result.drop(columns="scoreSum", errors="ignore")
@@ -4,10 +4,18 @@ Pipeline Step 2: Build cancer gene-disease-MeSH crosswalk.
 
 This module:
 1. Loads cancer diseases from Step 1
-2. Extracts MeSH C04.588 hierarchy live from d2025.bin
-3. Loads gene-disease associations
+2. Extracts MeSH hierarchies (default C04.588) live from d2025.bin
+3. Streams gene-disease associations (direct, indirect or both) and
+   aggregates them per (gene, MeSH term) in bounded memory, one scan for
+   every therapeutic area (opentargets.therapeutic_areas), with optional
+   score variants (pipeline.aggregators, see aggregators.py)
 4. Joins with MeSH hierarchy
-5. Creates final 4-column output for patent matching
+5. Creates final 4-column output for patent matching, one per hierarchy
+   and association type
+6. Sketches the score/evidence distribution of the scanned associations
+   (sketches/associations{suffix}.json, see sketches.py)
+7. Optionally aggregates per-datatype scores (association_by_datatype_direct)
+8. Writes summary tables if pipeline.generate_summaries is set
 """
 
 import pandas as pd
@@ -16,30 +24,149 @@ from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from src.utils.config import load_config, ensure_dir
-from src.pipeline.extract_mesh import run as extract_mesh_hierarchy
+from src.utils.config import (
+    load_config, ensure_dir, hierarchy_suffix,
+    ASSOCIATION_DATASETS, get_association_types, association_suffix,
+    get_therapeutic_areas, area_suffix
+)
+from src.utils.profiling import add_profile_argument, profile_step
+from src.utils.intermediate import read_intermediate, write_intermediate
+from src.utils.catalog import preflight, output_metadata
+from src.utils.memo import memoize
+from src.pipeline.extract_mesh import run_multi as extract_mesh_hierarchies
+from src.pipeline.summaries import summarize, write_summaries
+from src.pipeline.sketches import SketchingBatches, save_sketch
+from src.pipeline.aggregators import get_aggregators, top_n, top_rows, apply_aggregators
 
 
-def load_cancer_diseases(config: dict) -> pd.DataFrame:
-    """Load cancer diseases from Step 1 output."""
-    path = Path(config["paths"]["processed_dir"]) / "intermediate" / "cancer_diseases_mesh_crosswalk.parquet"
-    if not path.exists():
-        raise FileNotFoundError(f"Run Step 1 first: {path}")
-    return pd.read_parquet(path)
+def load_cancer_diseases(config: dict, suffix: str = "") -> pd.DataFrame:
+    """Load cancer diseases (or another area's, by its suffix) from Step 1 output."""
+    return read_intermediate(config, f"cancer_diseases_mesh_crosswalk{suffix}", hint="Run Step 1 first")
 
 
-def load_associations(config: dict) -> pd.DataFrame:
-    """Load gene-disease associations from Open Targets."""
-    assoc_dir = Path(config["paths"]["opentargets_dir"]) / "association_overall_direct"
+def scan_pairs(diseases: pd.DataFrame) -> pd.DataFrame:
+    """
+    (diseaseId, meshId) for every MeSH xref of every disease.
+
+    The association scan covers these diseases in both the sequential and
+    the parallel run (which starts it before d2025.bin is parsed), so the
+    sketches match; add_mesh_level drops the terms outside the hierarchies.
+    """
+    pairs = diseases[["diseaseId", "meshIds"]].explode("meshIds")
+    return pairs.rename(columns={"meshIds": "meshId"}).dropna(subset=["meshId"])
+
+
+ASSOCIATION_COLUMNS = ["diseaseId", "targetId", "score", "evidenceCount"]
+
+# Rows per record batch when streaming associations
+ASSOCIATION_BATCH_SIZE = 1_000_000
+
+# Partial aggregates are merged once they hold this many rows
+COMPACT_ROWS = 5_000_000
+
+
+# Per-datatype scores (pipeline.datatype_breakdown)
+DATATYPE_DATASET = "association_by_datatype_direct"
+DATATYPE_COLUMNS = ["diseaseId", "targetId", "datatypeId", "score", "evidenceCount"]
+
+
+def association_files(config: dict, dataset: str = ASSOCIATION_DATASETS["direct"]) -> list[Path]:
+    """Parquet files of an association dataset directory."""
+    assoc_dir = Path(config["paths"]["opentargets_dir"]) / dataset
     if not assoc_dir.exists():
         raise FileNotFoundError(
             f"Associations not found: {assoc_dir}. "
             "Run: make download-phase2"
         )
+    return sorted(assoc_dir.glob("*.parquet"))
+
+
+@memoize(
+    inputs=lambda config, assoc_type, **_: association_files(config, ASSOCIATION_DATASETS[assoc_type]),
+    ignore=("config",)
+)
+def load_associations(
+    config: dict,
+    disease_ids: set | None = None,
+    columns: list[str] | None = None,
+    assoc_type: str = "direct"
+) -> pd.DataFrame:
+    """
+    Load gene-disease associations from Open Targets.
 
-    files = list(assoc_dir.glob("*.parquet"))
+    Args:
+        config: Configuration dict
+        disease_ids: If given, only rows for these diseases are kept
+            (filtered per file while reading)
+        columns: Columns to read (default: all)
+        assoc_type: "direct" or "indirect"
+    """
+    files = association_files(config, ASSOCIATION_DATASETS[assoc_type])
     print(f"    Loading {len(files)} parquet files...")
-    return pd.concat([pd.read_parquet(f) for f in files])
+
+    filters = None
+    if disease_ids is not None:
+        filters = [("diseaseId", "in", sorted(disease_ids))]
+    return pd.concat([pd.read_parquet(f, columns=columns, filters=filters) for f in files])
+
+
+def iter_association_batches(
+    config: dict,
+    disease_ids: set | None = None,
+    columns: list[str] | None = None,
+    assoc_type: str = "direct",
+    batch_size: int = ASSOCIATION_BATCH_SIZE,
+    dataset: str | None = None,
+    datatypes: list[str] | None = None
+):
+    """
+    Stream associations as DataFrames of at most batch_size rows.
+
+    Only one file is read ahead at a time, so memory stays bounded by a few
+    batches regardless of the dataset size (indirect associations are
+    several times larger than direct ones).
+
+    Args:
+        dataset: Dataset directory to read instead of the one for
+            assoc_type (e.g. DATATYPE_DATASET)
+        datatypes: Only keep these datatypeId values (datatype datasets)
+
+    Yields:
+        DataFrame batches (same columns as load_associations)
+    """
+    import pyarrow.dataset as ds
+
+    files = association_files(config, dataset or ASSOCIATION_DATASETS[assoc_type])
+    source = ds.dataset([str(f) for f in files], format="parquet")
+    row_filter = None
+    if disease_ids is not None:
+        row_filter = ds.field("diseaseId").isin(sorted(disease_ids))
+    if datatypes:
+        datatype_filter = ds.field("datatypeId").isin(list(datatypes))
+        row_filter = datatype_filter if row_filter is None else row_filter & datatype_filter
+
+    for batch in source.to_batches(
+        columns=columns,
+        filter=row_filter,
+        batch_size=batch_size,
+        batch_readahead=2,
+        fragment_readahead=1
+    ):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def combine_hierarchies(hierarchies: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Stack several MeSH hierarchies into one table with a 'hierarchy' column.
+
+    Polyhierarchy terms (e.g. a carcinoma under both C04.588 and C04.557)
+    keep one set of rows per branch they appear in.
+    """
+    return pd.concat(
+        [h.assign(hierarchy=prefix) for prefix, h in hierarchies.items()],
+        ignore_index=True
+    )
 
 
 def build_disease_mesh_crosswalk(
@@ -49,154 +176,544 @@ def build_disease_mesh_crosswalk(
     """
     Build disease → MeSH crosswalk with hierarchy info.
 
-    Explodes the meshIds list and joins with MeSH tree structure.
+    Explodes the meshIds list and joins with MeSH tree structure. If
+    mesh_hierarchy has a 'hierarchy' column (see combine_hierarchies), the
+    crosswalk has one row per (hierarchy, disease, meshId).
     """
-    with_mesh = cancer_diseases[cancer_diseases["meshIds"].notna()].copy()
-
-    rows = []
-    for _, row in with_mesh.iterrows():
-        for mesh_id in row["meshIds"]:
-            rows.append({
-                "diseaseId": row["diseaseId"],
-                "diseaseName": row["diseaseName"],
-                "meshId": mesh_id
-            })
+    with_mesh = cancer_diseases[cancer_diseases["meshIds"].notna()]
 
-    crosswalk = pd.DataFrame(rows)
+    # With pipeline.inherit_mesh the distance is kept so consumers can filter
+    columns = ["diseaseId", "diseaseName", "meshIds"]
+    if "meshInheritanceDistance" in with_mesh.columns:
+        columns.append("meshInheritanceDistance")
+    crosswalk = with_mesh[columns].explode("meshIds")
+    crosswalk = crosswalk.rename(columns={"meshIds": "meshId"}).dropna(subset=["meshId"])
+    crosswalk = crosswalk.reset_index(drop=True)
 
     # Join with MeSH hierarchy for tree numbers and levels
     crosswalk = crosswalk.merge(
         mesh_hierarchy.rename(columns={"mesh_id": "meshId"}),
         on="meshId",
-        how="inner"  # Only keep diseases that match C04.588 hierarchy
+        how="inner"  # Only keep diseases that match the MeSH hierarchy
     )
 
     # Dedupe: one row per (disease, meshId), keep most general (lowest level number)
+    keys = ["diseaseId", "meshId"]
+    if "hierarchy" in crosswalk.columns:
+        keys = ["hierarchy"] + keys
     crosswalk = crosswalk.sort_values('level', ascending=True)
     crosswalk = crosswalk.drop_duplicates(
-        subset=['diseaseId', 'meshId'],
+        subset=keys,
         keep='first'
-    ).sort_values(['diseaseId', 'level'])
+    ).sort_values(keys[:-2] + ['diseaseId', 'level'])
 
     return crosswalk
 
 
+def aggregate_gene_mesh(
+    associations: pd.DataFrame,
+    crosswalk: pd.DataFrame,
+    aggregators: list[str] | None = None
+) -> pd.DataFrame:
+    """
+    Aggregate associations by (gene, meshId): MAX score, SUM evidenceCount.
+
+    The aggregate only depends on which diseases map to a MeSH term, not on
+    the branch the term sits in, so one pass serves every hierarchy. It also
+    carries the number of contributing OT associations (associationCount),
+    which the summaries stage rolls up instead of re-reading associations.
+
+    A crosswalk with an 'area' column (several therapeutic areas) is
+    aggregated per (area, gene, meshId). aggregators (see aggregators.py)
+    add one score-variant column each.
+    """
+    pairs = crosswalk[_pair_columns(crosswalk)].drop_duplicates()
+
+    # Filter associations to cancer diseases with MeSH
+    disease_ids = set(pairs["diseaseId"])
+    cancer_assoc = associations[associations["diseaseId"].isin(disease_ids)]
+
+    # Join with crosswalk
+    joined = cancer_assoc.merge(pairs, on="diseaseId", how="inner")
+
+    keys = _group_keys(pairs, ["targetId", "meshId"])
+    aggregate = _partial_aggregate(joined, keys, bool(aggregators), sort=True).reset_index()
+    if not aggregators:
+        return aggregate
+    top = top_rows(joined[keys + ["score"]], keys, top_n(aggregators)) if top_n(aggregators) else None
+    return apply_aggregators(aggregate, top, keys, aggregators)
+
+
+def _pair_columns(crosswalk: pd.DataFrame) -> list[str]:
+    """Crosswalk columns an association joins to (with the area, if any)."""
+    return (["area"] if "area" in crosswalk.columns else []) + ["diseaseId", "meshId"]
+
+
+def _group_keys(pairs: pd.DataFrame, keys: list[str]) -> list[str]:
+    """Aggregate keys, per area when the pairs carry one."""
+    return (["area"] if "area" in pairs.columns else []) + keys
+
+
+def _partial_aggregate(
+    joined: pd.DataFrame, keys: list[str], with_sum: bool = False, sort: bool = False
+) -> pd.DataFrame:
+    """MAX score, SUM evidenceCount and row count by keys (plus SUM score)."""
+    columns = {
+        "score": ("score", "max"),
+        "evidenceCount": ("evidenceCount", "sum"),
+        "associationCount": ("score", "size"),
+    }
+    if with_sum:
+        columns["scoreSum"] = ("score", "sum")
+    return joined.groupby(keys, sort=sort).agg(**columns)
+
+
+def _combine_partials(partials: list[pd.DataFrame]) -> pd.DataFrame:
+    """Merge partial aggregates indexed by their group keys."""
+    return pd.concat(partials).groupby(level=list(partials[0].index.names)).agg(
+        {column: "max" if column == "score" else "sum" for column in partials[0].columns}
+    )
+
+
+def _reduce_stream(
+    batches,
+    pairs: pd.DataFrame,
+    keys: list[str],
+    compact_rows: int,
+    aggregators: list[str] | None = None
+) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
+    """
+    Join each batch with (diseaseId, meshId) pairs and reduce it by keys.
+
+    Partials are merged whenever they grow past compact_rows (or twice the
+    size of the last merge), so memory is bounded by the number of distinct
+    keys rather than the number of associations. With aggregators, the
+    partials also sum scores and keep the top_n scores of every key.
+
+    Returns:
+        (aggregate indexed by keys (score, evidenceCount, associationCount,
+        scoreSum with aggregators) or None if no rows matched; top_rows of
+        every key, or None)
+    """
+    aggregators = aggregators or []
+    n_top = top_n(aggregators)
+    partials, tops, pending, threshold = [], [], 0, compact_rows
+    for batch in batches:
+        joined = batch.merge(pairs, on="diseaseId", how="inner")
+        partial = _partial_aggregate(joined, keys, bool(aggregators))
+        partials.append(partial)
+        if n_top:
+            tops.append(top_rows(joined[keys + ["score"]], keys, n_top))
+        pending += len(partial)
+        if pending > threshold:
+            partials = [_combine_partials(partials)]
+            if n_top:
+                tops = [top_rows(pd.concat(tops), keys, n_top)]
+            pending = len(partials[0])
+            threshold = max(compact_rows, 2 * pending)
+
+    if not partials:
+        return None, None
+    top = top_rows(pd.concat(tops), keys, n_top) if n_top else None
+    return _combine_partials(partials), top
+
+
+def stream_aggregate_gene_mesh(
+    batches,
+    crosswalk: pd.DataFrame,
+    compact_rows: int = COMPACT_ROWS,
+    aggregators: list[str] | None = None
+) -> pd.DataFrame:
+    """
+    aggregate_gene_mesh over a stream of association batches.
+
+    Each batch is joined and reduced to a partial aggregate, so memory is
+    bounded by the number of distinct (gene, meshId) pairs rather than the
+    number of associations. max and sum are associative, so the result
+    equals aggregate_gene_mesh.
+
+    Args:
+        batches: Iterable of association DataFrames (iter_association_batches)
+        crosswalk: Disease → MeSH crosswalk (diseaseId, meshId)
+        compact_rows: Partial-aggregate rows that trigger a merge
+        aggregators: Extra score aggregators (pipeline.aggregators)
+
+    Returns:
+        Same columns and row order as aggregate_gene_mesh
+    """
+    pairs = crosswalk[_pair_columns(crosswalk)].drop_duplicates()
+    keys = _group_keys(pairs, ["targetId", "meshId"])
+
+    reduced, top = _reduce_stream(batches, pairs, keys, compact_rows, aggregators)
+    if reduced is None:
+        return aggregate_gene_mesh(pd.DataFrame(columns=ASSOCIATION_COLUMNS), pairs, aggregators)
+    if not aggregators:
+        return reduced.reset_index()
+    return apply_aggregators(reduced.reset_index(), top, keys, aggregators)
+
+
+def stream_aggregate_datatypes(
+    batches,
+    crosswalk: pd.DataFrame,
+    datatypes: list[str] | None = None,
+    compact_rows: int = COMPACT_ROWS
+) -> pd.DataFrame:
+    """
+    Per-datatype score and evidence per (gene, meshId), pivoted column-wise.
+
+    Rows are reduced in long form by (targetId, meshId, datatypeId) with the
+    same MAX score / SUM evidenceCount as aggregate_gene_mesh. Each datatype
+    is then scattered into its own pair of columns by integer key codes, so
+    memory grows by one column pair per datatype instead of materialising a
+    wide pivot_table.
+
+    Args:
+        batches: Iterable of DATATYPE_COLUMNS DataFrames
+        crosswalk: Disease → MeSH crosswalk (diseaseId, meshId)
+        datatypes: Column order (default: datatypes present, sorted)
+        compact_rows: Partial-aggregate rows that trigger a merge
+
+    Returns:
+        DataFrame: targetId, meshId, then <datatype>_score (NaN if no
+        evidence of that type) and <datatype>_evidence per datatype
+    """
+    import numpy as np
+
+    pairs = crosswalk[["diseaseId", "meshId"]].drop_duplicates()
+    reduced, _ = _reduce_stream(batches, pairs, ["targetId", "meshId", "datatypeId"], compact_rows)
+    if reduced is None:
+        return pd.DataFrame(columns=["targetId", "meshId"])
+
+    long = reduced.reset_index()
+    codes = long.groupby(["targetId", "meshId"], sort=True).ngroup().to_numpy()
+    result = long[["targetId", "meshId"]].drop_duplicates().sort_values(["targetId", "meshId"])
+    result = result.reset_index(drop=True)
+
+    datatype_values = long["datatypeId"].to_numpy()
+    scores = long["score"].to_numpy()
+    evidence = long["evidenceCount"].to_numpy()
+    for datatype in datatypes or sorted(long["datatypeId"].unique()):
+        mask = datatype_values == datatype
+        score_col = np.full(len(result), np.nan)
+        score_col[codes[mask]] = scores[mask]
+        evidence_col = np.zeros(len(result), dtype="int64")
+        evidence_col[codes[mask]] = evidence[mask]
+        result[f"{datatype}_score"] = score_col
+        result[f"{datatype}_evidence"] = evidence_col
+
+    return result
+
+
+def add_mesh_level(gene_mesh: pd.DataFrame, mesh_hierarchy: pd.DataFrame) -> pd.DataFrame:
+    """
+    Restrict a gene-mesh aggregate to one hierarchy and add meshLevel.
+
+    meshLevel is the min level for meshIds with multiple tree positions
+    in that hierarchy.
+    """
+    mesh_levels = mesh_hierarchy.groupby('mesh_id')['level'].min().reset_index()
+    mesh_levels.columns = ['meshId', 'meshLevel']
+    return gene_mesh.merge(mesh_levels, on='meshId', how='inner')
+
+
 def build_final_dataset(
     associations: pd.DataFrame,
     cancer_diseases: pd.DataFrame,
     crosswalk: pd.DataFrame,
-    mesh_hierarchy: pd.DataFrame
+    mesh_hierarchy: pd.DataFrame,
+    aggregators: list[str] | None = None
 ) -> pd.DataFrame:
     """
     Build final gene-mesh dataset aggregated by (gene, mesh).
 
-    Returns 5-column output:
+    Returns 6-column output (plus one column per aggregator):
     - meshId (disease)
     - targetId (gene - Ensembl)
     - score (max across diseases)
     - evidenceCount (sum across diseases)
+    - associationCount (OT disease-gene associations aggregated)
     - meshLevel (hierarchy depth, 2-9)
     """
-    # Filter associations to cancer diseases with MeSH
-    disease_ids = set(crosswalk["diseaseId"])
-    cancer_assoc = associations[associations["diseaseId"].isin(disease_ids)].copy()
+    final = aggregate_gene_mesh(associations, crosswalk, aggregators)
+    return add_mesh_level(final, mesh_hierarchy)
 
-    # Join with crosswalk
-    joined = cancer_assoc.merge(
-        crosswalk[["diseaseId", "meshId"]],
-        on="diseaseId",
-        how="inner"
-    )
 
-    # Aggregate by (gene, meshId): MAX score, SUM evidenceCount
-    final = joined.groupby(["targetId", "meshId"]).agg({
-        "score": "max",
-        "evidenceCount": "sum"
-    }).reset_index()
+def dataset_metadata(inputs: dict, dataset: str) -> dict:
+    """Intermediate metadata for outputs of one association dataset (drops the others)."""
+    datasets = set(ASSOCIATION_DATASETS.values()) | {DATATYPE_DATASET}
+    return output_metadata({
+        name: entry for name, entry in inputs.items()
+        if name not in datasets or name == dataset
+    })
 
-    # Add mesh level (min level for meshIds with multiple tree positions)
-    mesh_levels = mesh_hierarchy.groupby('mesh_id')['level'].min().reset_index()
-    mesh_levels.columns = ['meshId', 'meshLevel']
-    final = final.merge(mesh_levels, on='meshId', how='left')
 
-    return final
+def datatype_settings(config: dict) -> tuple[bool, list[str] | None]:
+    """pipeline.datatype_breakdown and pipeline.datatypes (None = all present)."""
+    pipeline = config.get("pipeline", {})
+    return pipeline.get("datatype_breakdown", False), pipeline.get("datatypes")
+
+
+def build_datatype_outputs(
+    config: dict,
+    datatype_mesh: pd.DataFrame,
+    hierarchies: dict[str, pd.DataFrame],
+    verbose: bool = True,
+    metadata: dict | None = None
+) -> dict[str, pd.DataFrame]:
+    """
+    Write the per-hierarchy datatype breakdown intermediates
+    (gene_mesh_datatypes{suffix}).
+
+    Args:
+        config: Configuration dict
+        datatype_mesh: stream_aggregate_datatypes output
+        hierarchies: Dict of prefix -> MeSH hierarchy
+        verbose: Print progress messages
+        metadata: Key-value metadata for the intermediates
+
+    Returns:
+        Dict of prefix -> breakdown with meshLevel
+    """
+    prefixes = list(hierarchies)
+    outputs = {}
+    for prefix, mesh_hierarchy in hierarchies.items():
+        suffix = hierarchy_suffix(prefixes, prefix)
+        breakdown = add_mesh_level(datatype_mesh, mesh_hierarchy)
+        write_intermediate(breakdown, config, f"gene_mesh_datatypes{suffix}", metadata=metadata)
+        if verbose:
+            print(f"    {prefix}: {len(breakdown):,} gene-mesh pairs with datatype scores")
+        outputs[prefix] = breakdown
+    return outputs
+
+
+def build_outputs(
+    config: dict,
+    combined: pd.DataFrame,
+    hierarchies: dict[str, pd.DataFrame],
+    gene_mesh: pd.DataFrame,
+    verbose: bool = True,
+    metadata: dict | None = None,
+    assoc_type: str = "direct",
+    area: str = ""
+) -> dict:
+    """
+    Write the per-hierarchy Step 2 outputs for one association type.
+
+    Args:
+        config: Configuration dict
+        combined: Combined crosswalk (build_disease_mesh_crosswalk over
+            combine_hierarchies)
+        hierarchies: Dict of prefix -> MeSH hierarchy
+        gene_mesh: (gene, meshId) aggregate over all hierarchies
+            (aggregate_gene_mesh / stream_aggregate_gene_mesh)
+        verbose: Print progress messages
+        metadata: Key-value metadata for the intermediates
+            (catalog.output_metadata)
+        assoc_type: Association type; non-direct outputs get its suffix
+        area: Therapeutic-area suffix (config.area_suffix), after the
+            type suffix and before the hierarchy one
+
+    Returns:
+        Dict with output dataframes for the primary hierarchy, plus
+        "hierarchies": {prefix: {"crosswalk", "final", "mesh_hierarchy"}}
+    """
+    crosswalks_dir = ensure_dir(Path(config["paths"]["processed_dir"]) / "crosswalks")
+    prefixes = list(hierarchies)
+    type_suffix = association_suffix(assoc_type)
+    generate_summaries = config.get("pipeline", {}).get("generate_summaries", False)
+
+    outputs = {}
+    for prefix, mesh_hierarchy in hierarchies.items():
+        suffix = hierarchy_suffix(prefixes, prefix)
+
+        # The crosswalk does not depend on the association type
+        crosswalk = combined[combined["hierarchy"] == prefix].drop(columns="hierarchy")
+        crosswalk.to_csv(crosswalks_dir / f"disease_mesh_crosswalk{area}{suffix}.csv", index=False)
+
+        final = add_mesh_level(gene_mesh, mesh_hierarchy)
+        # Save intermediate (before Entrez)
+        write_intermediate(final, config, f"gene_mesh_pre_entrez{type_suffix}{area}{suffix}", metadata=metadata)
+        if verbose:
+            print(f"    {prefix}: {len(crosswalk)} disease-mesh pairs, {len(final):,} gene-mesh pairs")
+
+        outputs[prefix] = {
+            "crosswalk": crosswalk,
+            "final": final,
+            "mesh_hierarchy": mesh_hierarchy
+        }
+
+        # Summaries are rollups of the aggregate just built (no extra scan)
+        if generate_summaries:
+            summaries = summarize(final, crosswalk)
+            write_summaries(summaries, config, type_suffix + area + suffix)
+            outputs[prefix]["summaries"] = summaries
+
+    return {**outputs[prefixes[0]], "hierarchies": outputs}
 
 
 def run(config: dict | None = None, verbose: bool = True) -> dict:
     """
     Run the crosswalk building pipeline step.
 
+    Every hierarchy in mesh.hierarchies is extracted in one pass over
+    d2025.bin, and each association type in pipeline.association_type is
+    aggregated from one streaming scan. Each hierarchy gets its own
+    crosswalk CSV, and each (type, hierarchy) its own gene-mesh
+    intermediate (indirect ones suffixed "_indirect").
+
+    With several opentargets.therapeutic_areas, the hierarchies of all
+    areas are extracted together and each scan covers the diseases of every
+    area at once, aggregated per (area, gene, meshId); non-primary areas
+    get their name as a suffix (e.g. gene_mesh_pre_entrez_cardiovascular).
+
     Args:
         config: Configuration dict (loads from file if None)
         verbose: Print progress messages
 
     Returns:
-        Dict with output dataframes
+        Dict with output dataframes for the primary area, association type
+        and hierarchy, plus "hierarchies": {prefix: {"crosswalk", "final",
+        "mesh_hierarchy"}}, "association_types": {type: same dict},
+        with pipeline.datatype_breakdown, "datatypes": {prefix: breakdown}
+        (primary area) and, with several areas, "areas": {name: {type: same
+        dict}}
     """
     if config is None:
         config = load_config()
 
-    processed_dir = ensure_dir(Path(config["paths"]["processed_dir"]))
-    crosswalks_dir = ensure_dir(processed_dir / "crosswalks")
+    areas = get_therapeutic_areas(config)
+    prefixes = list(dict.fromkeys(p for area in areas for p in area["hierarchies"]))
+    assoc_types = get_association_types(config)
+    aggregators = get_aggregators(config)
 
     if verbose:
         print("Step 2: Building gene-disease-MeSH crosswalk")
         print("-" * 40)
 
-    # Load cancer diseases
-    if verbose:
-        print("  Loading cancer diseases...")
-    cancer_diseases = load_cancer_diseases(config)
-    if verbose:
-        print(f"    {len(cancer_diseases):,} diseases")
+    with_datatypes, datatypes = datatype_settings(config)
 
-    # Extract MeSH hierarchy LIVE from d2025.bin
-    if verbose:
-        print("  Extracting MeSH C04.588 hierarchy...")
-    mesh_hierarchy = extract_mesh_hierarchy(config, prefix="C04.588", verbose=False)
-    if verbose:
-        print(f"    {len(mesh_hierarchy)} tree paths, {mesh_hierarchy['mesh_id'].nunique()} terms")
+    datasets = [ASSOCIATION_DATASETS[t] for t in assoc_types]
+    if with_datatypes:
+        datasets.append(DATATYPE_DATASET)
+    inputs = preflight(config, ["disease", "mesh"] + datasets, verbose)
 
-    # Load associations
+    # Load each area's diseases
     if verbose:
-        print("  Loading associations...")
-    associations = load_associations(config)
+        print(f"  Loading {', '.join(a['name'] for a in areas)} diseases...")
+    area_diseases = {
+        area["name"]: load_cancer_diseases(config, area_suffix(areas, area["name"])) for area in areas
+    }
     if verbose:
-        print(f"    {len(associations):,} associations")
+        for name, diseases in area_diseases.items():
+            print(f"    {name}: {len(diseases):,} diseases")
 
-    # Build crosswalk
+    # Extract MeSH hierarchies LIVE from d2025.bin
     if verbose:
-        print("  Building disease → MeSH crosswalk...")
-    crosswalk = build_disease_mesh_crosswalk(cancer_diseases, mesh_hierarchy)
-    crosswalk.to_csv(crosswalks_dir / "disease_mesh_crosswalk.csv", index=False)
+        print(f"  Extracting MeSH {', '.join(prefixes)} hierarchy...")
+    hierarchies = extract_mesh_hierarchies(config, prefixes=prefixes, verbose=False)
     if verbose:
-        print(f"    {len(crosswalk)} disease-mesh pairs")
-        print(f"    {crosswalk['diseaseId'].nunique()} diseases, {crosswalk['meshId'].nunique()} MeSH terms")
+        for prefix, mesh_hierarchy in hierarchies.items():
+            print(f"    {prefix}: {len(mesh_hierarchy)} tree paths, {mesh_hierarchy['mesh_id'].nunique()} terms")
 
-    # Build final aggregated dataset
+    # Build combined crosswalk (one per area)
     if verbose:
-        print("  Building gene-mesh dataset...")
-    final = build_final_dataset(associations, cancer_diseases, crosswalk, mesh_hierarchy)
+        print("  Building disease → MeSH crosswalk...")
+    area_hierarchies = {
+        area["name"]: {prefix: hierarchies[prefix] for prefix in area["hierarchies"]} for area in areas
+    }
+    combined = {
+        name: build_disease_mesh_crosswalk(area_diseases[name], combine_hierarchies(area_hierarchies[name]))
+        for name in area_diseases
+    }
     if verbose:
-        print(f"    {len(final):,} gene-mesh pairs")
-
-    # Save intermediate (before Entrez)
-    final.to_parquet(processed_dir / "intermediate" / "gene_mesh_pre_entrez.parquet", index=False)
+        for name, area_combined in combined.items():
+            label = f"{name}: " if len(areas) > 1 else ""
+            print(f"    {label}{area_combined[['diseaseId', 'meshId']].drop_duplicates().shape[0]} disease-mesh pairs")
+            print(f"    {label}{area_combined['diseaseId'].nunique()} diseases, "
+                  f"{area_combined['meshId'].nunique()} MeSH terms")
+
+    # One scan serves every area: its pairs carry the area name
+    primary = areas[0]["name"]
+    if len(areas) > 1:
+        scan_crosswalk = pd.concat(
+            [c[["diseaseId", "meshId"]].assign(area=name) for name, c in combined.items()],
+            ignore_index=True
+        )
+    else:
+        scan_crosswalk = combined[primary]
+
+    scan_diseases = set().union(*(set(scan_pairs(d)["diseaseId"]) for d in area_diseases.values()))
+
+    results = {area["name"]: {} for area in areas}
+    for assoc_type in assoc_types:
+        dataset = ASSOCIATION_DATASETS[assoc_type]
+
+        # Stream associations (only the diseases with a MeSH xref) and
+        # aggregate once for all hierarchies
+        if verbose:
+            print(f"  Aggregating {assoc_type} associations ({dataset})...")
+        batches = SketchingBatches(iter_association_batches(
+            config,
+            disease_ids=scan_diseases,
+            columns=ASSOCIATION_COLUMNS,
+            assoc_type=assoc_type
+        ))
+        gene_mesh = stream_aggregate_gene_mesh(batches, scan_crosswalk, aggregators=aggregators)
+        sketch_path = save_sketch(batches.sketch, config, association_suffix(assoc_type))
+        if verbose:
+            print(f"    {gene_mesh['associationCount'].sum():,} associations → {len(gene_mesh):,} gene-mesh pairs")
+            print(f"    Sketch: {sketch_path}")
+
+        for area in areas:
+            name = area["name"]
+            area_gene_mesh = gene_mesh
+            if len(areas) > 1:
+                if verbose:
+                    print(f"    {name}:")
+                area_gene_mesh = gene_mesh[gene_mesh["area"] == name].drop(columns="area").reset_index(drop=True)
+            results[name][assoc_type] = build_outputs(
+                config, combined[name], area_hierarchies[name], area_gene_mesh, verbose,
+                metadata=dataset_metadata(inputs, dataset), assoc_type=assoc_type,
+                area=area_suffix(areas, name)
+            )
+
+    output = {**results[primary][assoc_types[0]], "association_types": results[primary]}
+    if len(areas) > 1:
+        output["areas"] = results
+
+    # Optional per-datatype breakdown (direct associations, primary area)
+    if with_datatypes:
+        if verbose:
+            print(f"  Aggregating per-datatype scores ({DATATYPE_DATASET})...")
+        batches = iter_association_batches(
+            config,
+            disease_ids=set(combined[primary]["diseaseId"]),
+            columns=DATATYPE_COLUMNS,
+            dataset=DATATYPE_DATASET,
+            datatypes=datatypes
+        )
+        datatype_mesh = stream_aggregate_datatypes(batches, combined[primary], datatypes)
+        output["datatypes"] = build_datatype_outputs(
+            config, datatype_mesh, area_hierarchies[primary], verbose,
+            metadata=dataset_metadata(inputs, DATATYPE_DATASET)
+        )
 
     if verbose:
         print("  Done!")
 
-    return {
-        "crosswalk": crosswalk,
-        "final": final,
-        "mesh_hierarchy": mesh_hierarchy
-    }
+    return output
 
 
 def main():
     """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Step 2: build gene-disease-MeSH crosswalk")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
     config = load_config()
-    run(config, verbose=True)
+    with profile_step("build_crosswalk", config, enabled=args.profile):
+        run(config, verbose=True)
 
 
 if __name__ == "__main__":
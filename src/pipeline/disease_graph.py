@@ -0,0 +1,109 @@
+"""
+EFO/MONDO disease graph as integer adjacency arrays.
+
+Diseases are numbered 0..n-1 and the parent lists from the OT disease index
+become CSR arrays:
+
+    offsets  start of each disease's parents in parents    (n + 1,)
+    parents  parent disease numbers, grouped by child       (m,)
+
+Parents outside the indexed diseases (e.g. the therapeutic-area root, which
+Step 1 drops) are left out.
+
+nearest_mapped() finds, for every disease, its closest ancestors that have a
+MeSH xref. It is one pass in topological order (parents before children)
+where each disease reuses its parents' already computed answers, so no
+disease's ancestry is walked more than once.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class DiseaseGraph:
+    """Disease → parents, CSR layout (see module docstring)."""
+
+    ids: np.ndarray
+    offsets: np.ndarray
+    parents: np.ndarray
+
+    @classmethod
+    def from_frame(cls, diseases: pd.DataFrame, id_column: str = "id", parents_column: str = "parents") -> "DiseaseGraph":
+        """Build from a disease index frame with an ID and a parent-ID list column."""
+        ids = diseases[id_column].to_numpy()
+        index = pd.Index(ids)
+
+        edges = diseases[parents_column].reset_index(drop=True).explode().dropna()
+        children = edges.index.to_numpy(dtype="int64")
+        parents = index.get_indexer(edges.to_numpy())
+        known = parents >= 0
+        children, parents = children[known], parents[known]
+
+        # explode keeps rows in order, so children is already grouped
+        counts = np.bincount(children, minlength=len(ids))
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype("int64")
+        return cls(ids=ids, offsets=offsets, parents=parents.astype("int64"))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def parents_of(self, node: int) -> np.ndarray:
+        return self.parents[self.offsets[node]:self.offsets[node + 1]]
+
+    def topological_order(self) -> np.ndarray:
+        """
+        Disease numbers with every parent before its children (Kahn's
+        algorithm, one frontier at a time). Diseases on a cycle are left out.
+        """
+        children_of = np.repeat(np.arange(len(self)), np.diff(self.offsets))
+        by_parent = np.argsort(self.parents, kind="stable")
+        child_sorted = children_of[by_parent]
+        child_offsets = np.concatenate(([0], np.cumsum(np.bincount(self.parents, minlength=len(self)))))
+
+        pending = np.diff(self.offsets).copy()
+        frontier = np.flatnonzero(pending == 0)
+        order = []
+        while len(frontier):
+            order.append(frontier)
+            starts, stops = child_offsets[frontier], child_offsets[frontier + 1]
+            sizes = stops - starts
+            reached = child_sorted[np.repeat(starts - (np.cumsum(sizes) - sizes), sizes) + np.arange(sizes.sum())]
+            np.subtract.at(pending, reached, 1)
+            reached = np.unique(reached)
+            frontier = reached[pending[reached] == 0]
+        return np.concatenate(order) if order else np.array([], dtype="int64")
+
+    def nearest_mapped(self, mapped: np.ndarray) -> tuple[np.ndarray, list[tuple]]:
+        """
+        Closest mapped ancestors of every disease.
+
+        Args:
+            mapped: Boolean per disease, True where it has its own MeSH xref
+
+        Returns:
+            (distance, sources): distance is 0 for mapped diseases, the number
+            of parent steps to the nearest mapped ancestor(s) otherwise, and
+            -1 when there is none; sources holds those ancestors' numbers
+            (the disease itself when mapped, () when none). Ties at the same
+            distance are all kept.
+        """
+        distance = np.full(len(self), -1, dtype="int64")
+        sources: list[tuple] = [()] * len(self)
+
+        for node in self.topological_order():
+            if mapped[node]:
+                distance[node] = 0
+                sources[node] = (node,)
+                continue
+            parents = self.parents_of(node)
+            reached = parents[distance[parents] >= 0]
+            if not len(reached):
+                continue
+            nearest = distance[reached].min()
+            distance[node] = nearest + 1
+            sources[node] = tuple(sorted({s for p in reached[distance[reached] == nearest] for s in sources[p]}))
+
+        return distance, sources
@@ -0,0 +1,124 @@
+"""
+Array-indexed Ensembl → Entrez mapping.
+
+Ensembl gene IDs (ENSG00000141510) are parsed to their integer part and
+the gene2ensembl pairs are stored CSR-style as three NumPy arrays:
+
+    keys     sorted unique Ensembl numbers                  (n,)
+    offsets  start of each key's Entrez IDs in values       (n + 1,)
+    values   Entrez IDs, grouped by key, in file order      (m,)
+
+A lookup is one searchsorted over keys. One-to-one policies are then a
+take on a per-key array, and the one-to-many expansion is a repeat over
+the offsets, so mapping every gene-mesh pair is a vectorized gather
+instead of a string merge.
+
+Duplicate policies (ncbi.duplicate_policy) for Ensembl genes with several
+Entrez IDs:
+- all:    one output row per Entrez ID (default)
+- first:  first Entrez ID in gene2ensembl order (the previous behaviour)
+- min:    lowest Entrez ID
+- unique: drop ambiguous genes
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+DUPLICATE_POLICIES = ("all", "first", "min", "unique")
+
+
+def parse_ensembl_ids(ids) -> np.ndarray:
+    """
+    Integer part of human Ensembl gene IDs ("ENSG00000141510.12" → 141510).
+
+    Returns:
+        int64 array; -1 where the ID is missing or not an ENSG ID
+    """
+    s = pd.Series(ids, dtype="string")
+    numeric = s.str.extract(r"^ENSG(\d+)(?:\.\d+)?$", expand=False)
+    return pd.to_numeric(numeric, errors="coerce").fillna(-1).to_numpy(dtype="int64")
+
+
+@dataclass
+class EntrezIndex:
+    """Ensembl number → Entrez IDs, CSR layout (see module docstring)."""
+
+    keys: np.ndarray
+    offsets: np.ndarray
+    values: np.ndarray
+
+    @classmethod
+    def from_frame(cls, entrez_map: pd.DataFrame) -> "EntrezIndex":
+        """Build from a load_gene2ensembl DataFrame (ensemblGeneId, entrezGeneId)."""
+        ensembl = parse_ensembl_ids(entrez_map["ensemblGeneId"])
+        entrez = pd.to_numeric(entrez_map["entrezGeneId"], errors="coerce").to_numpy()
+        valid = (ensembl >= 0) & ~np.isnan(entrez)
+        ensembl, entrez = ensembl[valid], entrez[valid].astype("int64")
+
+        # Stable, so each key keeps its Entrez IDs in file order
+        order = np.argsort(ensembl, kind="stable")
+        ensembl, entrez = ensembl[order], entrez[order]
+
+        keys, starts = np.unique(ensembl, return_index=True)
+        offsets = np.append(starts, len(ensembl)).astype("int64")
+        return cls(keys=keys, offsets=offsets, values=entrez)
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Number of Entrez IDs per key."""
+        return np.diff(self.offsets)
+
+    def positions(self, ensembl: np.ndarray) -> np.ndarray:
+        """Key position of each Ensembl number, -1 if unmapped."""
+        if not len(self.keys):
+            return np.full(len(ensembl), -1)
+        pos = np.minimum(np.searchsorted(self.keys, ensembl), len(self.keys) - 1)
+        return np.where(self.keys[pos] == ensembl, pos, -1)
+
+    def per_key(self, policy: str) -> np.ndarray:
+        """One Entrez ID per key for a one-to-one policy (-1 = drop)."""
+        if not len(self.keys):
+            return self.values[:0]
+        starts = self.offsets[:-1]
+        if policy == "first":
+            return self.values[starts]
+        if policy == "min":
+            return np.minimum.reduceat(self.values, starts)
+        if policy == "unique":
+            return np.where(self.counts == 1, self.values[starts], -1)
+        raise ValueError(f"Unknown duplicate policy: {policy!r} (expected one of {', '.join(DUPLICATE_POLICIES)})")
+
+    def lookup(self, ensembl_ids, policy: str = "all") -> tuple[np.ndarray, np.ndarray]:
+        """
+        Map Ensembl IDs to Entrez IDs.
+
+        Args:
+            ensembl_ids: Ensembl gene IDs (strings)
+            policy: Duplicate policy (DUPLICATE_POLICIES)
+
+        Returns:
+            (rows, entrez): row positions into ensembl_ids and the Entrez ID
+            for each output row. Unmapped rows are dropped; with "all", a row
+            appears once per Entrez ID. rows is non-decreasing.
+        """
+        if policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unknown duplicate policy: {policy!r} (expected one of {', '.join(DUPLICATE_POLICIES)})")
+
+        pos = self.positions(parse_ensembl_ids(ensembl_ids))
+        mapped = np.flatnonzero(pos >= 0)
+        pos = pos[mapped]
+
+        if policy != "all":
+            entrez = self.per_key(policy)[pos]
+            keep = entrez >= 0
+            return mapped[keep], entrez[keep]
+
+        # One-to-many: repeat each row by its key's count and gather the
+        # values between its offsets
+        counts = self.counts[pos]
+        rows = np.repeat(mapped, counts)
+        run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+        value_idx = np.repeat(self.offsets[pos], counts) + (np.arange(len(rows)) - run_starts)
+        return rows, self.values[value_idx]
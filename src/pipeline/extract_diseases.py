@@ -4,20 +4,30 @@ Pipeline Step 1: Extract cancer diseases from Open Targets.
 
 This module:
 1. Loads the disease index from Open Targets
-2. Filters to cancer diseases (ancestors contains EFO_0000616)
+2. Filters to cancer diseases (ancestors contains EFO_0000616), or to each
+   of opentargets.therapeutic_areas at once via per-disease bitsets
 3. Extracts MeSH IDs from dbXRefs
-4. Saves output for downstream processing
+4. Optionally (pipeline.inherit_mesh) gives diseases without a MeSH xref the
+   MeSH IDs of their nearest mapped ancestors in the EFO/MONDO graph
+5. Saves output for downstream processing (Parquet or Arrow IPC)
 """
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from src.utils.config import load_config, get_path, ensure_dir
+from src.utils.config import load_config, get_path, get_therapeutic_areas, area_suffix
+from src.utils.profiling import add_profile_argument, profile_step
+from src.utils.intermediate import write_intermediate
+from src.utils.catalog import preflight, output_metadata
+from src.utils.memo import memoize
+from src.pipeline.disease_graph import DiseaseGraph
 
 
+@memoize(inputs=lambda config: [Path(config["paths"]["opentargets_dir"]) / "disease"], ignore=("config",))
 def load_diseases(config: dict) -> pd.DataFrame:
     """Load the disease index from Parquet files."""
     disease_path = Path(config["paths"]["opentargets_dir"]) / "disease"
@@ -36,6 +46,34 @@ def load_diseases(config: dict) -> pd.DataFrame:
     return pd.concat(dfs, ignore_index=True)
 
 
+def area_membership(diseases: pd.DataFrame, area_ids: list[str]) -> np.ndarray:
+    """
+    Therapeutic-area membership of every disease as a bitset.
+
+    One pass over the exploded ancestors sets bit i when area_ids[i] is an
+    ancestor. An area's own root node is not a member of that area.
+
+    Args:
+        diseases: Disease index (id, ancestors)
+        area_ids: Therapeutic-area root IDs (at most 64)
+
+    Returns:
+        uint64 array aligned with diseases
+    """
+    areas = pd.Index(area_ids)
+    ancestors = diseases["ancestors"].reset_index(drop=True).explode().dropna()
+    bits = areas.get_indexer(ancestors.to_numpy())
+    hit = bits >= 0
+
+    masks = np.zeros(len(diseases), dtype="uint64")
+    np.bitwise_or.at(masks, ancestors.index.to_numpy()[hit], np.uint64(1) << bits[hit].astype("uint64"))
+
+    roots = areas.get_indexer(diseases["id"].to_numpy())
+    is_root = roots >= 0
+    masks[is_root] &= ~(np.uint64(1) << roots[is_root].astype("uint64"))
+    return masks
+
+
 def filter_cancer_diseases(
     diseases: pd.DataFrame,
     cancer_ta: str = "EFO_0000616"
@@ -48,20 +86,10 @@ def filter_cancer_diseases(
         cancer_ta: Therapeutic area ID for cancer (default: EFO_0000616)
 
     Returns:
-        Filtered dataframe with cancer diseases only
+        Filtered dataframe with cancer diseases only (the top-level
+        neoplasm node itself excluded)
     """
-    def has_neoplasm_ancestor(ancestors):
-        if ancestors is None or (isinstance(ancestors, float) and pd.isna(ancestors)):
-            return False
-        return cancer_ta in ancestors
-
-    mask = diseases["ancestors"].apply(has_neoplasm_ancestor)
-    filtered = diseases[mask].copy()
-
-    # Exclude the top-level neoplasm node itself
-    filtered = filtered[filtered["id"] != cancer_ta]
-
-    return filtered
+    return diseases[area_membership(diseases, [cancer_ta]) != 0].copy()
 
 
 def extract_mesh_ids(diseases: pd.DataFrame) -> pd.DataFrame:
@@ -90,26 +118,75 @@ def extract_mesh_ids(diseases: pd.DataFrame) -> pd.DataFrame:
     return result
 
 
-def run(config: dict | None = None, verbose: bool = True) -> pd.DataFrame:
+def inherit_mesh_ids(
+    result: pd.DataFrame,
+    diseases: pd.DataFrame,
+    max_distance: int | None = None
+) -> pd.DataFrame:
     """
-    Run the disease extraction pipeline step.
+    Fill missing MeSH IDs from the nearest ancestors that have them.
+
+    Args:
+        result: extract_mesh_ids output (diseaseId, diseaseName, meshIds)
+        diseases: The same diseases from the disease index (id, parents)
+        max_distance: Only inherit from ancestors at most this many parent
+            steps away (None = any)
+
+    Returns:
+        result with meshIds filled in and two more columns:
+        - meshInheritanceDistance: 0 for an own xref, k for MeSH IDs inherited
+          from ancestors k parent steps up, <NA> when unmapped
+        - meshInheritedFrom: IDs of the ancestors inherited from (None for
+          own xrefs and unmapped diseases)
+    """
+    graph = DiseaseGraph.from_frame(diseases)
+    mesh_ids = result["meshIds"].to_numpy()
+    distance, sources = graph.nearest_mapped(result["meshIds"].notna().to_numpy())
+    if max_distance is not None:
+        distance = np.where(distance > max_distance, -1, distance)
+
+    inherited = np.flatnonzero(distance > 0)
+    filled = mesh_ids.copy()
+    inherited_from = np.full(len(result), None, dtype=object)
+    for node in inherited:
+        filled[node] = list(dict.fromkeys(m for s in sources[node] for m in mesh_ids[s]))
+        inherited_from[node] = [graph.ids[s] for s in sources[node]]
+
+    result = result.copy()
+    result["meshIds"] = filled
+    result["meshInheritanceDistance"] = pd.array(np.where(distance >= 0, distance, None), dtype="Int64")
+    result["meshInheritedFrom"] = inherited_from
+    return result
+
+
+def run_areas(config: dict | None = None, verbose: bool = True) -> dict[str, pd.DataFrame]:
+    """
+    Extract the diseases of every therapeutic area in one pass.
+
+    Membership in all areas (opentargets.therapeutic_areas) is computed at
+    once as per-disease bitsets; each area then gets its own intermediate
+    (cancer_diseases_mesh_crosswalk, suffixed for non-primary areas, e.g.
+    cancer_diseases_mesh_crosswalk_cardiovascular).
 
     Args:
         config: Configuration dict (loads from file if None)
         verbose: Print progress messages
 
     Returns:
-        DataFrame with cancer diseases and MeSH mappings
+        Dict of area name -> DataFrame with the area's diseases and MeSH mappings
     """
     if config is None:
         config = load_config()
 
-    cancer_ta = config.get("opentargets", {}).get("cancer_therapeutic_area", "EFO_0000616")
+    areas = get_therapeutic_areas(config)
+    pipeline_config = config.get("pipeline", {})
 
     if verbose:
-        print("Step 1: Extracting cancer diseases")
+        print(f"Step 1: Extracting {', '.join(a['name'] for a in areas)} diseases")
         print("-" * 40)
 
+    inputs = preflight(config, ["disease"], verbose)
+
     # Load diseases
     if verbose:
         print("  Loading disease index...")
@@ -117,37 +194,71 @@ def run(config: dict | None = None, verbose: bool = True) -> pd.DataFrame:
     if verbose:
         print(f"    {len(diseases):,} total diseases")
 
-    # Filter to cancer
-    if verbose:
-        print("  Filtering to cancer diseases...")
-    cancer_diseases = filter_cancer_diseases(diseases, cancer_ta)
+    # Membership in every area at once
     if verbose:
-        print(f"    {len(cancer_diseases):,} cancer diseases")
+        print(f"  Filtering to {', '.join(a['id'] for a in areas)}...")
+    masks = area_membership(diseases, [a["id"] for a in areas])
+
+    results = {}
+    for bit, area in enumerate(areas):
+        area_diseases = diseases[(masks >> np.uint64(bit)) & np.uint64(1) == 1]
+        if verbose:
+            print(f"  {area['name']}: {len(area_diseases):,} diseases")
+
+        # Extract MeSH IDs
+        result = extract_mesh_ids(area_diseases)
+        with_mesh = result["meshIds"].notna().sum()
+        if verbose:
+            print(f"    {with_mesh:,} with MeSH ({with_mesh / max(len(result), 1) * 100:.1f}%)")
+
+        if pipeline_config.get("inherit_mesh", False):
+            result = inherit_mesh_ids(result, area_diseases, pipeline_config.get("max_inheritance_distance"))
+            if verbose:
+                distances = result["meshInheritanceDistance"]
+                inherited = (distances > 0).sum()
+                print(f"    {inherited:,} inherited from mapped ancestors "
+                      f"(max distance {distances.max() if inherited else 0}), "
+                      f"{result['meshIds'].notna().sum():,} with MeSH")
+
+        # Save output
+        suffix = area_suffix(areas, area["name"])
+        output_path = write_intermediate(
+            result, config, f"cancer_diseases_mesh_crosswalk{suffix}", metadata=output_metadata(inputs)
+        )
+        if verbose:
+            print(f"    Saved: {output_path}")
 
-    # Extract MeSH IDs
-    if verbose:
-        print("  Extracting MeSH IDs...")
-    result = extract_mesh_ids(cancer_diseases)
+        results[area["name"]] = result
 
-    with_mesh = result["meshIds"].notna().sum()
-    if verbose:
-        print(f"    {with_mesh:,} with MeSH ({with_mesh/len(result)*100:.1f}%)")
+    return results
 
-    # Save output
-    output_dir = ensure_dir(Path(config["paths"]["processed_dir"]) / "intermediate")
-    output_path = output_dir / "cancer_diseases_mesh_crosswalk.parquet"
-    result.to_parquet(output_path, index=False)
 
-    if verbose:
-        print(f"  Saved: {output_path}")
+def run(config: dict | None = None, verbose: bool = True) -> pd.DataFrame:
+    """
+    Run the disease extraction pipeline step.
 
-    return result
+    Args:
+        config: Configuration dict (loads from file if None)
+        verbose: Print progress messages
+
+    Returns:
+        DataFrame with the primary area's (cancer) diseases and MeSH mappings
+    """
+    if config is None:
+        config = load_config()
+    return run_areas(config, verbose)[get_therapeutic_areas(config)[0]["name"]]
 
 
 def main():
     """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Step 1: extract cancer diseases")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
     config = load_config()
-    run(config, verbose=True)
+    with profile_step("extract_diseases", config, enabled=args.profile):
+        run(config, verbose=True)
 
 
 if __name__ == "__main__":
@@ -3,7 +3,8 @@
 Extract MeSH C04 (Neoplasms) hierarchy from raw MeSH descriptor file.
 
 Downloads d2025.bin from NLM if not present, then extracts the C04 branch
-(or C04.588 site-only branch) into a clean CSV.
+(or C04.588 site-only branch) into a clean CSV. Several branches can be
+extracted from a single pass over the file.
 
 MeSH 2025 source: https://nlmpubs.nlm.nih.gov/projects/mesh/MESH_FILES/asciimesh/d2025.bin
 """
@@ -12,12 +13,17 @@ import re
 import urllib.request
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from src.utils.config import load_config, ensure_dir
+from src.utils.config import load_config, ensure_dir, get_hierarchy_prefixes
+from src.utils.profiling import add_profile_argument, profile_step
+from src.utils.catalog import preflight
+from src.utils.memo import memoize
+from src.pipeline.tree_index import TreeIndex
 
 
 MESH_URL = "https://nlmpubs.nlm.nih.gov/projects/mesh/MESH_FILES/asciimesh/d2025.bin"
@@ -39,6 +45,7 @@ def download_mesh(config: dict, force: bool = False) -> Path:
     return mesh_path
 
 
+@memoize(inputs=lambda mesh_path: [mesh_path])
 def parse_mesh_file(mesh_path: Path) -> list[dict]:
     """
     Parse MeSH ASCII descriptor file.
@@ -47,6 +54,7 @@ def parse_mesh_file(mesh_path: Path) -> list[dict]:
     - UI: Unique identifier (D######)
     - MH: MeSH Heading (name)
     - MN: Tree number(s) - can have multiple per descriptor
+    - ENTRY: Entry terms (ENTRY and PRINT ENTRY, term text only)
     """
     records = []
     current = {}
@@ -58,13 +66,16 @@ def parse_mesh_file(mesh_path: Path) -> list[dict]:
             if line == '*NEWRECORD':
                 if current.get('UI') and current.get('MN'):
                     records.append(current)
-                current = {'MN': []}
+                current = {'MN': [], 'ENTRY': []}
             elif line.startswith('UI = '):
                 current['UI'] = line[5:]
             elif line.startswith('MH = '):
                 current['MH'] = line[5:]
             elif line.startswith('MN = '):
                 current['MN'].append(line[5:])
+            elif line.startswith('ENTRY = ') or line.startswith('PRINT ENTRY = '):
+                # "term|T047|NON|EQV|..." - the term is the first field
+                current['ENTRY'].append(line.split(' = ', 1)[1].split('|', 1)[0])
 
     # Don't forget last record
     if current.get('UI') and current.get('MN'):
@@ -87,42 +98,176 @@ def extract_c04_hierarchy(
     Returns:
         DataFrame with mesh_id, mesh_name, tree_number, level
     """
-    rows = []
-
+    mesh_ids, mesh_names, tree_numbers = [], [], []
     for rec in records:
-        mesh_id = rec['UI']
-        mesh_name = rec.get('MH', '')
-
         for tree_num in rec['MN']:
-            if tree_num.startswith(prefix):
-                level = tree_num.count('.') + 1
-                rows.append({
-                    'mesh_id': mesh_id,
-                    'mesh_name': mesh_name,
-                    'tree_number': tree_num,
-                    'level': level
-                })
-
-    df = pd.DataFrame(rows)
+            mesh_ids.append(rec['UI'])
+            mesh_names.append(rec.get('MH', ''))
+            tree_numbers.append(tree_num)
+
+    # Prefix filter = one range of the sorted tree numbers
+    index = TreeIndex.from_frame(pd.DataFrame({'tree_number': tree_numbers}))
+    start, stop = index.prefix_range(prefix)
+    rows = index.rows[start:stop]
+
+    df = pd.DataFrame({
+        'mesh_id': np.asarray(mesh_ids, dtype=object)[rows],
+        'mesh_name': np.asarray(mesh_names, dtype=object)[rows],
+        'tree_number': index.tree_numbers[start:stop].astype(object),
+    })
+    df['level'] = df['tree_number'].str.count(r'\.') + 1
     df = df.sort_values(['tree_number', 'mesh_id']).reset_index(drop=True)
 
     return df
 
 
-def run(config: dict | None = None, prefix: str = "C04.588", verbose: bool = True) -> pd.DataFrame:
+_RECORD_MARKER = b"*NEWRECORD"
+_UI_RE = re.compile(rb"^UI = ([^\r\n]*)", re.MULTILINE)
+_MH_RE = re.compile(rb"^MH = ([^\r\n]*)", re.MULTILINE)
+_MN_RE = re.compile(rb"^MN = ([^\r\n]*)", re.MULTILINE)
+
+
+def scan_mesh_hierarchies(mesh_path: Path, prefixes: list[str]) -> dict[str, pd.DataFrame]:
     """
-    Extract MeSH hierarchy from raw file.
+    Extract several MeSH tree branches in a single pass over the raw file.
+
+    Works on the raw bytes: one regex search locates the MN lines that match
+    any requested prefix, and only the descriptor records containing them
+    are decoded. Everything else in the file is skipped without building
+    per-record objects.
+
+    Args:
+        mesh_path: Path to d2025.bin
+        prefixes: Tree prefixes, e.g. ["C04", "C04.588", "C04.557"] or ["C"]
+
+    Returns:
+        Dict of prefix -> DataFrame with mesh_id, mesh_name, tree_number, level
+        (same shape as extract_c04_hierarchy)
+    """
+    prefixes = list(dict.fromkeys(prefixes))
+    encoded = [p.encode() for p in prefixes]
+
+    # Longest first so the alternation never stops at a shorter prefix
+    alternation = b"|".join(re.escape(p) for p in sorted(encoded, key=len, reverse=True))
+    match_re = re.compile(rb"^MN = (?:" + alternation + rb")", re.MULTILINE)
+
+    columns = {
+        p: {"mesh_id": [], "mesh_name": [], "tree_number": [], "level": []}
+        for p in prefixes
+    }
+
+    with open(mesh_path, "rb") as f:
+        data = f.read()
+
+    pos = 0
+    for match in match_re.finditer(data):
+        if match.start() < pos:
+            continue  # Another MN line of a record already handled
+
+        start = data.rfind(_RECORD_MARKER, 0, match.start())
+        end = data.find(_RECORD_MARKER, match.end())
+        if end == -1:
+            end = len(data)
+        pos = end
+        record = data[max(start, 0):end]
+
+        ui = _UI_RE.search(record)
+        if ui is None:
+            continue
+        mh = _MH_RE.search(record)
+        mesh_id = ui.group(1).strip().decode("utf-8", errors="replace")
+        mesh_name = mh.group(1).strip().decode("utf-8", errors="replace") if mh else ""
+
+        for raw_tree in _MN_RE.findall(record):
+            raw_tree = raw_tree.strip()
+            tree_num = None
+            for prefix, enc in zip(prefixes, encoded):
+                if raw_tree.startswith(enc):
+                    tree_num = tree_num or raw_tree.decode("ascii")
+                    cols = columns[prefix]
+                    cols["mesh_id"].append(mesh_id)
+                    cols["mesh_name"].append(mesh_name)
+                    cols["tree_number"].append(tree_num)
+                    cols["level"].append(tree_num.count(".") + 1)
+
+    hierarchies = {}
+    for prefix, cols in columns.items():
+        df = pd.DataFrame(cols, columns=["mesh_id", "mesh_name", "tree_number", "level"])
+        df["level"] = df["level"].astype("int64")
+        hierarchies[prefix] = df.sort_values(["tree_number", "mesh_id"]).reset_index(drop=True)
+
+    return hierarchies
+
+
+_TERM_RE = re.compile(rb"^(MH|ENTRY|PRINT ENTRY|UI) = ([^\r\n|]*)", re.MULTILINE)
+
+
+def scan_mesh_terms(mesh_path: Path) -> pd.DataFrame:
+    """
+    Headings and entry terms of every descriptor, in one regex pass.
+
+    Lines are assigned to their record by position (one searchsorted over
+    the *NEWRECORD offsets), so no per-record objects are built.
+
+    Returns:
+        DataFrame with mesh_id, mesh_name (heading), term, kind ("heading" or "entry")
+    """
+    with open(mesh_path, "rb") as f:
+        data = f.read()
+
+    markers = np.array([m.start() for m in re.finditer(re.escape(_RECORD_MARKER), data)])
+    fields, values, starts = [], [], []
+    for match in _TERM_RE.finditer(data):
+        fields.append(match.group(1).decode("ascii"))
+        values.append(match.group(2).strip().decode("utf-8", errors="replace"))
+        starts.append(match.start())
+
+    lines = pd.DataFrame({
+        "record": np.searchsorted(markers, np.array(starts, dtype="int64"), side="right"),
+        "field": fields,
+        "value": values,
+    })
+    ui = lines[lines["field"] == "UI"].drop_duplicates("record").set_index("record")["value"]
+    heading = lines[lines["field"] == "MH"].drop_duplicates("record").set_index("record")["value"]
+
+    terms = lines[lines["field"] != "UI"].copy()
+    terms["mesh_id"] = terms["record"].map(ui)
+    terms["mesh_name"] = terms["record"].map(heading)
+    terms["kind"] = np.where(terms["field"] == "MH", "heading", "entry")
+    terms = terms.dropna(subset=["mesh_id"]).rename(columns={"value": "term"})
+    return terms[["mesh_id", "mesh_name", "term", "kind"]] \
+        .drop_duplicates(["mesh_id", "term"]).reset_index(drop=True)
+
+
+def hierarchy_output_path(mesh_dir: Path, prefix: str) -> Path:
+    """Get the CSV path for an extracted hierarchy."""
+    if prefix == "C04":
+        return mesh_dir / "mesh_c04_complete.csv"
+    if prefix == "C04.588":
+        return mesh_dir / "mesh_c04_588_site.csv"
+    return mesh_dir / f"mesh_{prefix.replace('.', '_')}.csv"
+
+
+def run_multi(
+    config: dict | None = None,
+    prefixes: list[str] | None = None,
+    verbose: bool = True
+) -> dict[str, pd.DataFrame]:
+    """
+    Extract several MeSH hierarchies from one pass over the raw file.
 
     Args:
         config: Configuration dict
-        prefix: Tree prefix (C04 = all neoplasms, C04.588 = site only)
+        prefixes: Tree prefixes (default: the configured hierarchies)
         verbose: Print progress
 
     Returns:
-        DataFrame with mesh hierarchy
+        Dict of prefix -> DataFrame with mesh hierarchy
     """
     if config is None:
         config = load_config()
+    if not prefixes:
+        prefixes = get_hierarchy_prefixes(config)
 
     if verbose:
         print("Extracting MeSH hierarchy")
@@ -131,51 +276,62 @@ def run(config: dict | None = None, prefix: str = "C04.588", verbose: bool = Tru
     # Download if needed
     if verbose:
         print("  Checking MeSH source file...")
+    preflight(config, ["mesh"], verbose)
     mesh_path = download_mesh(config)
 
-    # Parse
-    if verbose:
-        print("  Parsing MeSH descriptors...")
-    records = parse_mesh_file(mesh_path)
-    if verbose:
-        print(f"    {len(records):,} total descriptors")
-
-    # Extract C04 branch
-    if verbose:
-        print(f"  Extracting {prefix} hierarchy...")
-    hierarchy = extract_c04_hierarchy(records, prefix)
+    # Parse all requested branches in one scan
     if verbose:
-        print(f"    {len(hierarchy):,} tree paths")
-        print(f"    {hierarchy['mesh_id'].nunique():,} unique terms")
-        print(f"    Levels: {hierarchy['level'].min()}-{hierarchy['level'].max()}")
+        print(f"  Scanning MeSH descriptors for {', '.join(prefixes)}...")
+    hierarchies = scan_mesh_hierarchies(mesh_path, prefixes)
 
-    # Save
     mesh_dir = ensure_dir(Path(config["paths"]["mesh_dir"]))
-    if prefix == "C04":
-        output_path = mesh_dir / "mesh_c04_complete.csv"
-    elif prefix == "C04.588":
-        output_path = mesh_dir / "mesh_c04_588_site.csv"
-    else:
-        output_path = mesh_dir / f"mesh_{prefix.replace('.', '_')}.csv"
+    for prefix, hierarchy in hierarchies.items():
+        if verbose:
+            print(f"  {prefix} hierarchy:")
+            print(f"    {len(hierarchy):,} tree paths")
+            print(f"    {hierarchy['mesh_id'].nunique():,} unique terms")
+            if len(hierarchy):
+                print(f"    Levels: {hierarchy['level'].min()}-{hierarchy['level'].max()}")
+
+        output_path = hierarchy_output_path(mesh_dir, prefix)
+        hierarchy.to_csv(output_path, index=False)
+        if verbose:
+            print(f"  Saved: {output_path}")
+
+    return hierarchies
 
-    hierarchy.to_csv(output_path, index=False)
-    if verbose:
-        print(f"  Saved: {output_path}")
 
-    return hierarchy
+def run(config: dict | None = None, prefix: str = "C04.588", verbose: bool = True) -> pd.DataFrame:
+    """
+    Extract MeSH hierarchy from raw file.
+
+    Args:
+        config: Configuration dict
+        prefix: Tree prefix (C04 = all neoplasms, C04.588 = site only)
+        verbose: Print progress
+
+    Returns:
+        DataFrame with mesh hierarchy
+    """
+    return run_multi(config, prefixes=[prefix], verbose=verbose)[prefix]
 
 
 def main():
     """CLI entry point."""
     import argparse
     parser = argparse.ArgumentParser(description="Extract MeSH hierarchy")
-    parser.add_argument("--prefix", default="C04.588", help="Tree prefix (C04 or C04.588)")
+    parser.add_argument(
+        "--prefix", nargs="+", default=["C04.588"],
+        help="Tree prefix(es), extracted in one pass (e.g. C04 C04.588 C04.557)"
+    )
     parser.add_argument("--full", action="store_true", help="Extract full C04 (not just site)")
+    add_profile_argument(parser)
     args = parser.parse_args()
 
-    prefix = "C04" if args.full else args.prefix
+    prefixes = ["C04"] if args.full else args.prefix
     config = load_config()
-    run(config, prefix=prefix, verbose=True)
+    with profile_step("extract_mesh", config, enabled=args.profile):
+        run_multi(config, prefixes=prefixes, verbose=True)
 
 
 if __name__ == "__main__":
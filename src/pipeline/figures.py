@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""
+Figures stage: regenerate all figures from precomputed summary cubes.
+
+This module:
+1. Loads the final gene-MeSH dataset once
+2. Builds compact aggregate cubes (per level, per MeSH, per gene, top-k
+   grids, evidence/score histograms, story-gene profiles)
+3. Saves the cubes to data/processed/cubes/
+4. Renders every figure from the cubes, in parallel across a process pool
+
+Cubes are a few thousand rows in total, so re-rendering figures never
+touches the full dataset again (use --from-cubes to skip step 1-3).
+The raw association distributions (SKETCH_FIGURES) are rendered by the
+quality stage from the Step 2 sketch instead (see sketches.py).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import load_config, ensure_dir, get_hierarchy_prefixes
+from src.utils.profiling import add_profile_argument, profile_step
+from src.pipeline.extract_mesh import hierarchy_output_path
+
+
+# Entrez IDs for the "story" figures
+STORY_GENES = {
+    "egfr": {1956: "EGFR"},
+    "immunotherapy": {5133: "PDCD1", 29126: "CD274", 1493: "CTLA4", 3902: "LAG3", 84868: "HAVCR2"},
+    "oncogenes": {3845: "KRAS", 4609: "MYC", 1956: "EGFR", 2064: "ERBB2", 5290: "PIK3CA", 673: "BRAF"},
+    "suppressors": {7157: "TP53", 5728: "PTEN", 5925: "RB1", 672: "BRCA1", 675: "BRCA2", 324: "APC"},
+}
+
+SCORE_BINS = np.linspace(0.0, 1.0, 51)
+LOG_EVIDENCE_BINS = np.linspace(0.0, 5.0, 41)  # log10(evidence_count), up to 100K
+CUBE_NAMES = (
+    "by_level", "score_hist_by_level", "by_mesh", "by_gene",
+    "grid", "evidence_counts", "score_evidence_hist", "stories",
+)
+
+
+# =============================================================================
+# CUBES
+# =============================================================================
+
+def load_final(config: dict, suffix: str = "") -> pd.DataFrame:
+    """Load the final 5-column dataset produced by Step 3."""
+    path = Path(config["paths"]["processed_dir"]) / f"gene_disease_mesh_final{suffix}.tsv"
+    if not path.exists():
+        raise FileNotFoundError(f"Run Step 3 first: {path}")
+    return pd.read_csv(path, sep="\t", dtype={"disease_mesh_id": str})
+
+
+def load_mesh_names(config: dict) -> pd.Series:
+    """MeSH ID → heading, from the extracted hierarchy CSVs."""
+    mesh_dir = Path(config["paths"]["mesh_dir"])
+    frames = []
+    for prefix in get_hierarchy_prefixes(config) + ["C04"]:
+        path = hierarchy_output_path(mesh_dir, prefix)
+        if path.exists():
+            frames.append(pd.read_csv(path, usecols=["mesh_id", "mesh_name"]))
+    if not frames:
+        return pd.Series(dtype=str)
+    names = pd.concat(frames).drop_duplicates("mesh_id")
+    return names.set_index("mesh_id")["mesh_name"]
+
+
+def load_gene_symbols(config: dict) -> pd.Series:
+    """
+    Entrez ID → approved symbol, if the OT target index is available.
+
+    Uses the Step 3 Ensembl → Entrez crosswalk; returns an empty Series
+    (labels fall back to Entrez IDs) when either input is missing.
+    """
+    target_dir = Path(config["paths"]["opentargets_dir"]) / "target"
+    crosswalk_path = Path(config["paths"]["processed_dir"]) / "crosswalks" / "ensembl_entrez.csv"
+    files = list(target_dir.glob("**/*.parquet")) if target_dir.exists() else []
+    if not files or not crosswalk_path.exists():
+        return pd.Series(dtype=str)
+
+    targets = pd.concat([pd.read_parquet(f, columns=["id", "approvedSymbol"]) for f in files])
+    crosswalk = pd.read_csv(crosswalk_path)
+    symbols = crosswalk.merge(targets, left_on="ensemblGeneId", right_on="id")
+    return symbols.drop_duplicates("entrezGeneId").set_index("entrezGeneId")["approvedSymbol"]
+
+
+def _box_stats(values: pd.Series) -> pd.Series:
+    """Box plot statistics (5th/95th percentile whiskers)."""
+    q = values.quantile([0.05, 0.25, 0.5, 0.75, 0.95]).to_numpy()
+    return pd.Series({"whislo": q[0], "q1": q[1], "med": q[2], "q3": q[3], "whishi": q[4]})
+
+
+def build_cubes(
+    final: pd.DataFrame,
+    mesh_names: pd.Series | None = None,
+    gene_symbols: pd.Series | None = None,
+    top_k_max: int = 250
+) -> dict[str, pd.DataFrame]:
+    """
+    Build the aggregate cubes every figure is rendered from.
+
+    Args:
+        final: Final 5-column dataset
+        mesh_names: MeSH ID → heading (optional, for labels)
+        gene_symbols: Entrez ID → symbol (optional, for labels)
+        top_k_max: Number of top genes (by total evidence) kept in the grid cube
+
+    Returns:
+        Dict of cube name → DataFrame
+    """
+    mesh_names = mesh_names if mesh_names is not None else pd.Series(dtype=str)
+    gene_symbols = gene_symbols if gene_symbols is not None else pd.Series(dtype=str)
+
+    df = final.rename(columns={
+        "disease_mesh_id": "meshId",
+        "gene_entrez_id": "gene",
+        "mesh_level": "level",
+        "ot_score": "score",
+        "evidence_count": "evidence",
+    })
+    df["log_evidence"] = np.log10(df["evidence"].clip(lower=1))
+
+    # Per level
+    by_level = df.groupby("level").agg(
+        rows=("score", "size"),
+        genes=("gene", "nunique"),
+        mesh_terms=("meshId", "nunique"),
+        total_evidence=("evidence", "sum"),
+        mean_score=("score", "mean"),
+        median_score=("score", "median"),
+    )
+    box = df.groupby("level")["evidence"].apply(_box_stats).unstack()
+    by_level = by_level.join(box).reset_index()
+
+    score_bin = np.clip(np.digitize(df["score"], SCORE_BINS) - 1, 0, len(SCORE_BINS) - 2)
+    score_hist_by_level = (
+        df.assign(bin=score_bin).groupby(["level", "bin"]).size()
+        .rename("count").reset_index()
+    )
+    score_hist_by_level["bin_left"] = SCORE_BINS[score_hist_by_level["bin"]]
+    score_hist_by_level["bin_right"] = SCORE_BINS[score_hist_by_level["bin"] + 1]
+
+    # Per MeSH term
+    by_mesh = df.groupby("meshId").agg(
+        level=("level", "first"),
+        genes=("gene", "nunique"),
+        total_evidence=("evidence", "sum"),
+        mean_score=("score", "mean"),
+        max_score=("score", "max"),
+    ).reset_index()
+    by_mesh["mesh_name"] = by_mesh["meshId"].map(mesh_names).fillna(by_mesh["meshId"])
+
+    # Per gene
+    by_gene = df.groupby("gene").agg(
+        mesh_terms=("meshId", "nunique"),
+        total_evidence=("evidence", "sum"),
+        mean_score=("score", "mean"),
+        max_score=("score", "max"),
+    ).reset_index()
+    by_gene["symbol"] = by_gene["gene"].map(gene_symbols).fillna(by_gene["gene"].astype(str))
+    by_gene = by_gene.sort_values("total_evidence", ascending=False, kind="stable")
+
+    # Top-k grid: all MeSH terms × top_k_max genes
+    top_genes = by_gene["gene"].head(top_k_max)
+    grid = df.loc[df["gene"].isin(top_genes), ["gene", "meshId", "score", "evidence"]]
+
+    # Exact evidence value counts (histogram + Pareto)
+    evidence_counts = df["evidence"].value_counts().rename("pairs").rename_axis("evidence")
+    evidence_counts = evidence_counts.sort_index().reset_index()
+
+    # Joint score × log10(evidence) histogram
+    ev_bin = np.clip(np.digitize(df["log_evidence"], LOG_EVIDENCE_BINS) - 1, 0, len(LOG_EVIDENCE_BINS) - 2)
+    joint = pd.DataFrame({"score_bin": score_bin, "evidence_bin": ev_bin})
+    score_evidence_hist = joint.groupby(["score_bin", "evidence_bin"]).size().rename("count").reset_index()
+    score_evidence_hist["score"] = (SCORE_BINS[:-1] + np.diff(SCORE_BINS) / 2)[score_evidence_hist["score_bin"]]
+    score_evidence_hist["log_evidence"] = (
+        LOG_EVIDENCE_BINS[:-1] + np.diff(LOG_EVIDENCE_BINS) / 2
+    )[score_evidence_hist["evidence_bin"]]
+
+    # Story-gene profiles
+    story_ids = {g for genes in STORY_GENES.values() for g in genes}
+    stories = df.loc[df["gene"].isin(story_ids), ["gene", "meshId", "level", "score", "evidence"]]
+
+    return {
+        "by_level": by_level,
+        "score_hist_by_level": score_hist_by_level,
+        "by_mesh": by_mesh,
+        "by_gene": by_gene.reset_index(drop=True),
+        "grid": grid.reset_index(drop=True),
+        "evidence_counts": evidence_counts,
+        "score_evidence_hist": score_evidence_hist,
+        "stories": stories.reset_index(drop=True),
+    }
+
+
+def save_cubes(cubes: dict[str, pd.DataFrame], cubes_dir: Path) -> None:
+    """Write cubes as Parquet files."""
+    ensure_dir(cubes_dir)
+    for name, cube in cubes.items():
+        cube.to_parquet(cubes_dir / f"{name}.parquet", index=False)
+
+
+def load_cubes(cubes_dir: Path) -> dict[str, pd.DataFrame]:
+    """Load cubes written by save_cubes."""
+    missing = [n for n in CUBE_NAMES if not (cubes_dir / f"{n}.parquet").exists()]
+    if missing:
+        raise FileNotFoundError(f"Cubes not found in {cubes_dir}: {', '.join(missing)}")
+    return {name: pd.read_parquet(cubes_dir / f"{name}.parquet") for name in CUBE_NAMES}
+
+
+# =============================================================================
+# FIGURES
+# =============================================================================
+
+def _grid_matrix(cubes: dict, n_genes: int, n_mesh: int | None, value: str) -> pd.DataFrame:
+    """Top genes × top MeSH terms (by total evidence) pivot from the grid cube."""
+    genes = cubes["by_gene"].head(n_genes)
+    mesh = cubes["by_mesh"].sort_values("total_evidence", ascending=False)
+    if n_mesh is not None:
+        mesh = mesh.head(n_mesh)
+
+    grid = cubes["grid"]
+    grid = grid[grid["gene"].isin(genes["gene"]) & grid["meshId"].isin(mesh["meshId"])]
+    matrix = grid.pivot_table(index="gene", columns="meshId", values=value, aggfunc="max")
+    matrix = matrix.reindex(index=genes["gene"], columns=mesh["meshId"])
+    matrix.index = genes["symbol"].to_numpy()
+    matrix.columns = mesh["mesh_name"].to_numpy()
+    return matrix
+
+
+def plot_evidence_by_level_boxplot(cubes, ax):
+    """Evidence box plot per level, from precomputed box stats."""
+    by_level = cubes["by_level"]
+    stats = [
+        {"label": str(int(r.level)), "whislo": r.whislo, "q1": r.q1, "med": r.med,
+         "q3": r.q3, "whishi": r.whishi, "fliers": []}
+        for r in by_level.itertuples()
+    ]
+    ax.bxp(stats, showfliers=False)
+    ax.set_yscale("log")
+    ax.set_xlabel("MeSH level")
+    ax.set_ylabel("Evidence count (5th-95th pct whiskers)")
+    ax.set_title("Evidence per gene-MeSH pair by level")
+
+
+def plot_total_evidence_by_level(cubes, ax):
+    """Total evidence per level."""
+    by_level = cubes["by_level"]
+    ax.bar(by_level["level"].astype(int).astype(str), by_level["total_evidence"])
+    ax.set_xlabel("MeSH level")
+    ax.set_ylabel("Total evidence")
+    ax.set_title("Total evidence by MeSH level")
+
+
+def plot_score_by_level_violin(cubes, ax):
+    """Violin-style score distribution per level, from binned counts."""
+    hist = cubes["score_hist_by_level"]
+    levels = sorted(hist["level"].unique())
+    for i, level in enumerate(levels):
+        h = hist[hist["level"] == level]
+        density = h["count"] / h["count"].max() * 0.4
+        centers = (h["bin_left"] + h["bin_right"]) / 2
+        ax.fill_betweenx(centers, i - density, i + density, alpha=0.7)
+    ax.set_xticks(range(len(levels)), [str(int(l)) for l in levels])
+    ax.set_xlabel("MeSH level")
+    ax.set_ylabel("OT score")
+    ax.set_title("Score distribution by MeSH level")
+
+
+def plot_rows_by_level(cubes, ax):
+    """Gene-MeSH pairs per level."""
+    by_level = cubes["by_level"]
+    ax.bar(by_level["level"].astype(int).astype(str), by_level["rows"])
+    ax.set_xlabel("MeSH level")
+    ax.set_ylabel("Gene-MeSH pairs")
+    ax.set_title("Rows by MeSH level")
+
+
+def plot_genes_per_mesh(cubes, ax):
+    """Histogram of genes per MeSH term."""
+    ax.hist(cubes["by_mesh"]["genes"], bins=40)
+    ax.set_xlabel("Genes per MeSH term")
+    ax.set_ylabel("MeSH terms")
+    ax.set_title("Genes per MeSH term")
+
+
+def plot_score_vs_evidence_hexbin(cubes, ax, cube: str = "score_evidence_hist", unit: str = "Gene-MeSH pairs"):
+    """Hexbin of score vs evidence, weighted by joint histogram counts."""
+    h = cubes[cube]
+    hb = ax.hexbin(
+        h["score"], h["log_evidence"], C=h["count"],
+        reduce_C_function=np.sum, gridsize=40, bins="log", mincnt=1
+    )
+    ax.figure.colorbar(hb, ax=ax, label=unit)
+    ax.set_xlabel("OT score")
+    ax.set_ylabel("log10(evidence count)")
+    ax.set_title("Score vs evidence")
+
+
+def plot_evidence_pareto(cubes, ax, cube: str = "evidence_counts", unit: str = "Gene-MeSH pairs"):
+    """Cumulative evidence share vs share of pairs."""
+    counts = cubes[cube].sort_values("evidence", ascending=False)
+    pair_share = counts["pairs"].cumsum() / counts["pairs"].sum() * 100
+    evidence_share = (counts["evidence"] * counts["pairs"]).cumsum()
+    evidence_share = evidence_share / evidence_share.iloc[-1] * 100
+    ax.plot(pair_share, evidence_share)
+    ax.plot([0, 100], [0, 100], linestyle="--", color="grey")
+    ax.set_xlabel(f"% of {unit[0].lower() + unit[1:]} (highest evidence first)")
+    ax.set_ylabel("% of total evidence")
+    ax.set_title("Evidence Pareto curve")
+
+
+def plot_evidence_histogram(cubes, ax, cube: str = "evidence_counts", unit: str = "Gene-MeSH pairs"):
+    """Log-binned evidence count histogram."""
+    counts = cubes[cube]
+    bins = np.logspace(0, np.log10(max(counts["evidence"].max(), 10)), 40)
+    ax.hist(counts["evidence"].clip(lower=1), bins=bins, weights=counts["pairs"])
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_xlabel("Evidence count")
+    ax.set_ylabel(unit)
+    ax.set_title("Evidence count distribution")
+
+
+def plot_score_histogram(cubes, ax, cube: str = "association_score_hist", unit: str = "Associations"):
+    """Fixed-bin score histogram."""
+    h = cubes[cube]
+    ax.bar(h["bin_left"], h["count"], width=h["bin_right"] - h["bin_left"], align="edge")
+    ax.set_yscale("log")
+    ax.set_xlabel("OT score")
+    ax.set_ylabel(unit)
+    ax.set_title("Score distribution")
+
+
+def plot_top_mesh(cubes, ax, n: int = 30, label: str = "name"):
+    """Top-n MeSH terms by total evidence, labeled "<ID or name> (L<level>)"."""
+    top = cubes["by_mesh"].nlargest(n, "total_evidence").iloc[::-1]
+    names = top["meshId"] if label == "id" else top["mesh_name"]
+    ax.barh(names + " (L" + top["level"].astype(str) + ")", top["total_evidence"])
+    ax.set_xlabel("Total evidence")
+    ax.set_title(f"Top {n} MeSH terms by evidence" if label == "id" else f"Top {n} cancer sites by evidence")
+
+
+def plot_top_genes(cubes, ax, n: int = 30):
+    """Top-n genes by total evidence."""
+    top = cubes["by_gene"].head(n).iloc[::-1]
+    ax.barh(top["symbol"], top["total_evidence"])
+    ax.set_xlabel("Total evidence")
+    ax.set_title(f"Top {n} genes by evidence")
+
+
+def plot_grid(cubes, ax, n_genes: int, n_mesh: int | None, value: str):
+    """Heatmap of top genes × MeSH terms."""
+    matrix = _grid_matrix(cubes, n_genes, n_mesh, value)
+    data = matrix.to_numpy(dtype=float)
+    if value == "evidence":
+        data = np.log10(np.nan_to_num(data, nan=0.0) + 1)
+        label = "log10(evidence + 1)"
+    else:
+        data = np.nan_to_num(data, nan=0.0)
+        label = "OT score"
+    im = ax.imshow(data, aspect="auto", cmap="viridis", interpolation="nearest")
+    ax.figure.colorbar(im, ax=ax, label=label)
+    if len(matrix.index) <= 120:
+        ax.set_yticks(range(len(matrix.index)), matrix.index, fontsize=max(3, 9 - len(matrix.index) // 20))
+    if len(matrix.columns) <= 120:
+        ax.set_xticks(range(len(matrix.columns)), matrix.columns, rotation=90,
+                      fontsize=max(3, 9 - len(matrix.columns) // 20))
+    mesh_label = "all MeSH terms" if n_mesh is None else f"top {n_mesh} MeSH terms"
+    ax.set_title(f"Top {n_genes} genes × {mesh_label} ({value})")
+
+
+def plot_story(cubes, ax, groups: tuple[str, ...]):
+    """Score profile of story genes across MeSH terms."""
+    stories = cubes["stories"]
+    mesh = cubes["by_mesh"].set_index("meshId")["mesh_name"]
+    for group in groups:
+        genes = STORY_GENES[group]
+        profile = stories[stories["gene"].isin(genes)]
+        if len(groups) > 1:
+            label = group
+            series = profile.groupby("meshId")["score"].mean()
+        else:
+            label = ", ".join(genes.values())
+            series = profile.groupby("meshId")["score"].max()
+        series = series.sort_values(ascending=False).head(25)
+        labels = [mesh.get(m, m) for m in series.index]
+        ax.barh(labels, series.to_numpy(), alpha=0.6, label=label)
+    ax.invert_yaxis()
+    ax.set_xlabel("OT score")
+    ax.legend()
+    ax.set_title(" vs ".join(g.capitalize() for g in groups) + " across cancers")
+
+
+def plot_mesh_level_analysis(cubes, ax):
+    """MeSH terms and mean score per level."""
+    by_level = cubes["by_level"]
+    labels = by_level["level"].astype(int).astype(str)
+    ax.bar(labels, by_level["mesh_terms"], label="MeSH terms")
+    twin = ax.twinx()
+    twin.plot(labels, by_level["mean_score"], color="black", marker="o", label="Mean score")
+    twin.set_ylabel("Mean OT score")
+    ax.set_xlabel("MeSH level")
+    ax.set_ylabel("MeSH terms")
+    ax.set_title("MeSH level analysis")
+
+
+# Relative output path → (plot function, kwargs, figure size)
+FIGURES = {
+    "by_level/01_evidence_by_level_boxplot.png": (plot_evidence_by_level_boxplot, {}, (8, 5)),
+    "by_level/02_total_evidence_by_level.png": (plot_total_evidence_by_level, {}, (8, 5)),
+    "by_level/03_score_by_level_violin.png": (plot_score_by_level_violin, {}, (8, 5)),
+    "by_level/06_rows_by_level.png": (plot_rows_by_level, {}, (8, 5)),
+    "distributions/04_genes_per_mesh.png": (plot_genes_per_mesh, {}, (8, 5)),
+    "distributions/05_score_vs_evidence_hexbin.png": (plot_score_vs_evidence_hexbin, {}, (8, 6)),
+    "distributions/08_evidence_pareto.png": (plot_evidence_pareto, {}, (7, 6)),
+    "distributions/09_evidence_histogram.png": (plot_evidence_histogram, {}, (8, 5)),
+    "rankings/07_top_mesh_by_evidence.png": (plot_top_mesh, {"n": 20, "label": "id"}, (10, 6)),
+    "rankings/top30_diseases.png": (plot_top_mesh, {"n": 30, "label": "name"}, (12, 10)),
+    "rankings/top30_genes.png": (plot_top_genes, {"n": 30}, (8, 9)),
+    "rankings/top30_gene_disease_grid.png": (plot_grid, {"n_genes": 30, "n_mesh": 30, "value": "evidence"}, (14, 12)),
+    "rankings/top30_gene_disease_grid_score.png": (plot_grid, {"n_genes": 30, "n_mesh": 30, "value": "score"}, (14, 12)),
+    "rankings/top60_gene_disease_grid.png": (plot_grid, {"n_genes": 60, "n_mesh": 60, "value": "evidence"}, (18, 16)),
+    "rankings/top60_gene_disease_grid_score.png": (plot_grid, {"n_genes": 60, "n_mesh": 60, "value": "score"}, (18, 16)),
+    "rankings/top120_gene_disease_grid.png": (plot_grid, {"n_genes": 120, "n_mesh": 120, "value": "evidence"}, (24, 22)),
+    "rankings/top120_gene_disease_grid_score.png": (plot_grid, {"n_genes": 120, "n_mesh": 120, "value": "score"}, (24, 22)),
+    "rankings/all_diseases_x_top250_genes_evidence.png": (plot_grid, {"n_genes": 250, "n_mesh": None, "value": "evidence"}, (20, 24)),
+    "rankings/all_diseases_x_top250_genes_score.png": (plot_grid, {"n_genes": 250, "n_mesh": None, "value": "score"}, (20, 24)),
+    "stories/egfr_across_cancers.png": (plot_story, {"groups": ("egfr",)}, (9, 9)),
+    "stories/immunotherapy_across_cancers.png": (plot_story, {"groups": ("immunotherapy",)}, (9, 9)),
+    "stories/oncogenes_vs_suppressors.png": (plot_story, {"groups": ("oncogenes", "suppressors")}, (9, 9)),
+    "stories/mesh_level_analysis.png": (plot_mesh_level_analysis, {}, (8, 5)),
+}
+
+# Rendered from the Step 2 association sketch (see sketches.sketch_cubes)
+_SKETCH = {"unit": "Associations"}
+SKETCH_FIGURES = {
+    "distributions/10_association_score_histogram.png": (plot_score_histogram, {}, (8, 5)),
+    "distributions/11_association_score_vs_evidence_hexbin.png": (
+        plot_score_vs_evidence_hexbin, {"cube": "association_score_evidence_hist", **_SKETCH}, (8, 6)
+    ),
+    "distributions/12_association_evidence_pareto.png": (
+        plot_evidence_pareto, {"cube": "association_evidence_counts", **_SKETCH}, (7, 6)
+    ),
+    "distributions/13_association_evidence_histogram.png": (
+        plot_evidence_histogram, {"cube": "association_evidence_counts", **_SKETCH}, (8, 5)
+    ),
+}
+FIGURES.update(SKETCH_FIGURES)
+
+
+def render_figure(name: str, cubes: dict[str, pd.DataFrame], figures_dir: str) -> str:
+    """Render one figure from the cubes (runs in a worker process)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plot, kwargs, figsize = FIGURES[name]
+    output_path = Path(figures_dir) / name
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    fig, ax = plt.subplots(figsize=figsize)
+    plot(cubes, ax, **kwargs)
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=150)
+    plt.close(fig)
+
+    return str(output_path)
+
+
+def render_all(
+    cubes: dict[str, pd.DataFrame],
+    figures_dir: Path,
+    names: list[str] | None = None,
+    workers: int | None = None
+) -> list[str]:
+    """
+    Render figures across a process pool.
+
+    Args:
+        cubes: Cubes from build_cubes/load_cubes
+        figures_dir: Output directory (figures/)
+        names: Figures to render (default: all in FIGURES except the
+            SKETCH_FIGURES, which need sketches.sketch_cubes)
+        workers: Pool size (default: CPU count; 1 renders in-process)
+
+    Returns:
+        List of written paths
+    """
+    names = names or [name for name in FIGURES if name not in SKETCH_FIGURES]
+    workers = workers or os.cpu_count() or 1
+
+    # Largest canvases first so they do not end up as the pool's tail
+    names = sorted(names, key=lambda n: -FIGURES[n][2][0] * FIGURES[n][2][1])
+
+    if workers == 1:
+        return [render_figure(name, cubes, str(figures_dir)) for name in names]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(names))) as pool:
+        futures = [pool.submit(render_figure, name, cubes, str(figures_dir)) for name in names]
+        return [f.result() for f in futures]
+
+
+def run(
+    config: dict | None = None,
+    from_cubes: bool = False,
+    workers: int | None = None,
+    verbose: bool = True
+) -> dict[str, pd.DataFrame]:
+    """
+    Run the figures stage.
+
+    Args:
+        config: Configuration dict (loads from file if None)
+        from_cubes: Reuse saved cubes instead of rebuilding from the final TSV
+        workers: Process pool size (default: figures.workers or CPU count)
+        verbose: Print progress messages
+
+    Returns:
+        Dict of cubes
+    """
+    if config is None:
+        config = load_config()
+
+    fig_config = config.get("figures", {})
+    processed_dir = Path(config["paths"]["processed_dir"])
+    cubes_dir = processed_dir / "cubes"
+    figures_dir = ensure_dir(processed_dir / "figures")
+    workers = workers or fig_config.get("workers")
+
+    if verbose:
+        print("Figures: rendering from summary cubes")
+        print("-" * 40)
+
+    if from_cubes:
+        if verbose:
+            print("  Loading cubes...")
+        cubes = load_cubes(cubes_dir)
+    else:
+        if verbose:
+            print("  Loading final dataset...")
+        final = load_final(config)
+        if verbose:
+            print(f"    {len(final):,} gene-mesh pairs")
+            print("  Building cubes...")
+        cubes = build_cubes(
+            final,
+            mesh_names=load_mesh_names(config),
+            gene_symbols=load_gene_symbols(config),
+            top_k_max=fig_config.get("top_k_max", 250),
+        )
+        save_cubes(cubes, cubes_dir)
+        if verbose:
+            rows = sum(len(c) for c in cubes.values())
+            print(f"    {len(cubes)} cubes, {rows:,} rows total")
+            print(f"  Saved: {cubes_dir}")
+
+    if verbose:
+        print(f"  Rendering {len(FIGURES) - len(SKETCH_FIGURES)} figures...")
+    paths = render_all(cubes, figures_dir, workers=workers)
+    if verbose:
+        print(f"  Saved {len(paths)} figures to {figures_dir}")
+
+    return cubes
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Regenerate figures from summary cubes")
+    parser.add_argument("--from-cubes", action="store_true", help="Reuse saved cubes (skip the final TSV)")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    config = load_config()
+    with profile_step("figures", config, enabled=args.profile):
+        run(config, from_cubes=args.from_cubes, workers=args.workers, verbose=True)
+
+
+if __name__ == "__main__":
+    main()
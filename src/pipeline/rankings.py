@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Rankings stage: precomputed top-k genes per MeSH term and MeSH terms per gene.
+
+Every ranking is built once from the final TSV with partial selection:
+only groups larger than rankings.k_max are cut, with np.partition on the
+ranking value (linear time) instead of a full sort, and only the kept
+k_max rows per group are ordered. Rankings are stored CSR-style as .npy
+arrays that are memory-mapped on load, so top-k for any k up to k_max is
+a slice between two offsets.
+
+Rankings (each by score and by evidence):
+- mesh_genes:    genes per MeSH term
+- level_genes:   genes per MeSH level
+- subtree_genes: genes per MeSH subtree (the term and all its descendants)
+- gene_mesh:     MeSH terms per gene
+
+A gene's score in a level or subtree is its best ot_score there, and its
+evidence is the sum of evidence_count over the terms. Ties are broken by
+the other value, then by item ID.
+
+Outputs (data/processed/rankings/<ranking>_by_<score|evidence>/):
+- keys.npy: sorted group keys
+- offsets.npy: start of each group's ranked items (len(keys) + 1)
+- items.npy, score.npy, evidence.npy: ranked items and their values
+- data/processed/rankings/rankings.json: k_max and per-ranking sizes
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import (
+    load_config, ensure_dir, get_hierarchy_prefixes, hierarchy_suffix,
+    get_association_types, association_suffix,
+)
+from src.utils.profiling import add_profile_argument, profile_step
+from src.pipeline.extract_mesh import hierarchy_output_path
+from src.pipeline.figures import load_final
+from src.pipeline.tree_index import TreeIndex
+
+
+RANKINGS = ("mesh_genes", "level_genes", "subtree_genes", "gene_mesh")
+RANKED_BY = ("score", "evidence")
+ARRAYS = ("keys", "offsets", "items", "score", "evidence")
+
+
+@dataclass
+class Ranking:
+    """Top-k items per group, CSR layout (see module docstring)."""
+
+    keys: np.ndarray
+    offsets: np.ndarray
+    items: np.ndarray
+    score: np.ndarray
+    evidence: np.ndarray
+    k_max: int
+
+    def position(self, key) -> int:
+        """Index of a group key; raises KeyError if absent."""
+        pos = int(np.searchsorted(self.keys, key))
+        if pos == len(self.keys) or self.keys[pos] != key:
+            raise KeyError(key)
+        return pos
+
+    def top(self, key, k: int | None = None) -> pd.DataFrame:
+        """
+        Top-k items of one group.
+
+        Args:
+            key: Group key (MeSH ID, level, or Entrez gene ID)
+            k: Number of items (default: k_max)
+
+        Returns:
+            DataFrame with rank, item, score, evidence
+        """
+        k = self.k_max if k is None else k
+        if not 0 < k <= self.k_max:
+            raise ValueError(f"k must be between 1 and {self.k_max} (rankings.k_max); got {k}")
+        pos = self.position(key)
+        start = int(self.offsets[pos])
+        stop = min(start + k, int(self.offsets[pos + 1]))
+        return pd.DataFrame({
+            "rank": np.arange(1, stop - start + 1),
+            "item": self.items[start:stop],
+            "score": self.score[start:stop],
+            "evidence": self.evidence[start:stop],
+        })
+
+
+def rank_groups(
+    groups: np.ndarray,
+    items: np.ndarray,
+    score: np.ndarray,
+    evidence: np.ndarray,
+    by: str,
+    k_max: int
+) -> Ranking:
+    """
+    Top k_max items per group by score or evidence, with partial selection.
+
+    Args:
+        groups, items, score, evidence: One row per (group, item)
+        by: "score" or "evidence"
+        k_max: Items kept per group
+
+    Returns:
+        Ranking
+    """
+    if by not in RANKED_BY:
+        raise ValueError(f"Unknown ranking value: {by!r} (expected one of {', '.join(RANKED_BY)})")
+    group_codes, keys = pd.factorize(groups, sort=True)
+    item_codes, _ = pd.factorize(items, sort=True)
+    primary, secondary = (score, evidence) if by == "score" else (evidence, score)
+
+    counts = np.bincount(group_codes, minlength=len(keys))
+    keep = counts[group_codes] <= k_max
+
+    # Cut the groups larger than k_max: everything above the k-th largest
+    # value, then the ties at that value in tie-break order
+    order = np.argsort(group_codes, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    for g in np.flatnonzero(counts > k_max):
+        rows = order[starts[g]:starts[g] + counts[g]]
+        values = primary[rows]
+        kth = np.partition(values, len(values) - k_max)[len(values) - k_max]
+        above = rows[values > kth]
+        ties = rows[values == kth]
+        ties = ties[np.lexsort((item_codes[ties], -secondary[ties]))[:k_max - len(above)]]
+        keep[above] = True
+        keep[ties] = True
+
+    selected = np.flatnonzero(keep)
+    selected = selected[np.lexsort((
+        item_codes[selected], -secondary[selected], -primary[selected], group_codes[selected]
+    ))]
+    sizes = np.bincount(group_codes[selected], minlength=len(keys))
+
+    return Ranking(
+        keys=np.asarray(keys),
+        offsets=np.concatenate(([0], np.cumsum(sizes))).astype("int64"),
+        items=np.asarray(items)[selected],
+        score=np.asarray(score)[selected],
+        evidence=np.asarray(evidence)[selected],
+        k_max=k_max,
+    )
+
+
+def subtree_members(hierarchy: pd.DataFrame) -> pd.DataFrame:
+    """
+    Every (root, mesh_id) pair where mesh_id is root or one of its descendants.
+
+    Each tree number's subtree is one range of the sorted tree numbers
+    (TreeIndex), found with two binary searches per node.
+    """
+    tree = hierarchy[["mesh_id", "tree_number"]].drop_duplicates().reset_index(drop=True)
+    index = TreeIndex.from_frame(tree)
+    starts, stops = index.subtree_ranges()
+    sizes = stops - starts
+
+    # Positions starts[i] .. stops[i] - 1 for every node i, concatenated
+    offsets = np.repeat(starts - (np.cumsum(sizes) - sizes), sizes)
+    members = index.rows[np.arange(sizes.sum()) + offsets]
+    roots = np.repeat(index.rows, sizes)
+
+    mesh_ids = tree["mesh_id"].to_numpy()
+    return pd.DataFrame({"root": mesh_ids[roots], "mesh_id": mesh_ids[members]}) \
+        .drop_duplicates().reset_index(drop=True)
+
+
+def group_values(df: pd.DataFrame, group: str, item: str) -> pd.DataFrame:
+    """Best score and total evidence per (group, item)."""
+    return (
+        df.groupby([group, item], sort=False)
+        .agg(score=("ot_score", "max"), evidence=("evidence_count", "sum"))
+        .reset_index()
+    )
+
+
+def build_rankings(
+    final: pd.DataFrame,
+    hierarchy: pd.DataFrame | None,
+    k_max: int
+) -> dict[str, Ranking]:
+    """
+    Build every ranking from the final dataset.
+
+    Args:
+        final: Final 5-column dataset
+        hierarchy: MeSH hierarchy (mesh_id, tree_number); None skips subtree_genes
+        k_max: Items kept per group
+
+    Returns:
+        Dict of "<ranking>_by_<score|evidence>" -> Ranking
+    """
+    pairs = group_values(final, "disease_mesh_id", "gene_entrez_id")
+    tables = {
+        "mesh_genes": pairs.rename(columns={"disease_mesh_id": "group", "gene_entrez_id": "item"}),
+        "level_genes": group_values(final, "mesh_level", "gene_entrez_id")
+            .rename(columns={"mesh_level": "group", "gene_entrez_id": "item"}),
+        "gene_mesh": pairs.rename(columns={"gene_entrez_id": "group", "disease_mesh_id": "item"}),
+    }
+    if hierarchy is not None:
+        subtree = subtree_members(hierarchy).merge(
+            final, left_on="mesh_id", right_on="disease_mesh_id"
+        )
+        tables["subtree_genes"] = group_values(subtree, "root", "gene_entrez_id") \
+            .rename(columns={"root": "group", "gene_entrez_id": "item"})
+
+    rankings = {}
+    for name in RANKINGS:
+        if name not in tables:
+            continue
+        table = tables[name]
+        for by in RANKED_BY:
+            rankings[f"{name}_by_{by}"] = rank_groups(
+                table["group"].to_numpy(), table["item"].to_numpy(),
+                table["score"].to_numpy(), table["evidence"].to_numpy(), by, k_max
+            )
+    return rankings
+
+
+def save_rankings(rankings: dict[str, Ranking], output_dir: Path) -> None:
+    """Save rankings as .npy arrays plus a rankings.json index."""
+    ensure_dir(output_dir)
+    index = {"k_max": None, "rankings": {}}
+    for name, ranking in rankings.items():
+        ranking_dir = ensure_dir(output_dir / name)
+        for array in ARRAYS:
+            # Object arrays (string IDs) become fixed-width unicode, so
+            # nothing needs pickle and every file can be memory-mapped
+            values = getattr(ranking, array)
+            if values.dtype == object:
+                values = values.astype(str)
+            np.save(ranking_dir / f"{array}.npy", values)
+        index["k_max"] = ranking.k_max
+        index["rankings"][name] = {"groups": len(ranking.keys), "rows": len(ranking.items)}
+    with open(output_dir / "rankings.json", "w") as f:
+        json.dump(index, f, indent=2)
+
+
+def load_ranking(output_dir: Path, name: str) -> Ranking:
+    """
+    Load one ranking, memory-mapped (lookups only read the slice they need).
+
+    Args:
+        output_dir: Rankings directory (e.g. data/processed/rankings)
+        name: "<ranking>_by_<score|evidence>", e.g. "mesh_genes_by_score"
+    """
+    index_path = output_dir / "rankings.json"
+    if not index_path.exists():
+        raise FileNotFoundError(f"Run the rankings stage first: {index_path}")
+    with open(index_path) as f:
+        index = json.load(f)
+    if name not in index["rankings"]:
+        raise KeyError(f"Unknown ranking: {name} (available: {', '.join(index['rankings'])})")
+
+    arrays = {a: np.load(output_dir / name / f"{a}.npy", mmap_mode="r") for a in ARRAYS}
+    return Ranking(**arrays, k_max=index["k_max"])
+
+
+def rankings_dir(config: dict, suffix: str = "") -> Path:
+    """Rankings directory for an output suffix (association type + hierarchy)."""
+    return Path(config["paths"]["processed_dir"]) / f"rankings{suffix}"
+
+
+def run(config: dict | None = None, verbose: bool = True) -> dict[str, dict[str, Ranking]]:
+    """
+    Build rankings for every final TSV (hierarchy × association type).
+
+    Args:
+        config: Configuration dict (loads from file if None)
+        verbose: Print progress messages
+
+    Returns:
+        Dict of output suffix -> rankings
+    """
+    if config is None:
+        config = load_config()
+
+    k_max = config.get("rankings", {}).get("k_max", 250)
+    mesh_dir = Path(config["paths"]["mesh_dir"])
+    prefixes = get_hierarchy_prefixes(config)
+
+    if verbose:
+        print(f"Rankings: top-{k_max} genes per MeSH term / level / subtree, MeSH terms per gene")
+        print("-" * 40)
+
+    outputs = {}
+    for prefix in prefixes:
+        hierarchy_path = hierarchy_output_path(mesh_dir, prefix)
+        hierarchy = pd.read_csv(hierarchy_path) if hierarchy_path.exists() else None
+        if hierarchy is None and verbose:
+            print(f"  {hierarchy_path.name} not found, skipping subtree rankings (run the mesh step)")
+
+        for assoc_type in get_association_types(config):
+            suffix = association_suffix(assoc_type) + hierarchy_suffix(prefixes, prefix)
+            final = load_final(config, suffix)
+            rankings = build_rankings(final, hierarchy, k_max)
+            output_dir = rankings_dir(config, suffix)
+            save_rankings(rankings, output_dir)
+
+            if verbose:
+                rows = sum(len(r.items) for r in rankings.values())
+                print(f"  {prefix} {assoc_type}: {len(rankings)} rankings, {rows:,} rows")
+                print(f"  Saved: {output_dir}")
+            outputs[suffix] = rankings
+
+    return outputs
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Precomputed top-k gene and MeSH rankings")
+    parser.add_argument("--suffix", default="", help="Output suffix (e.g. _indirect, _c04_557)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Build rankings from the final TSVs")
+    add_profile_argument(build)
+
+    top = sub.add_parser("top", help="Top-k lookup from the saved rankings")
+    target = top.add_mutually_exclusive_group(required=True)
+    target.add_argument("--mesh", help="Genes for a MeSH term (e.g. D001943)")
+    target.add_argument("--subtree", help="Genes for a MeSH term and its descendants")
+    target.add_argument("--level", type=int, help="Genes for a MeSH level")
+    target.add_argument("--gene", type=int, help="MeSH terms for an Entrez gene ID (e.g. 7157)")
+    top.add_argument("--by", choices=RANKED_BY, default="score")
+    top.add_argument("--k", type=int, default=10)
+
+    args = parser.parse_args()
+    config = load_config()
+
+    if args.command == "build":
+        with profile_step("rankings", config, enabled=args.profile):
+            run(config, verbose=True)
+        return
+
+    for name, key in [("mesh_genes", args.mesh), ("subtree_genes", args.subtree),
+                      ("level_genes", args.level), ("gene_mesh", args.gene)]:
+        if key is not None:
+            break
+    ranking = load_ranking(rankings_dir(config, args.suffix), f"{name}_by_{args.by}")
+    print(ranking.top(key, args.k).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
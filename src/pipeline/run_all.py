@@ -9,6 +9,12 @@ Steps:
 
 Final output: gene_disease_mesh_final.tsv
 Columns: disease_mesh_id, gene_entrez_id, mesh_level, ot_score, evidence_count
+
+With --parallel (or pipeline.parallel) Steps 1-3 run as a task graph:
+the disease index, d2025.bin and gene2ensembl are loaded concurrently, the
+association scan starts as soon as Step 1 is done, and results are passed
+in memory instead of being re-read from intermediate files (which are
+still written).
 """
 
 import sys
@@ -16,39 +22,198 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from src.utils.config import load_config
-from src.pipeline import extract_diseases, build_crosswalk, add_entrez
+from src.utils.config import (
+    load_config, get_hierarchy_prefixes, get_association_types, get_therapeutic_areas,
+    association_suffix, ASSOCIATION_DATASETS
+)
+from src.utils.profiling import add_profile_argument, profile_tasks
+from src.pipeline.steps import DEFAULT_STEPS, resolve_steps, run_step
+from src.pipeline.scheduler import Task, run_tasks
+from src.utils.catalog import preflight
 
 
-def main():
-    """Run the complete pipeline."""
+def build_task_graph(config: dict) -> list[Task]:
+    """
+    Steps 1-3 as a task graph.
+
+    diseases ─┬─ aggregate_<type> ─┐
+    mesh ─────┼────────────────────┴─ crosswalk ─┐
+    gene2ensembl ────────────────────────────────┴─ entrez
+
+    One streaming aggregate_<type> task runs per association type
+    (pipeline.association_type), plus aggregate_datatypes with
+    pipeline.datatype_breakdown.
+    """
+    from src.pipeline import add_entrez, build_crosswalk, extract_diseases, extract_mesh, sketches
+    from src.pipeline.aggregators import get_aggregators
+
+    assoc_types = get_association_types(config)
+    aggregators = get_aggregators(config)
+    with_datatypes, datatypes = build_crosswalk.datatype_settings(config)
+    aggregate_tasks = [f"aggregate_{t}" for t in assoc_types]
+    if with_datatypes:
+        aggregate_tasks.append("aggregate_datatypes")
+
+    # Every input is checked up front, before any task starts loading
+    datasets = [ASSOCIATION_DATASETS[t] for t in assoc_types]
+    if with_datatypes:
+        datasets.append(build_crosswalk.DATATYPE_DATASET)
+    inputs = preflight(config, ["disease", "mesh", "gene2ensembl"] + datasets)
+
+    def aggregate(assoc_type):
+        def task(diseases):
+            pairs = build_crosswalk.scan_pairs(diseases)
+            batches = sketches.SketchingBatches(build_crosswalk.iter_association_batches(
+                config,
+                disease_ids=set(pairs["diseaseId"]),
+                columns=build_crosswalk.ASSOCIATION_COLUMNS,
+                assoc_type=assoc_type
+            ))
+            gene_mesh = build_crosswalk.stream_aggregate_gene_mesh(batches, pairs, aggregators=aggregators)
+            sketches.save_sketch(batches.sketch, config, association_suffix(assoc_type))
+            return gene_mesh
+        return task
+
+    def aggregate_datatypes(diseases):
+        pairs = build_crosswalk.scan_pairs(diseases)
+        batches = build_crosswalk.iter_association_batches(
+            config,
+            disease_ids=set(pairs["diseaseId"]),
+            columns=build_crosswalk.DATATYPE_COLUMNS,
+            dataset=build_crosswalk.DATATYPE_DATASET,
+            datatypes=datatypes
+        )
+        return build_crosswalk.stream_aggregate_datatypes(batches, pairs, datatypes)
+
+    def crosswalk(diseases, mesh, **aggregates):
+        combined = build_crosswalk.build_disease_mesh_crosswalk(
+            diseases, build_crosswalk.combine_hierarchies(mesh)
+        )
+        results = {
+            t: build_crosswalk.build_outputs(
+                config, combined, mesh, aggregates[f"aggregate_{t}"], verbose=False,
+                metadata=build_crosswalk.dataset_metadata(inputs, ASSOCIATION_DATASETS[t]), assoc_type=t
+            )
+            for t in assoc_types
+        }
+        output = {**results[assoc_types[0]], "association_types": results}
+        if with_datatypes:
+            output["datatypes"] = build_crosswalk.build_datatype_outputs(
+                config, aggregates["aggregate_datatypes"], mesh, verbose=False,
+                metadata=build_crosswalk.dataset_metadata(inputs, build_crosswalk.DATATYPE_DATASET)
+            )
+        return output
+
+    def entrez(crosswalk, gene2ensembl):
+        finals = {}
+        for t, outputs in crosswalk["association_types"].items():
+            gene_mesh = {prefix: out["final"] for prefix, out in outputs["hierarchies"].items()}
+            finals[t] = add_entrez.write_final_outputs(
+                config, gene2ensembl, gene_mesh, verbose=False, assoc_type=t
+            )
+        if with_datatypes:
+            add_entrez.write_datatype_outputs(config, gene2ensembl, crosswalk["datatypes"], verbose=False)
+        return finals[assoc_types[0]][get_hierarchy_prefixes(config)[0]]
+
+    return [
+        Task("diseases", lambda: extract_diseases.run(config, verbose=False)),
+        Task("mesh", lambda: extract_mesh.run_multi(config, get_hierarchy_prefixes(config), verbose=False)),
+        Task("gene2ensembl", lambda: add_entrez.load_gene2ensembl(add_entrez.download_gene2ensembl(config))),
+        *[Task(f"aggregate_{t}", aggregate(t), deps=("diseases",)) for t in assoc_types],
+        *([Task("aggregate_datatypes", aggregate_datatypes, deps=("diseases",))] if with_datatypes else []),
+        Task("crosswalk", crosswalk, deps=("diseases", "mesh", *aggregate_tasks)),
+        Task("entrez", entrez, deps=("crosswalk", "gene2ensembl")),
+    ]
+
+
+def run(
+    config: dict | None = None,
+    steps: list[str] | None = None,
+    verbose: bool = True,
+    profile: bool = False,
+    parallel: bool | None = None,
+    workers: int | None = None
+) -> dict:
+    """
+    Run the selected pipeline steps in order.
+
+    Args:
+        config: Configuration dict (loads from file if None)
+        steps: Step names (default: diseases, crosswalk, entrez)
+        verbose: Print progress messages
+        profile: Write a profile per step to <processed_dir>/profiles/
+            (when parallel, one "pipeline" profile for the task graph,
+            see profiling.profile_tasks)
+        parallel: Run Steps 1-3 as a concurrent task graph when all three
+            are selected and only one therapeutic area is configured
+            (default: pipeline.parallel)
+        workers: Thread pool size for the task graph (default:
+            pipeline.workers, else one per task)
+
+    Returns:
+        Dict of step name -> step result
+    """
+    if config is None:
+        config = load_config()
+    steps = resolve_steps(steps)
+    pipeline_config = config.get("pipeline", {})
+    if parallel is None:
+        parallel = pipeline_config.get("parallel", False)
+    if workers is None:
+        workers = pipeline_config.get("workers")
+
     print("=" * 60)
     print("OPEN TARGETS CANCER MeSH PIPELINE")
     print("=" * 60)
 
-    config = load_config()
+    # The task graph builds the primary area only; several areas share one
+    # association scan in the sequential Step 2 instead
+    if parallel and len(get_therapeutic_areas(config)) > 1:
+        print("\nSeveral therapeutic areas configured: running Steps 1-3 sequentially")
+        parallel = False
 
-    # Step 1: Extract diseases
-    print("\n")
-    extract_diseases.run(config, verbose=True)
+    results = {}
+    if parallel and all(name in steps for name in DEFAULT_STEPS):
+        print("\nSteps 1-3 (task graph)")
+        print("-" * 40)
+        with profile_tasks("pipeline", config, build_task_graph(config), enabled=profile) as tasks:
+            graph = run_tasks(tasks, max_workers=workers, verbose=verbose)
+        results.update({name: graph[name] for name in steps if name in graph})
 
-    # Step 2: Build crosswalk (extracts MeSH C04.588 live)
-    print("\n")
-    build_crosswalk.run(config, verbose=True)
-
-    # Step 3: Add Entrez IDs & produce final output
-    print("\n")
-    final = add_entrez.run(config, verbose=True)
+    for name in steps:
+        if name in results:
+            continue
+        print("\n")
+        results[name] = run_step(name, config, verbose=verbose, profile=profile)
 
     print("\n" + "=" * 60)
     print("PIPELINE COMPLETE")
     print("=" * 60)
-    print("\nFinal output: data/processed/gene_disease_mesh_final.tsv")
-    print(f"  {len(final):,} rows")
-    print(f"  Columns: disease_mesh_id, gene_entrez_id, mesh_level, ot_score, evidence_count")
-    print("\nCrosswalks: data/processed/crosswalks/")
-    print("  - disease_mesh_crosswalk.csv")
-    print("  - ensembl_entrez.csv")
+
+    if "entrez" in results:
+        final = results["entrez"]
+        print("\nFinal output: data/processed/gene_disease_mesh_final.tsv")
+        print(f"  {len(final):,} rows")
+        print(f"  Columns: disease_mesh_id, gene_entrez_id, mesh_level, ot_score, evidence_count")
+        print("\nCrosswalks: data/processed/crosswalks/")
+        print("  - disease_mesh_crosswalk.csv")
+        print("  - ensembl_entrez.csv")
+
+    return results
+
+
+def main():
+    """Run the complete pipeline."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the Open Targets Cancer MeSH pipeline")
+    parser.add_argument("--steps", default=None, help="Comma-separated steps (default: diseases,crosswalk,entrez)")
+    parser.add_argument("--parallel", action="store_true", default=None, help="Run Steps 1-3 as a concurrent task graph")
+    parser.add_argument("--workers", type=int, default=None, help="Thread pool size for --parallel")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    config = load_config()
+    run(config, steps=args.steps, profile=args.profile, parallel=args.parallel, workers=args.workers)
 
 
 if __name__ == "__main__":
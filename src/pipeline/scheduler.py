@@ -0,0 +1,113 @@
+"""
+Minimal dependency-aware task scheduler.
+
+Tasks form a DAG; each task starts as soon as all of its dependencies have
+finished, so independent work (parsing the disease index, d2025.bin,
+gene2ensembl, association shards) overlaps on a thread pool. The heavy
+work inside tasks (Parquet decoding, gzip, pandas joins) runs in C and
+releases the GIL for most of its time.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+@dataclass(frozen=True)
+class Task:
+    """A unit of work; fn is called with dependency results as keyword args."""
+
+    name: str
+    fn: Callable[..., Any]
+    deps: tuple[str, ...] = ()
+
+
+def check_graph(tasks: list[Task]) -> list[str]:
+    """
+    Validate a task graph and return a topological order.
+
+    Raises:
+        ValueError: on duplicate names, unknown dependencies or cycles
+    """
+    by_name = {}
+    for task in tasks:
+        if task.name in by_name:
+            raise ValueError(f"Duplicate task: {task.name}")
+        by_name[task.name] = task
+
+    for task in tasks:
+        unknown = [d for d in task.deps if d not in by_name]
+        if unknown:
+            raise ValueError(f"Task {task.name} depends on unknown task(s): {', '.join(unknown)}")
+
+    order, done = [], set()
+    remaining = list(tasks)
+    while remaining:
+        ready = [t for t in remaining if all(d in done for d in t.deps)]
+        if not ready:
+            raise ValueError(f"Dependency cycle among: {', '.join(t.name for t in remaining)}")
+        for t in ready:
+            order.append(t.name)
+            done.add(t.name)
+        remaining = [t for t in remaining if t.name not in done]
+
+    return order
+
+
+def run_tasks(
+    tasks: list[Task],
+    max_workers: int | None = None,
+    verbose: bool = True
+) -> dict[str, Any]:
+    """
+    Run a task DAG on a thread pool.
+
+    Args:
+        tasks: Tasks to run
+        max_workers: Pool size (default: number of tasks)
+        verbose: Print task start/finish with timings
+
+    Returns:
+        Dict of task name -> result
+
+    Raises:
+        The first exception raised by a task (remaining queued tasks are
+        not started).
+    """
+    check_graph(tasks)
+    pending = {t.name: t for t in tasks}
+    results: dict[str, Any] = {}
+    running = {}
+    started = {}
+    t0 = time.perf_counter()
+
+    def submit_ready(pool: ThreadPoolExecutor) -> None:
+        for name, task in list(pending.items()):
+            if all(d in results for d in task.deps):
+                del pending[name]
+                kwargs = {d: results[d] for d in task.deps}
+                started[name] = time.perf_counter()
+                if verbose:
+                    print(f"  [{started[name] - t0:7.1f}s] start  {name}")
+                running[pool.submit(task.fn, **kwargs)] = name
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(tasks) or 1) as pool:
+        submit_ready(pool)
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except BaseException:
+                    pending.clear()
+                    for other in running:
+                        other.cancel()
+                    raise
+                if verbose:
+                    now = time.perf_counter()
+                    print(f"  [{now - t0:7.1f}s] done   {name} ({now - started[name]:.1f}s)")
+            submit_ready(pool)
+
+    return results
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Streaming score/evidence sketches of the Step 2 association scan.
+
+Step 2 passes every association batch through an AssociationSketch on its
+way to the aggregation. The scanned rows are the associations of the
+configured areas' diseases that have a MeSH xref (build_crosswalk.scan_pairs),
+whether or not their terms fall inside the hierarchies. The parallel task
+graph starts scanning before d2025.bin is parsed, so both modes scan, and
+sketch, that same set. The sketch holds:
+
+- a relative-error quantile sketch of scores (log-spaced buckets, DDSketch
+  style), accurate to QUANTILE_ACCURACY of the value
+- a joint score × log10(evidence) histogram on fixed bins; the fixed score
+  histogram is its row sums
+- counts of the most frequent score values (the repeated fixed values from
+  automated sources, see docs/DATA_QUALITY_ISSUE.md), at most
+  MAX_SCORE_VALUES of them (Misra-Gries summary: every value seen more than
+  count / (MAX_SCORE_VALUES + 1) times is kept, its count at most
+  score_error too low)
+- exact counts of every evidenceCount value (evidence quantiles, Pareto)
+
+The score table merges as a Misra-Gries summary. Every other part is a
+count over fixed keys, so partial sketches merge by addition (merge()), and
+shards scanned in parallel combine to exactly those parts of one scan.
+Saved sketches (sketches/associations{suffix}.json)
+keep only the score values repeated at least sketches.min_repeat times.
+That keeps the file small.
+
+This stage (`python -m src quality`) writes the data-quality report and the
+association distribution figures from the saved sketches alone.
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import load_config, ensure_dir, get_association_types, association_suffix
+from src.utils.profiling import add_profile_argument, profile_step
+
+
+# Joint histogram bins: 0.01-wide score bins (the report thresholds are bin
+# edges) × log10(evidenceCount) bins; the first evidence bin holds only
+# evidenceCount = 1
+SCORE_EDGES = np.linspace(0.0, 1.0, 101)
+LOG_EVIDENCE_EDGES = np.linspace(0.0, 5.0, 41)
+
+# Quantile sketch: scores in [MIN_SCORE, 1] land in buckets of relative
+# width 2 * QUANTILE_ACCURACY; smaller positive scores share the lowest
+QUANTILE_ACCURACY = 0.005
+MIN_SCORE = 1e-6
+_GAMMA = (1 + QUANTILE_ACCURACY) / (1 - QUANTILE_ACCURACY)
+_MIN_KEY = int(np.ceil(np.log(MIN_SCORE) / np.log(_GAMMA)))
+N_QUANTILE_BUCKETS = 1 - _MIN_KEY  # keys _MIN_KEY..0
+
+# Score values kept in the frequency table (heavy hitters)
+MAX_SCORE_VALUES = 1024
+
+# Score thresholds reported in the data-quality summary
+REPORT_THRESHOLDS = (0.01, 0.05, 0.10)
+
+
+def _merge_counts(
+    values: np.ndarray, counts: np.ndarray, other_values: np.ndarray, other_counts: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Sum two value → count tables (sorted unique values)."""
+    merged, inverse = np.unique(np.concatenate([values, other_values]), return_inverse=True)
+    return merged, np.bincount(inverse, weights=np.concatenate([counts, other_counts]),
+                               minlength=len(merged)).astype("int64")
+
+
+def _top_values(values: np.ndarray, counts: np.ndarray, k: int = MAX_SCORE_VALUES) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Misra-Gries reduction of a value → count table to at most k values.
+
+    Returns:
+        (values, counts, amount subtracted from every count)
+    """
+    if len(values) <= k:
+        return values, counts, 0
+    cut = int(np.partition(counts, len(counts) - k - 1)[len(counts) - k - 1])
+    keep = counts > cut
+    return values[keep], counts[keep] - cut, cut
+
+
+@dataclass
+class AssociationSketch:
+    """Mergeable summary of association scores and evidence counts."""
+
+    count: int
+    score_sum: float
+    evidence_sum: int
+    score_min: float
+    score_max: float
+    zero_scores: int
+    quantile_counts: np.ndarray
+    joint: np.ndarray
+    score_values: np.ndarray
+    score_counts: np.ndarray
+    evidence_values: np.ndarray
+    evidence_counts: np.ndarray
+    score_error: int = 0  # max undercount in score_counts (_top_values)
+
+    @classmethod
+    def empty(cls) -> "AssociationSketch":
+        return cls(
+            count=0, score_sum=0.0, evidence_sum=0, score_min=np.inf, score_max=-np.inf, zero_scores=0,
+            quantile_counts=np.zeros(N_QUANTILE_BUCKETS, dtype="int64"),
+            joint=np.zeros((len(SCORE_EDGES) - 1, len(LOG_EVIDENCE_EDGES) - 1), dtype="int64"),
+            score_values=np.array([], dtype="float64"), score_counts=np.array([], dtype="int64"),
+            evidence_values=np.array([], dtype="int64"), evidence_counts=np.array([], dtype="int64"),
+        )
+
+    @classmethod
+    def from_batch(cls, batch: pd.DataFrame) -> "AssociationSketch":
+        """Sketch of one batch (score and evidenceCount columns)."""
+        scores = batch["score"].to_numpy(dtype="float64")
+        evidence = batch["evidenceCount"].fillna(0).to_numpy(dtype="int64")
+        sketch = cls.empty()
+        if not len(scores):
+            return sketch
+
+        positive = scores > 0
+        keys = np.ceil(np.log(scores[positive]) / np.log(_GAMMA)).astype("int64")
+        keys = np.clip(keys, _MIN_KEY, 0) - _MIN_KEY
+        score_bin = np.clip(np.searchsorted(SCORE_EDGES, scores, side="right") - 1, 0, len(SCORE_EDGES) - 2)
+        log_evidence = np.log10(np.maximum(evidence, 1))
+        evidence_bin = np.clip(
+            np.searchsorted(LOG_EVIDENCE_EDGES, log_evidence, side="right") - 1, 0, len(LOG_EVIDENCE_EDGES) - 2
+        )
+        score_values, score_counts, score_error = _top_values(*np.unique(scores, return_counts=True))
+        evidence_values, evidence_counts = np.unique(evidence, return_counts=True)
+
+        sketch.count = len(scores)
+        sketch.score_sum = float(scores.sum())
+        sketch.evidence_sum = int(evidence.sum())
+        sketch.score_min, sketch.score_max = float(scores.min()), float(scores.max())
+        sketch.zero_scores = int((~positive).sum())
+        sketch.quantile_counts = np.bincount(keys, minlength=N_QUANTILE_BUCKETS).astype("int64")
+        sketch.joint = np.bincount(
+            score_bin * sketch.joint.shape[1] + evidence_bin, minlength=sketch.joint.size
+        ).reshape(sketch.joint.shape).astype("int64")
+        sketch.score_values, sketch.score_counts = score_values, score_counts.astype("int64")
+        sketch.score_error = score_error
+        sketch.evidence_values, sketch.evidence_counts = evidence_values, evidence_counts.astype("int64")
+        return sketch
+
+    def merge(self, other: "AssociationSketch") -> "AssociationSketch":
+        """Sketch of both inputs (neither is modified)."""
+        score_values, score_counts, cut = _top_values(*_merge_counts(
+            self.score_values, self.score_counts, other.score_values, other.score_counts
+        ))
+        evidence_values, evidence_counts = _merge_counts(
+            self.evidence_values, self.evidence_counts, other.evidence_values, other.evidence_counts
+        )
+        return AssociationSketch(
+            count=self.count + other.count,
+            score_sum=self.score_sum + other.score_sum,
+            evidence_sum=self.evidence_sum + other.evidence_sum,
+            score_min=min(self.score_min, other.score_min),
+            score_max=max(self.score_max, other.score_max),
+            zero_scores=self.zero_scores + other.zero_scores,
+            quantile_counts=self.quantile_counts + other.quantile_counts,
+            joint=self.joint + other.joint,
+            score_values=score_values,
+            score_counts=score_counts,
+            evidence_values=evidence_values.astype("int64"),
+            evidence_counts=evidence_counts,
+            score_error=self.score_error + other.score_error + cut,
+        )
+
+    def score_quantile(self, q: float) -> float:
+        """Score at quantile q, within QUANTILE_ACCURACY of the exact value."""
+        if not self.count:
+            return np.nan
+        rank = q * (self.count - 1)
+        if rank < self.zero_scores:
+            return 0.0
+        bucket = int(np.searchsorted(np.cumsum(self.quantile_counts), rank - self.zero_scores, side="right"))
+        value = 2 * _GAMMA ** (bucket + _MIN_KEY) / (_GAMMA + 1)
+        return float(np.clip(value, self.score_min, self.score_max))
+
+    def evidence_quantile(self, q: float) -> int:
+        """Exact evidenceCount at quantile q (lower value)."""
+        if not self.count:
+            return 0
+        rank = q * (self.count - 1)
+        return int(self.evidence_values[np.searchsorted(np.cumsum(self.evidence_counts), rank, side="right")])
+
+    def score_histogram(self) -> np.ndarray:
+        """Counts per SCORE_EDGES bin."""
+        return self.joint.sum(axis=1)
+
+    def repeated_scores(self, min_count: int = 1) -> pd.DataFrame:
+        """
+        Score values seen at least min_count times, most frequent first.
+
+        Counts are lower bounds, at most score_error below the true ones.
+        """
+        keep = self.score_counts >= min_count
+        table = pd.DataFrame({"score": self.score_values[keep], "count": self.score_counts[keep]})
+        table["share"] = table["count"] / max(self.count, 1)
+        return table.sort_values(["count", "score"], ascending=[False, True], kind="stable").reset_index(drop=True)
+
+    def to_dict(self, min_repeat: int = 1) -> dict:
+        """JSON-ready form; only score values repeated min_repeat times are kept."""
+        keep = self.score_counts >= min_repeat
+        return {
+            "count": self.count,
+            "score_sum": self.score_sum,
+            "evidence_sum": self.evidence_sum,
+            "score_min": self.score_min if self.count else None,
+            "score_max": self.score_max if self.count else None,
+            "zero_scores": self.zero_scores,
+            "quantile_accuracy": QUANTILE_ACCURACY,
+            "quantile_counts": self.quantile_counts.tolist(),
+            "score_edges": SCORE_EDGES.tolist(),
+            "log_evidence_edges": LOG_EVIDENCE_EDGES.tolist(),
+            "joint": self.joint.tolist(),
+            "min_repeat": min_repeat,
+            "score_values": self.score_values[keep].tolist(),
+            "score_counts": self.score_counts[keep].tolist(),
+            "score_error": self.score_error,
+            "evidence_values": self.evidence_values.tolist(),
+            "evidence_counts": self.evidence_counts.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AssociationSketch":
+        if data["quantile_accuracy"] != QUANTILE_ACCURACY or data["score_edges"] != SCORE_EDGES.tolist():
+            raise ValueError("Sketch was written with different bins; rerun Step 2")
+        return cls(
+            count=data["count"],
+            score_sum=data["score_sum"],
+            evidence_sum=data["evidence_sum"],
+            score_min=np.inf if data["score_min"] is None else data["score_min"],
+            score_max=-np.inf if data["score_max"] is None else data["score_max"],
+            zero_scores=data["zero_scores"],
+            quantile_counts=np.array(data["quantile_counts"], dtype="int64"),
+            joint=np.array(data["joint"], dtype="int64"),
+            score_values=np.array(data["score_values"], dtype="float64"),
+            score_counts=np.array(data["score_counts"], dtype="int64"),
+            evidence_values=np.array(data["evidence_values"], dtype="int64"),
+            evidence_counts=np.array(data["evidence_counts"], dtype="int64"),
+            score_error=data.get("score_error", 0),
+        )
+
+
+class SketchingBatches:
+    """
+    Wrap an association batch iterator and sketch every batch it yields.
+
+    Batch sketches are merged in pairs of similar size (a binary counter),
+    so the distinct-value tables are re-sorted O(log batches) times per row.
+    """
+
+    def __init__(self, batches):
+        self.batches = batches
+        self.levels: list[AssociationSketch | None] = []
+
+    def __iter__(self):
+        for batch in self.batches:
+            sketch = AssociationSketch.from_batch(batch)
+            for level in range(len(self.levels) + 1):
+                if level == len(self.levels):
+                    self.levels.append(sketch)
+                    break
+                if self.levels[level] is None:
+                    self.levels[level] = sketch
+                    break
+                sketch = self.levels[level].merge(sketch)
+                self.levels[level] = None
+            yield batch
+
+    @property
+    def sketch(self) -> AssociationSketch:
+        """Sketch of every batch yielded so far."""
+        result = AssociationSketch.empty()
+        for level in self.levels:
+            if level is not None:
+                result = result.merge(level)
+        return result
+
+
+def sketches_dir(config: dict) -> Path:
+    return Path(config["paths"]["processed_dir"]) / "sketches"
+
+
+def save_sketch(sketch: AssociationSketch, config: dict, suffix: str = "") -> Path:
+    """Write sketches/associations{suffix}.json."""
+    min_repeat = config.get("sketches", {}).get("min_repeat", 100)
+    path = ensure_dir(sketches_dir(config)) / f"associations{suffix}.json"
+    path.write_text(json.dumps(sketch.to_dict(min_repeat)) + "\n")
+    return path
+
+
+def load_sketch(config: dict, suffix: str = "") -> AssociationSketch:
+    path = sketches_dir(config) / f"associations{suffix}.json"
+    if not path.exists():
+        raise FileNotFoundError(f"Sketch not found: {path}. Run Step 2 first")
+    return AssociationSketch.from_dict(json.loads(path.read_text()))
+
+
+def sketch_cubes(sketch: AssociationSketch) -> dict[str, pd.DataFrame]:
+    """Figure cubes (see figures.build_cubes) of the scanned associations."""
+    score_centers = SCORE_EDGES[:-1] + np.diff(SCORE_EDGES) / 2
+    evidence_centers = LOG_EVIDENCE_EDGES[:-1] + np.diff(LOG_EVIDENCE_EDGES) / 2
+    score_bin, evidence_bin = np.nonzero(sketch.joint)
+    histogram = sketch.score_histogram()
+    return {
+        "association_evidence_counts": pd.DataFrame(
+            {"evidence": sketch.evidence_values, "pairs": sketch.evidence_counts}
+        ),
+        "association_score_evidence_hist": pd.DataFrame({
+            "score": score_centers[score_bin],
+            "log_evidence": evidence_centers[evidence_bin],
+            "count": sketch.joint[score_bin, evidence_bin],
+        }),
+        "association_score_hist": pd.DataFrame({
+            "bin_left": SCORE_EDGES[:-1], "bin_right": SCORE_EDGES[1:], "count": histogram,
+        }),
+    }
+
+
+def quality_report(sketch: AssociationSketch, title: str, top: int = 10) -> str:
+    """Markdown data-quality summary (cf. docs/DATA_QUALITY_ISSUE.md)."""
+    total = max(sketch.count, 1)
+    lines = [f"# {title}", "", f"**Associations scanned**: {sketch.count:,}", ""]
+
+    repeated = sketch.repeated_scores().head(top)
+    lines += ["## Most repeated score values", "", "| Score | Associations | % of Total |",
+              "|-------|-------------|------------|"]
+    for row in repeated.itertuples():
+        lines.append(f"| {row.score:.6f} | {row.count:,} | {row.share * 100:.1f}% |")
+    lines.append(f"| **TOTAL** | **{repeated['count'].sum():,}** | **{repeated['share'].sum() * 100:.1f}%** |")
+    if sketch.score_error:
+        lines += ["", f"Counts are up to {sketch.score_error:,} too low (top {MAX_SCORE_VALUES:,} score values kept)."]
+
+    histogram = sketch.score_histogram()
+    edges = np.searchsorted(SCORE_EDGES, np.array(REPORT_THRESHOLDS) - 1e-12)
+    below = np.cumsum(histogram)[edges - 1]
+    low_bins = edges[0]
+    low = int(histogram[:low_bins].sum())
+    low_single = int(sketch.joint[:low_bins, 0].sum())
+    lines += ["", "## Evidence count analysis", "",
+              f"- Associations with score < {REPORT_THRESHOLDS[0]}: **{low:,}** ({low / total * 100:.1f}%)",
+              f"- Of these, evidence_count = 1: **{low_single:,}** ({low_single / max(low, 1) * 100:.1f}%)",
+              "", "## Score distribution", "", "| Threshold | Count | % of Total |",
+              "|-----------|-------|------------|"]
+    for threshold, count in zip(REPORT_THRESHOLDS, below):
+        lines.append(f"| < {threshold:.2f} | {int(count):,} | {count / total * 100:.1f}% |")
+    lines.append(f"| >= {REPORT_THRESHOLDS[-1]:.2f} | {sketch.count - int(below[-1]):,} | "
+                 f"{(sketch.count - below[-1]) / total * 100:.1f}% |")
+
+    quantiles = (0.5, 0.9, 0.99)
+    lines += ["", "## Quantiles", "", "| Quantile | Score | Evidence count |", "|----------|-------|----------------|"]
+    for q in quantiles:
+        lines.append(f"| {q:g} | {sketch.score_quantile(q):.4g} | {sketch.evidence_quantile(q):,} |")
+    lines += ["", f"Mean score {sketch.score_sum / total:.4f}, total evidence {sketch.evidence_sum:,}.",
+              f"Score quantiles are within {QUANTILE_ACCURACY:.1%} of the exact value.", ""]
+    return "\n".join(lines)
+
+
+def run(config: dict | None = None, verbose: bool = True) -> dict[str, AssociationSketch]:
+    """
+    Write data-quality reports and distribution figures from the sketches.
+
+    Args:
+        config: Configuration dict (loads from file if None)
+        verbose: Print progress messages
+
+    Returns:
+        Dict of association type -> sketch
+    """
+    from src.pipeline.figures import SKETCH_FIGURES, render_all
+
+    if config is None:
+        config = load_config()
+
+    if verbose:
+        print("Data quality: reports from the association sketches")
+        print("-" * 40)
+
+    sketches = {}
+    for assoc_type in get_association_types(config):
+        suffix = association_suffix(assoc_type)
+        sketch = load_sketch(config, suffix)
+        report_path = sketches_dir(config) / f"association_quality{suffix}.md"
+        report_path.write_text(quality_report(sketch, f"Score and evidence distribution ({assoc_type} associations)"))
+        if verbose:
+            print(f"  {assoc_type}: {sketch.count:,} associations, "
+                  f"median score {sketch.score_quantile(0.5):.4g}")
+            print(f"    Saved: {report_path}")
+        sketches[assoc_type] = sketch
+
+    # Figures for the primary association type
+    primary = sketches[get_association_types(config)[0]]
+    figures_dir = ensure_dir(Path(config["paths"]["processed_dir"]) / "figures")
+    paths = render_all(sketch_cubes(primary), figures_dir, names=list(SKETCH_FIGURES), workers=1)
+    if verbose:
+        print(f"  Saved {len(paths)} figures to {figures_dir}")
+
+    return sketches
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Data-quality reports from the association sketches")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    config = load_config()
+    with profile_step("quality", config, enabled=args.profile):
+        run(config, verbose=True)
+
+
+if __name__ == "__main__":
+    main()
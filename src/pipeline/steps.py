@@ -0,0 +1,191 @@
+"""
+Pipeline step registry.
+
+Describes every step (module, entry function, inputs, outputs) without
+importing it, so planning, status checks and --help stay fast. Step
+modules and their heavy dependencies (pandas, pyarrow) are only imported
+by run_step().
+"""
+
+import importlib
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class Step:
+    """A pipeline step; inputs/outputs are (config path key, glob) pairs."""
+
+    name: str
+    module: str
+    description: str
+    inputs: tuple[tuple[str, str], ...] = ()
+    outputs: tuple[tuple[str, str], ...] = ()
+    entry: str = "run"
+    verbose_arg: bool = True
+
+
+STEPS = {
+    step.name: step for step in [
+        Step(
+            "catalog", "src.utils.catalog",
+            "Catalog input sizes, fingerprints, row counts and schemas (metadata only)",
+            outputs=(("processed_dir", "input_catalog.json"),),
+        ),
+        Step(
+            "diseases", "src.pipeline.extract_diseases",
+            "Step 1: extract cancer diseases from the OT disease index",
+            inputs=(("opentargets_dir", "disease"),),
+            outputs=(("processed_dir", "intermediate/cancer_diseases_mesh_crosswalk*"),),
+        ),
+        Step(
+            "mesh", "src.pipeline.extract_mesh",
+            "Extract MeSH hierarchies from d2025.bin (Step 2 does this live)",
+            inputs=(("mesh_dir", "d2025.bin"),),
+            outputs=(("mesh_dir", "mesh_*.csv"),),
+            entry="run_multi",
+        ),
+        Step(
+            "crosswalk", "src.pipeline.build_crosswalk",
+            "Step 2: build disease → MeSH crosswalk and gene-MeSH aggregate",
+            inputs=(
+                ("processed_dir", "intermediate/cancer_diseases_mesh_crosswalk*"),
+                ("opentargets_dir", "association_overall_direct"),
+            ),
+            outputs=(
+                ("processed_dir", "crosswalks/disease_mesh_crosswalk*.csv"),
+                ("processed_dir", "intermediate/gene_mesh_pre_entrez*"),
+            ),
+        ),
+        Step(
+            "entrez", "src.pipeline.add_entrez",
+            "Step 3: map Ensembl → Entrez and write the final TSV",
+            inputs=(("processed_dir", "intermediate/gene_mesh_pre_entrez*"),),
+            outputs=(("processed_dir", "gene_disease_mesh_final*.tsv"),),
+        ),
+        Step(
+            "summaries", "src.pipeline.summaries",
+            "Summary tables from the Step 2 aggregate",
+            inputs=(
+                ("processed_dir", "intermediate/gene_mesh_pre_entrez*"),
+                ("processed_dir", "crosswalks/disease_mesh_crosswalk*.csv"),
+            ),
+            outputs=(("processed_dir", "summaries/*.csv"),),
+        ),
+        Step(
+            "rankings", "src.pipeline.rankings",
+            "Precomputed top-k genes per MeSH term/level/subtree and MeSH terms per gene",
+            inputs=(("processed_dir", "gene_disease_mesh_final*.tsv"),),
+            outputs=(("processed_dir", "rankings*/rankings.json"),),
+        ),
+        Step(
+            "enrichment", "src.analysis.enrichment",
+            "Gene-set enrichment index: packed gene bitsets per MeSH term and threshold",
+            inputs=(("processed_dir", "gene_disease_mesh_final*.tsv"),),
+            outputs=(("processed_dir", "enrichment*/enrichment.json"),),
+        ),
+        Step(
+            "quality", "src.pipeline.sketches",
+            "Data-quality reports and association distribution figures from the Step 2 sketches",
+            inputs=(("processed_dir", "sketches/associations*.json"),),
+            outputs=(("processed_dir", "sketches/association_quality*.md"),),
+        ),
+        Step(
+            "figures", "src.pipeline.figures",
+            "Summary cubes and figures",
+            inputs=(("processed_dir", "gene_disease_mesh_final.tsv"),),
+            outputs=(("processed_dir", "cubes/*.parquet"), ("processed_dir", "figures/*/*.png")),
+        ),
+        Step(
+            "matrix", "src.analysis.gene_mesh_matrix",
+            "Sparse gene × MeSH matrix export",
+            inputs=(("processed_dir", "gene_disease_mesh_final.tsv"),),
+            outputs=(("processed_dir", "matrices/*.npz"),),
+        ),
+        Step(
+            "name_match", "src.analysis.mesh_name_match",
+            "MeSH heading/entry-term suggestions for diseases without a MeSH xref",
+            inputs=(
+                ("mesh_dir", "d2025.bin"),
+                ("processed_dir", "intermediate/cancer_diseases_mesh_crosswalk*"),
+            ),
+            outputs=(("processed_dir", "mesh_name_suggestions.tsv"),),
+        ),
+        Step(
+            "audit", "src.analysis.audit_missing_mesh",
+            "MeSH coverage audit",
+            inputs=(
+                ("processed_dir", "intermediate/cancer_diseases_mesh_crosswalk*"),
+                ("opentargets_dir", "association_overall_direct"),
+            ),
+            outputs=(("processed_dir", "audit_missing_mesh_report.txt"),),
+            verbose_arg=False,
+        ),
+    ]
+}
+
+# Steps run by `run` / run_all when --steps is not given
+DEFAULT_STEPS = ("diseases", "crosswalk", "entrez")
+
+
+def resolve_steps(spec: str | list[str] | None) -> list[str]:
+    """
+    Parse a step selection ("diseases,crosswalk" or a list) in pipeline order.
+
+    Raises:
+        ValueError: for unknown step names
+    """
+    if not spec:
+        return list(DEFAULT_STEPS)
+    names = spec.split(",") if isinstance(spec, str) else list(spec)
+    names = [n.strip() for n in names if n.strip()]
+
+    unknown = [n for n in names if n not in STEPS]
+    if unknown:
+        raise ValueError(f"Unknown step(s): {', '.join(unknown)} (choose from {', '.join(STEPS)})")
+
+    order = list(STEPS)
+    return sorted(dict.fromkeys(names), key=order.index)
+
+
+def _matches(config: dict, key: str, pattern: str) -> list[Path]:
+    """Existing paths for a (config path key, glob) pair."""
+    base = Path(config["paths"][key])
+    if any(c in pattern for c in "*?["):
+        return list(base.glob(pattern))
+    return [base / pattern] if (base / pattern).exists() else []
+
+
+def step_status(step: Step, config: dict) -> dict:
+    """
+    Check a step's inputs and outputs on disk (no data is read).
+
+    Returns:
+        Dict with missing_inputs, existing_outputs and ready/done flags
+    """
+    missing = [f"{k}/{p}" for k, p in step.inputs if not _matches(config, k, p)]
+    existing = [f"{k}/{p}" for k, p in step.outputs if _matches(config, k, p)]
+    return {
+        "missing_inputs": missing,
+        "existing_outputs": existing,
+        "ready": not missing,
+        "done": len(existing) == len(step.outputs),
+    }
+
+
+def run_step(name: str, config: dict, verbose: bool = True, profile: bool = False, **options):
+    """
+    Import a step module and run it.
+
+    With profile=True the step is wrapped in profiling.profile_step and its
+    profile files are named after the step.
+    """
+    from src.utils.profiling import profile_step
+
+    step = STEPS[name]
+    module = importlib.import_module(step.module)
+    entry = getattr(module, step.entry)
+    if step.verbose_arg:
+        options["verbose"] = verbose
+    with profile_step(name, config, enabled=profile):
+        return entry(config, **options)
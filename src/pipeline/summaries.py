@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Pipeline stage: summary tables (pipeline.generate_summaries).
+
+Produces, per hierarchy, in data/processed/summaries/:
+- summary_by_mesh_level.csv: level, genes, diseases, mesh_terms, associations, mean_score, median_score
+- mesh_term_summary.csv: meshId, mesh_name, level, genes, diseases, associations, mean_score, max_score
+- mesh_level_4_5_summary.csv: mesh_term_summary restricted to levels 4-5
+
+All tables are grouping sets, (meshId) and (meshLevel), over the gene-MeSH
+aggregate that Step 2 already builds. Associations are never re-read.
+Score statistics are therefore over gene-MeSH pairs (the rows of the final
+dataset), and `associations` counts the OT disease-gene associations that
+were aggregated into them. The archived create_summaries computed score
+statistics per association instead.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import (
+    load_config, ensure_dir, get_hierarchy_prefixes, hierarchy_suffix,
+    get_association_types, association_suffix
+)
+from src.utils.profiling import add_profile_argument, profile_step
+from src.utils.intermediate import read_intermediate
+
+
+SUMMARY_LEVELS = (4, 5)
+
+
+def summarize(gene_mesh: pd.DataFrame, crosswalk: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """
+    Compute the summary tables from a gene-mesh aggregate.
+
+    Args:
+        gene_mesh: Step 2 output (targetId, meshId, score, evidenceCount,
+            associationCount, meshLevel)
+        crosswalk: Disease → MeSH crosswalk for the same hierarchy
+            (diseaseId, meshId, mesh_name)
+
+    Returns:
+        Dict of summary name → DataFrame
+    """
+    if "associationCount" not in gene_mesh.columns:
+        raise ValueError("gene-mesh aggregate has no associationCount column; re-run Step 2")
+
+    disease_pairs = crosswalk[["diseaseId", "meshId"]].drop_duplicates()
+    mesh_names = crosswalk.drop_duplicates("meshId").set_index("meshId")["mesh_name"]
+
+    # Grouping set (meshId): one row per (gene, meshId) in the aggregate,
+    # so the gene count is the group size
+    terms = gene_mesh.groupby("meshId").agg(
+        level=("meshLevel", "first"),
+        genes=("targetId", "size"),
+        associations=("associationCount", "sum"),
+        mean_score=("score", "mean"),
+        max_score=("score", "max"),
+    )
+    terms["diseases"] = disease_pairs.groupby("meshId")["diseaseId"].nunique()
+    terms["diseases"] = terms["diseases"].fillna(0).astype(int)
+    terms["mesh_name"] = mesh_names
+    terms = terms.reset_index()[
+        ["meshId", "mesh_name", "level", "genes", "diseases", "associations", "mean_score", "max_score"]
+    ].round(4)
+    terms = terms.sort_values("associations", ascending=False, kind="stable").reset_index(drop=True)
+
+    # Grouping set (meshLevel)
+    levels = gene_mesh.groupby("meshLevel").agg(
+        genes=("targetId", "nunique"),
+        mesh_terms=("meshId", "nunique"),
+        associations=("associationCount", "sum"),
+        mean_score=("score", "mean"),
+        median_score=("score", "median"),
+    )
+    disease_levels = disease_pairs.merge(terms[["meshId", "level"]], on="meshId")
+    levels["diseases"] = disease_levels.groupby("level")["diseaseId"].nunique()
+    levels["diseases"] = levels["diseases"].fillna(0).astype(int)
+    levels = levels.rename_axis("level").reset_index()[
+        ["level", "genes", "diseases", "mesh_terms", "associations", "mean_score", "median_score"]
+    ].round(4)
+
+    lo, hi = SUMMARY_LEVELS
+    level_4_5 = terms[(terms["level"] >= lo) & (terms["level"] <= hi)].reset_index(drop=True)
+
+    return {
+        "summary_by_mesh_level": levels,
+        "mesh_term_summary": terms,
+        "mesh_level_4_5_summary": level_4_5,
+    }
+
+
+def write_summaries(summaries: dict[str, pd.DataFrame], config: dict, suffix: str = "") -> Path:
+    """Write summary tables to processed_dir/summaries."""
+    summaries_dir = ensure_dir(Path(config["paths"]["processed_dir"]) / "summaries")
+    for name, table in summaries.items():
+        table.to_csv(summaries_dir / f"{name}{suffix}.csv", index=False)
+    return summaries_dir
+
+
+def run(config: dict | None = None, verbose: bool = True) -> dict[str, dict[str, pd.DataFrame]]:
+    """
+    Build summaries from the Step 2 outputs on disk.
+
+    Step 2 already calls summarize() in-process when
+    pipeline.generate_summaries is set; this is for standalone reruns.
+
+    Returns:
+        Dict of hierarchy prefix → summary tables (for indirect
+        associations the keys are "<prefix>_indirect")
+    """
+    if config is None:
+        config = load_config()
+
+    processed_dir = Path(config["paths"]["processed_dir"])
+    prefixes = get_hierarchy_prefixes(config)
+
+    if verbose:
+        print("Summaries: grouping sets over the gene-mesh aggregate")
+        print("-" * 40)
+
+    outputs = {}
+    for prefix in prefixes:
+        suffix = hierarchy_suffix(prefixes, prefix)
+
+        crosswalk_path = processed_dir / "crosswalks" / f"disease_mesh_crosswalk{suffix}.csv"
+        if not crosswalk_path.exists():
+            raise FileNotFoundError(f"Run Step 2 first: {crosswalk_path}")
+        crosswalk = pd.read_csv(crosswalk_path)
+
+        for assoc_type in get_association_types(config):
+            type_suffix = association_suffix(assoc_type)
+            gene_mesh = read_intermediate(
+                config, f"gene_mesh_pre_entrez{type_suffix}{suffix}", hint="Run Step 2 first"
+            )
+
+            summaries = summarize(gene_mesh, crosswalk)
+            summaries_dir = write_summaries(summaries, config, type_suffix + suffix)
+            if verbose:
+                print(f"  {prefix} {assoc_type}: {len(summaries['mesh_term_summary'])} MeSH terms, "
+                      f"{len(summaries['summary_by_mesh_level'])} levels")
+            outputs[prefix + type_suffix] = summaries
+
+    if verbose:
+        print(f"  Saved: {summaries_dir}")
+
+    return outputs
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Build summary tables")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    config = load_config()
+    with profile_step("summaries", config, enabled=args.profile):
+        run(config, verbose=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Sorted tree-number index for MeSH prefix and subtree range queries.
+
+MeSH tree numbers sort so that every subtree is contiguous:
+
+    C04.588.894           Thoracic Neoplasms
+    C04.588.894.797       Respiratory Tract Neoplasms
+    C04.588.894.797.520   Lung Neoplasms
+    C04.588.894.797.760   ...
+    C04.588.894.800       ...
+
+so over the sorted tree_number column any query is a range found with two
+binary searches (np.searchsorted):
+
+- prefix("C04.588"):      [searchsorted("C04.588"), searchsorted("C04.589"))
+- subtree("C04.588.894"): the node and its descendants,
+                          [searchsorted("C04.588.894"), searchsorted("C04.588.894/"))
+
+("/" sorts right after "."; tree numbers only contain letters, digits and
+dots, so nothing else falls inside the range.)
+
+A table sorted by tree number (see sort_by_tree) answers "all genes for
+this organ system" with the row range itself, a slice instead of a scan.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+def _next_string(prefix: str) -> str:
+    """Smallest string greater than every string starting with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+@dataclass
+class TreeIndex:
+    """Sorted tree numbers plus the source row of each."""
+
+    tree_numbers: np.ndarray
+    rows: np.ndarray
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, column: str = "tree_number") -> "TreeIndex":
+        """Index a table's tree_number column (the table need not be sorted)."""
+        values = df[column].to_numpy(dtype=str)
+        order = np.argsort(values, kind="stable")
+        return cls(tree_numbers=values[order], rows=order)
+
+    def _range(self, low: str, high: str) -> tuple[int, int]:
+        start = int(np.searchsorted(self.tree_numbers, low, side="left"))
+        stop = int(np.searchsorted(self.tree_numbers, high, side="left"))
+        return start, stop
+
+    def prefix_range(self, prefix: str) -> tuple[int, int]:
+        """Sorted positions [start, stop) of tree numbers starting with prefix."""
+        if not prefix:
+            return 0, len(self.tree_numbers)
+        return self._range(prefix, _next_string(prefix))
+
+    def subtree_range(self, node: str) -> tuple[int, int]:
+        """Sorted positions [start, stop) of node and all of its descendants."""
+        return self._range(node, node + "/")
+
+    def subtree_ranges(self) -> tuple[np.ndarray, np.ndarray]:
+        """Subtree range of every indexed tree number, aligned with tree_numbers."""
+        starts = np.searchsorted(self.tree_numbers, self.tree_numbers, side="left")
+        stops = np.searchsorted(self.tree_numbers, np.char.add(self.tree_numbers, "/"), side="left")
+        return starts, stops
+
+    def prefix(self, prefix: str) -> np.ndarray:
+        """Source rows whose tree number starts with prefix."""
+        start, stop = self.prefix_range(prefix)
+        return self.rows[start:stop]
+
+    def subtree(self, node: str) -> np.ndarray:
+        """Source rows of node and its descendants."""
+        start, stop = self.subtree_range(node)
+        return self.rows[start:stop]
+
+
+def sort_by_tree(gene_mesh: pd.DataFrame, hierarchy: pd.DataFrame) -> tuple[pd.DataFrame, TreeIndex]:
+    """
+    Gene-MeSH table ordered by tree number, with its index.
+
+    Each row is repeated once per tree number of its MeSH term, so a
+    subtree query returns a contiguous row range of the result; terms
+    with several positions inside the same subtree appear once per position.
+
+    Args:
+        gene_mesh: Table with disease_mesh_id (e.g. the final dataset)
+        hierarchy: MeSH hierarchy (mesh_id, tree_number)
+
+    Returns:
+        (table with a tree_number column, sorted by it; TreeIndex over it)
+    """
+    tree = hierarchy[["mesh_id", "tree_number"]].drop_duplicates()
+    table = gene_mesh.merge(tree, left_on="disease_mesh_id", right_on="mesh_id").drop(columns="mesh_id")
+    table = table.sort_values("tree_number", kind="stable").reset_index(drop=True)
+    return table, TreeIndex.from_frame(table)
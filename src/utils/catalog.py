@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Metadata-only catalog of the pipeline's raw inputs, and preflight checks.
+
+The catalog (processed_dir/input_catalog.json) records, for every file of
+every input: size, mtime, a fingerprint, the row count and the schema. Only
+Parquet footers and the first/last bytes of other files are read, so
+building it takes well under a second even for the full association set.
+The fingerprint of other files also covers their mtime, since their middle
+is never hashed.
+
+preflight() re-checks the inputs of a step against the catalog before any
+heavy I/O and fails fast on:
+- missing files, or shards added/removed since the catalog was built
+- truncated or corrupt Parquet files (bad magic / unreadable footer)
+- schema drift (required columns missing, shards with differing schemas)
+- files whose fingerprint changed (e.g. a replaced d2025.bin), and flat
+  files modified in place (same size, new mtime)
+
+Without a catalog only the structural checks run. Steps embed the input
+fingerprints and row counts in the key-value metadata of the intermediates
+they write (see output_metadata), so freshness can be checked from file
+footers alone.
+
+Usage:
+    python -m src catalog            # (re)build the catalog
+    python -m src catalog --check    # validate inputs + intermediate freshness
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import load_config, ensure_dir
+
+CATALOG_NAME = "input_catalog.json"
+METADATA_KEY = b"ot_cancer_mesh.inputs"
+
+# Bytes hashed at each end of non-Parquet files
+SAMPLE_BYTES = 1 << 20
+
+
+@dataclass(frozen=True)
+class InputSpec:
+    """A raw input; path is relative to the config path key."""
+
+    name: str
+    path_key: str
+    path: str
+    kind: str  # "parquet" (dataset directory), "mesh" or "gzip_tsv"
+    columns: tuple[str, ...] = ()
+    downloadable: bool = False  # fetched by its step when missing
+
+
+INPUTS = {
+    spec.name: spec for spec in [
+        InputSpec(
+            "disease", "opentargets_dir", "disease", "parquet",
+            columns=("id", "name", "ancestors", "parents", "dbXRefs"),
+        ),
+        InputSpec(
+            "association_overall_direct", "opentargets_dir", "association_overall_direct", "parquet",
+            columns=("diseaseId", "targetId", "score", "evidenceCount"),
+        ),
+        InputSpec(
+            "association_by_overall_indirect", "opentargets_dir", "association_by_overall_indirect", "parquet",
+            columns=("diseaseId", "targetId", "score", "evidenceCount"),
+        ),
+        InputSpec(
+            "association_by_datatype_direct", "opentargets_dir", "association_by_datatype_direct", "parquet",
+            columns=("diseaseId", "targetId", "datatypeId", "score", "evidenceCount"),
+        ),
+        InputSpec("mesh", "mesh_dir", "d2025.bin", "mesh", downloadable=True),
+        InputSpec(
+            "gene2ensembl", "data_dir", "ncbi/gene2ensembl.gz", "gzip_tsv",
+            columns=("#tax_id", "GeneID", "Ensembl_gene_identifier"),
+            downloadable=True,
+        ),
+    ]
+}
+
+
+def input_path(config: dict, spec: InputSpec) -> Path:
+    """Absolute path of an input (file or dataset directory)."""
+    return Path(config["paths"][spec.path_key]) / spec.path
+
+
+def catalog_path(config: dict) -> Path:
+    """Location of the catalog file."""
+    return Path(config["paths"]["processed_dir"]) / CATALOG_NAME
+
+
+def _input_files(config: dict, spec: InputSpec) -> list[Path]:
+    """Files making up an input (sorted), empty if missing."""
+    path = input_path(config, spec)
+    if spec.kind == "parquet":
+        return sorted(path.glob("**/*.parquet")) if path.is_dir() else []
+    return [path] if path.is_file() else []
+
+
+def _parquet_entry(path: Path) -> dict:
+    """Size, footer fingerprint, row count and schema from a Parquet footer."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        if size < 12:
+            raise ValueError("file too small to be Parquet")
+        f.seek(-8, os.SEEK_END)
+        tail = f.read(8)
+        if tail[4:] != b"PAR1":
+            raise ValueError("missing Parquet magic (truncated?)")
+        footer_len = int.from_bytes(tail[:4], "little")
+        if footer_len + 12 > size:
+            raise ValueError("footer length exceeds file size (truncated?)")
+        f.seek(-8 - footer_len, os.SEEK_END)
+        footer = f.read(footer_len)
+
+    # The footer holds every column chunk's offsets, sizes and statistics,
+    # so together with the size it identifies the file contents. Row count
+    # and schema are parsed from the same bytes (magic + footer + tail is a
+    # valid metadata-only Parquet buffer), so the file is read once
+    parquet = pq.ParquetFile(pa.BufferReader(b"PAR1" + footer + tail))
+    return {
+        "size": size,
+        "fingerprint": hashlib.sha256(size.to_bytes(8, "little") + footer).hexdigest(),
+        "rows": parquet.metadata.num_rows,
+        "columns": [f"{field.name}: {field.type}" for field in parquet.schema_arrow],
+    }
+
+
+def _sampled_entry(path: Path, spec: InputSpec) -> dict:
+    """Size, mtime and head + tail fingerprint of a flat file, plus header checks."""
+    stat = path.stat()
+    size = stat.st_size
+    # Only the ends are hashed, so an in-place edit or a regenerated file of
+    # the same size is caught by its mtime
+    digest = hashlib.sha256(size.to_bytes(8, "little") + stat.st_mtime_ns.to_bytes(8, "little"))
+    with open(path, "rb") as f:
+        digest.update(f.read(SAMPLE_BYTES))
+        if size > 2 * SAMPLE_BYTES:
+            f.seek(-SAMPLE_BYTES, os.SEEK_END)
+        digest.update(f.read(SAMPLE_BYTES))
+
+    entry = {"size": size, "fingerprint": digest.hexdigest(), "rows": None, "columns": []}
+
+    if spec.kind == "mesh":
+        with open(path, "rb") as f:
+            if not f.readline().startswith(b"*NEWRECORD"):
+                raise ValueError("not a MeSH ASCII descriptor file (no *NEWRECORD header)")
+    elif spec.kind == "gzip_tsv":
+        with gzip.open(path, "rt") as f:
+            entry["columns"] = f.readline().rstrip("\n").split("\t")
+
+    return entry
+
+
+def _file_entry(path: Path, spec: InputSpec) -> dict:
+    if spec.kind == "parquet":
+        entry = _parquet_entry(path)
+    else:
+        entry = _sampled_entry(path, spec)
+    entry["mtime_ns"] = path.stat().st_mtime_ns
+    return entry
+
+
+def describe_input(config: dict, spec: InputSpec) -> dict | None:
+    """
+    Catalog entry for one input, or None if it does not exist.
+
+    Raises:
+        ValueError: if a file is structurally invalid
+    """
+    root = input_path(config, spec)
+    files = _input_files(config, spec)
+    if not files:
+        return None
+
+    entries = {}
+    for path in files:
+        rel = str(path.relative_to(root)) if spec.kind == "parquet" else path.name
+        try:
+            entries[rel] = _file_entry(path, spec)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"{spec.name}: {rel}: {e}") from e
+
+    fingerprint = hashlib.sha256(
+        "".join(f"{rel}:{e['fingerprint']}" for rel, e in entries.items()).encode()
+    ).hexdigest()
+    rows = [e["rows"] for e in entries.values()]
+    return {
+        "path": str(root),
+        "fingerprint": fingerprint,
+        "rows": sum(rows) if None not in rows else None,
+        "size": sum(e["size"] for e in entries.values()),
+        "columns": next(iter(entries.values()))["columns"],
+        "files": entries,
+    }
+
+
+def build_catalog(config: dict, names: list[str] | None = None) -> dict:
+    """
+    Describe the inputs (default: all) without reading any data pages.
+
+    Args:
+        config: Configuration dict
+        names: Input names (keys of INPUTS)
+
+    Returns:
+        Catalog dict: {"created": ..., "inputs": {name: entry}}
+    """
+    inputs = {}
+    for name in names or list(INPUTS):
+        entry = describe_input(config, INPUTS[name])
+        if entry is not None:
+            inputs[name] = entry
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "inputs": inputs}
+
+
+def write_catalog(catalog: dict, config: dict) -> Path:
+    """Save the catalog to processed_dir/input_catalog.json."""
+    path = catalog_path(config)
+    ensure_dir(path.parent)
+    path.write_text(json.dumps(catalog, indent=2) + "\n")
+    return path
+
+
+def load_catalog(config: dict) -> dict | None:
+    """Load the saved catalog, or None if there is none."""
+    path = catalog_path(config)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def check_input(config: dict, spec: InputSpec, cataloged: dict | None = None) -> tuple[dict | None, list[str]]:
+    """
+    Check one input's files, optionally against its catalog entry.
+
+    Returns:
+        (current entry or None if missing, list of problems)
+    """
+    try:
+        entry = describe_input(config, spec)
+    except ValueError as e:
+        return None, [str(e)]
+
+    if entry is None:
+        if spec.downloadable:
+            return None, []
+        return None, [f"{spec.name}: not found at {input_path(config, spec)}"]
+
+    problems = []
+    if spec.columns:
+        missing = [c for c in spec.columns if not any(col.split(": ")[0] == c for col in entry["columns"])]
+        if missing:
+            problems.append(f"{spec.name}: missing column(s) {', '.join(missing)}")
+    schemas = {tuple(e["columns"]) for e in entry["files"].values()}
+    if len(schemas) > 1:
+        problems.append(f"{spec.name}: files have {len(schemas)} different schemas")
+
+    if cataloged is not None:
+        added = sorted(set(entry["files"]) - set(cataloged["files"]))
+        removed = sorted(set(cataloged["files"]) - set(entry["files"]))
+        if added:
+            problems.append(f"{spec.name}: {len(added)} file(s) not in catalog (e.g. {added[0]})")
+        if removed:
+            problems.append(f"{spec.name}: {len(removed)} cataloged file(s) missing (e.g. {removed[0]})")
+        for rel in sorted(set(entry["files"]) & set(cataloged["files"])):
+            now, then = entry["files"][rel], cataloged["files"][rel]
+            if now["size"] != then["size"]:
+                problems.append(f"{spec.name}: {rel} size {now['size']:,} != cataloged {then['size']:,}")
+            elif spec.kind != "parquet" and now["mtime_ns"] != then.get("mtime_ns"):
+                problems.append(f"{spec.name}: {rel} modified since the catalog was built (same size, new mtime)")
+            elif now["fingerprint"] != then["fingerprint"]:
+                problems.append(f"{spec.name}: {rel} changed since the catalog was built")
+
+    return entry, problems
+
+
+def preflight(config: dict, names: list[str], verbose: bool = True) -> dict:
+    """
+    Validate a step's inputs before loading them.
+
+    Skipped (returns {}) when pipeline.preflight is false.
+
+    Args:
+        config: Configuration dict
+        names: Input names (keys of INPUTS)
+        verbose: Print a one-line result
+
+    Returns:
+        Dict of input name -> current catalog entry (missing downloadable
+        inputs are left out)
+
+    Raises:
+        ValueError: listing every problem found
+    """
+    if not config.get("pipeline", {}).get("preflight", True):
+        return {}
+
+    start = time.perf_counter()
+    catalog = load_catalog(config)
+    cataloged = (catalog or {}).get("inputs", {})
+
+    entries, problems = {}, []
+    for name in names:
+        entry, input_problems = check_input(config, INPUTS[name], cataloged.get(name))
+        problems.extend(input_problems)
+        if entry is not None:
+            entries[name] = entry
+
+    if problems:
+        hint = " (re-run `python -m src catalog` if these changes are intended)" if catalog else ""
+        raise ValueError("Preflight failed" + hint + ":\n  - " + "\n  - ".join(problems))
+
+    if verbose:
+        source = "catalog" if catalog else "no catalog, structure only"
+        print(f"  Preflight: {', '.join(entries) or 'nothing to check'} ok "
+              f"({source}, {(time.perf_counter() - start) * 1000:.0f} ms)")
+    return entries
+
+
+def output_metadata(entries: dict) -> dict[bytes, bytes]:
+    """Key-value metadata recording input fingerprints and row counts."""
+    summary = {
+        name: {"fingerprint": entry["fingerprint"], "rows": entry["rows"]}
+        for name, entry in entries.items()
+    }
+    return {METADATA_KEY: json.dumps(summary, sort_keys=True).encode()}
+
+
+def stale_inputs(config: dict, name: str, catalog: dict | None = None) -> list[str] | None:
+    """
+    Compare an intermediate's embedded input fingerprints with the catalog.
+
+    Only the file footer/schema is read.
+
+    Returns:
+        Names of inputs that changed, or None if the intermediate is missing
+        or carries no input metadata
+    """
+    from src.utils.intermediate import read_intermediate_metadata
+
+    metadata = read_intermediate_metadata(config, name)
+    if metadata is None or METADATA_KEY not in metadata:
+        return None
+    recorded = json.loads(metadata[METADATA_KEY])
+
+    current = (catalog or load_catalog(config) or {}).get("inputs", {})
+    return sorted(
+        input_name for input_name, info in recorded.items()
+        if current.get(input_name, {}).get("fingerprint") != info["fingerprint"]
+    )
+
+
+def run(config: dict | None = None, check: bool = False, verbose: bool = True) -> dict:
+    """
+    Build and save the input catalog, or with check=True validate the
+    inputs against it and report which intermediates are stale.
+
+    Returns:
+        The catalog
+    """
+    if config is None:
+        config = load_config()
+
+    if check:
+        catalog = load_catalog(config)
+        if catalog is None:
+            raise FileNotFoundError(f"No catalog: {catalog_path(config)}. Run: python -m src catalog")
+        preflight(config, list(catalog["inputs"]), verbose=verbose)
+
+        from src.utils.intermediate import INTERMEDIATE_FORMATS
+        intermediate_dir = Path(config["paths"]["processed_dir"]) / "intermediate"
+        names = sorted({p.stem for suffix in INTERMEDIATE_FORMATS.values()
+                        for p in intermediate_dir.glob(f"*{suffix}")})
+        for name in names:
+            stale = stale_inputs(config, name, catalog)
+            if verbose:
+                state = "no input metadata" if stale is None else (
+                    f"STALE ({', '.join(stale)})" if stale else "fresh")
+                print(f"  {name}: {state}")
+        return catalog
+
+    start = time.perf_counter()
+    catalog = build_catalog(config)
+    path = write_catalog(catalog, config)
+
+    if verbose:
+        print("Input catalog")
+        print("-" * 40)
+        for name, entry in catalog["inputs"].items():
+            rows = f"{entry['rows']:,} rows" if entry["rows"] is not None else "rows n/a"
+            print(f"  {name}: {len(entry['files'])} file(s), {entry['size'] / 1e6:,.1f} MB, {rows}")
+        for name in INPUTS:
+            if name not in catalog["inputs"]:
+                print(f"  {name}: not present")
+        print(f"  Saved: {path} ({time.perf_counter() - start:.2f} s)")
+
+    return catalog
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Build or check the input catalog")
+    parser.add_argument("--check", action="store_true", help="Validate inputs and intermediate freshness")
+    args = parser.parse_args()
+
+    config = load_config()
+    run(config, check=args.check)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
 """Configuration loader for the pipeline."""
 
-import yaml
 from pathlib import Path
 from typing import Any
 
-_CONFIG_CACHE: dict | None = None
+# Resolved config path -> loaded config
+_CONFIG_CACHE: dict[Path, dict] = {}
 
 
 def get_project_root() -> Path:
@@ -26,22 +26,22 @@ def load_config(config_path: Path | str | None = None) -> dict:
 
     Returns:
         Configuration dictionary with paths resolved to absolute paths.
+        Results are cached per config file.
     """
-    global _CONFIG_CACHE
-
-    if _CONFIG_CACHE is not None and config_path is None:
-        return _CONFIG_CACHE
-
     root = get_project_root()
 
     if config_path is None:
         config_path = root / "config.yaml"
-    else:
-        config_path = Path(config_path)
+    config_path = Path(config_path).resolve()
+
+    if config_path in _CONFIG_CACHE:
+        return _CONFIG_CACHE[config_path]
 
     if not config_path.exists():
         raise FileNotFoundError(f"Config file not found: {config_path}")
 
+    import yaml
+
     with open(config_path) as f:
         config = yaml.safe_load(f)
 
@@ -54,8 +54,7 @@ def load_config(config_path: Path | str | None = None) -> dict:
     config["paths"] = paths
     config["_root"] = str(root)
 
-    if config_path is None:
-        _CONFIG_CACHE = config
+    _CONFIG_CACHE[config_path] = config
 
     return config
 
@@ -77,6 +76,121 @@ def get_path(config: dict, *keys: str) -> Path:
     return Path(value)
 
 
+def get_hierarchy_prefixes(config: dict) -> list[str]:
+    """
+    Get the MeSH hierarchy prefixes the pipeline builds outputs for.
+
+    Uses mesh.hierarchies if set, otherwise falls back to pipeline.site_only
+    (C04.588 site hierarchy, or the full C04 branch).
+    """
+    mesh = config.get("mesh", {})
+    prefixes = mesh.get("hierarchies")
+    if prefixes:
+        return list(dict.fromkeys(prefixes))
+
+    if config.get("pipeline", {}).get("site_only", True):
+        return [mesh.get("site_prefix", "C04.588")]
+    return [mesh.get("neoplasm_prefix", "C04")]
+
+
+def hierarchy_suffix(prefixes: list[str], prefix: str) -> str:
+    """
+    Get the output file suffix for a hierarchy.
+
+    The first (primary) hierarchy keeps the unsuffixed file names; the others
+    get e.g. "_c04_557".
+    """
+    if prefix == prefixes[0]:
+        return ""
+    return "_" + prefix.replace(".", "_").lower()
+
+
+def get_therapeutic_areas(config: dict) -> list[dict]:
+    """
+    Get the therapeutic areas to build outputs for.
+
+    opentargets.therapeutic_areas is a list of {id, name, hierarchies}. When
+    it is unset, the single cancer area (opentargets.cancer_therapeutic_area)
+    is used. The first (primary) area uses mesh.hierarchies
+    (get_hierarchy_prefixes), which every downstream stage reads; every
+    other area must list its own MeSH branches (e.g. [C14]).
+
+    Returns:
+        List of {"id", "name", "hierarchies"} dicts, the primary area first
+    """
+    opentargets = config.get("opentargets", {})
+    areas = opentargets.get("therapeutic_areas")
+    if not areas:
+        return [{
+            "id": opentargets.get("cancer_therapeutic_area", "EFO_0000616"),
+            "name": "cancer",
+            "hierarchies": get_hierarchy_prefixes(config),
+        }]
+
+    if len(areas) > 64:
+        raise ValueError(f"At most 64 therapeutic areas are supported, got {len(areas)}")
+    result = []
+    for i, area in enumerate(areas):
+        if "id" not in area or "name" not in area:
+            raise ValueError(f"Therapeutic area needs an id and a name: {area}")
+        hierarchies = area.get("hierarchies")
+        if i == 0:
+            if hierarchies and list(dict.fromkeys(hierarchies)) != get_hierarchy_prefixes(config):
+                raise ValueError(f"Set the primary area's hierarchies ({area['name']}) in mesh.hierarchies")
+            hierarchies = get_hierarchy_prefixes(config)
+        if not hierarchies:
+            raise ValueError(f"Therapeutic area {area['name']} needs MeSH hierarchies (e.g. [C14])")
+        result.append({"id": area["id"], "name": area["name"], "hierarchies": list(dict.fromkeys(hierarchies))})
+
+    names = [a["name"] for a in result]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Therapeutic area names must be unique: {', '.join(names)}")
+    return result
+
+
+def area_suffix(areas: list[dict], name: str) -> str:
+    """
+    Get the output file suffix for a therapeutic area.
+
+    The first (primary) area keeps the unsuffixed file names; the others get
+    "_<name>" (after any association type suffix, before the hierarchy one).
+    """
+    if name == areas[0]["name"]:
+        return ""
+    return "_" + name.lower()
+
+
+# Open Targets association datasets, by pipeline.association_type
+ASSOCIATION_DATASETS = {
+    "direct": "association_overall_direct",
+    "indirect": "association_by_overall_indirect",
+}
+
+
+def get_association_types(config: dict) -> list[str]:
+    """
+    Get the association types to build outputs for.
+
+    pipeline.association_type is "direct" (default), "indirect" or "both".
+    """
+    value = config.get("pipeline", {}).get("association_type", "direct")
+    types = list(ASSOCIATION_DATASETS) if value == "both" else [value]
+    unknown = [t for t in types if t not in ASSOCIATION_DATASETS]
+    if unknown:
+        raise ValueError(f"Unknown association_type: {value!r} (expected direct, indirect or both)")
+    return types
+
+
+def association_suffix(assoc_type: str) -> str:
+    """
+    Get the output file suffix for an association type.
+
+    Direct associations keep the unsuffixed file names; indirect outputs
+    get "_indirect" (before any hierarchy suffix).
+    """
+    return "" if assoc_type == "direct" else f"_{assoc_type}"
+
+
 def ensure_dir(path: Path) -> Path:
     """Ensure directory exists, creating if necessary."""
     path.mkdir(parents=True, exist_ok=True)
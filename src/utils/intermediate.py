@@ -0,0 +1,154 @@
+"""Read/write helpers for the pipeline's intermediate/ artifacts."""
+
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from src.utils.config import ensure_dir
+
+# Supported on-disk formats for intermediate/ files, keyed by file suffix
+INTERMEDIATE_FORMATS = {
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+}
+
+
+def get_intermediate_format(config: dict) -> str:
+    """Get the configured intermediate format (parquet or arrow)."""
+    fmt = config.get("pipeline", {}).get("intermediate_format", "parquet")
+    if fmt not in INTERMEDIATE_FORMATS:
+        raise ValueError(
+            f"Unknown intermediate_format: {fmt!r} "
+            f"(expected one of {', '.join(INTERMEDIATE_FORMATS)})"
+        )
+    return fmt
+
+
+def intermediate_path(config: dict, name: str, fmt: str | None = None) -> Path:
+    """
+    Get the path of an intermediate artifact.
+
+    Args:
+        config: Configuration dict
+        name: Artifact name without suffix (e.g. "gene_mesh_pre_entrez")
+        fmt: Format to use (defaults to the configured format)
+
+    Returns:
+        Path inside processed_dir/intermediate
+    """
+    fmt = fmt or get_intermediate_format(config)
+    intermediate_dir = Path(config["paths"]["processed_dir"]) / "intermediate"
+    return intermediate_dir / f"{name}{INTERMEDIATE_FORMATS[fmt]}"
+
+
+def find_intermediate(config: dict, name: str) -> Path | None:
+    """
+    Locate an existing intermediate artifact.
+
+    When both formats exist the most recently written file is used (the
+    configured format on a tie), so a file left over from before a format
+    switch is never read in place of newer output. A file in the other
+    format alone is used too, so switching formats does not force a re-run
+    of upstream steps.
+    """
+    preferred = get_intermediate_format(config)
+    found = [
+        path for path in (intermediate_path(config, name, fmt) for fmt in INTERMEDIATE_FORMATS)
+        if path.exists()
+    ]
+    if not found:
+        return None
+    return max(found, key=lambda path: (path.stat().st_mtime_ns, path.suffix == INTERMEDIATE_FORMATS[preferred]))
+
+
+def write_intermediate(
+    df: pd.DataFrame,
+    config: dict,
+    name: str,
+    metadata: dict | None = None
+) -> Path:
+    """
+    Write an intermediate artifact in the configured format.
+
+    Arrow files are written as uncompressed Feather V2 (Arrow IPC) so they
+    can be memory-mapped on read.
+
+    Args:
+        df: Data to write
+        config: Configuration dict
+        name: Artifact name without suffix
+        metadata: Extra schema key-value metadata (e.g. catalog.output_metadata)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = intermediate_path(config, name)
+    ensure_dir(path.parent)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+
+    if path.suffix == ".arrow":
+        feather.write_feather(table, path, compression="uncompressed")
+    else:
+        pq.write_table(table, path)
+
+    return path
+
+
+def read_intermediate_metadata(config: dict, name: str) -> dict | None:
+    """
+    Schema key-value metadata of an intermediate (footer/header only).
+
+    Returns:
+        Dict of bytes -> bytes, or None if the artifact does not exist
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = find_intermediate(config, name)
+    if path is None:
+        return None
+    if path.suffix == ".arrow":
+        with pa.memory_map(str(path)) as source:
+            schema = pa.ipc.open_file(source).schema
+    else:
+        schema = pq.read_schema(path)
+    return dict(schema.metadata or {})
+
+
+def read_intermediate_table(config: dict, name: str, hint: str = ""):
+    """
+    Load an intermediate artifact as a pyarrow Table.
+
+    Arrow IPC files are memory-mapped, so the returned Table references the
+    OS page cache directly instead of a private copy.
+
+    Args:
+        config: Configuration dict
+        name: Artifact name without suffix
+        hint: Message appended to the error if the artifact is missing
+
+    Returns:
+        pyarrow.Table
+    """
+    import pyarrow.parquet as pq
+
+    path = find_intermediate(config, name)
+    if path is None:
+        missing = intermediate_path(config, name)
+        raise FileNotFoundError(f"{hint}: {missing}" if hint else f"Not found: {missing}")
+
+    if path.suffix == ".arrow":
+        return feather.read_table(path, memory_map=True)
+    return pq.read_table(path)
+
+
+def read_intermediate(config: dict, name: str, hint: str = "") -> pd.DataFrame:
+    """Load an intermediate artifact as a DataFrame (see read_intermediate_table)."""
+    table = read_intermediate_table(config, name, hint)
+    # split_blocks avoids consolidating columns into 2D blocks, which keeps
+    # numeric columns zero-copy views over the memory map
+    return table.to_pandas(split_blocks=True)
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Disk-backed memoization of expensive loaders.
+
+Notebooks and analysis scripts call the same loaders again and again
+(load_associations, load_diseases, parse_mesh_file, load_gene2ensembl).
+Once enable_cache(config) has been called, every @memoize'd loader stores
+its result under paths.cache_dir (default data/cache). Later calls with the
+same key read it back instead of rerunning the loader.
+
+The key is a SHA-256 over:
+- the function: module, qualified name and source code
+- its arguments, as canonical JSON (arguments listed in ignore= are left
+  out, e.g. config when the input files already capture what it selects)
+- the path, size and mtime of each of its input files
+
+A new OT release, MeSH year or gene2ensembl download, or an edit to the
+loader, therefore gives a new key. The stale entries age out.
+
+Entries are Parquet files (<key>.parquet) with a JSON sidecar that
+describes them. A hit touches the entry. When the directory grows past
+cache.max_size_gb, the least recently used entries are evicted first.
+
+Without enable_cache() (the pipeline steps) the loaders run unchanged.
+
+Usage:
+    from src.utils.memo import enable_cache
+    enable_cache(config)                  # in a notebook, before loading
+
+    python -m src cache info
+    python -m src cache clear
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import load_config, ensure_dir
+
+# Default size cap (cache.max_size_gb)
+DEFAULT_MAX_SIZE_GB = 20
+
+
+@dataclass
+class LoaderCache:
+    """Cache directory with a size cap (see module docstring)."""
+
+    root: Path
+    max_bytes: int
+
+    @classmethod
+    def from_config(cls, config: dict) -> "LoaderCache":
+        paths = config["paths"]
+        root = Path(paths.get("cache_dir") or Path(paths["data_dir"]) / "cache")
+        max_gb = config.get("cache", {}).get("max_size_gb", DEFAULT_MAX_SIZE_GB)
+        return cls(root=root, max_bytes=int(max_gb * (1 << 30)))
+
+    def entry_path(self, key: str) -> Path:
+        return self.root / f"{key}.parquet"
+
+    def entries(self) -> list[dict]:
+        """Cached entries (sidecar contents plus size and last use), oldest use first."""
+        entries = []
+        for path in self.root.glob("*.parquet"):
+            sidecar = path.with_suffix(".json")
+            try:
+                stat = path.stat()
+                meta = json.loads(sidecar.read_text()) if sidecar.exists() else {}
+            except (OSError, ValueError):
+                continue
+            meta.update(key=path.stem, size=stat.st_size, last_used=stat.st_mtime)
+            entries.append(meta)
+        return sorted(entries, key=lambda e: e["last_used"])
+
+    def get(self, key: str):
+        """Cached result for key, or None on a miss."""
+        path = self.entry_path(key)
+        try:
+            result = _read_result(path)
+        except (OSError, ValueError):
+            return None
+        # Last use = mtime (atime is often not updated)
+        os.utime(path)
+        return result
+
+    def put(self, key: str, result, meta: dict) -> None:
+        """Store a result, then evict least recently used entries past the cap."""
+        ensure_dir(self.root)
+        path = self.entry_path(key)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        meta = dict(meta, kind=_write_result(result, tmp))
+        size = tmp.stat().st_size
+        if size > self.max_bytes:
+            tmp.unlink()
+            return
+        os.replace(tmp, path)
+        path.with_suffix(".json").write_text(json.dumps(meta, indent=2, default=str))
+        self.evict(keep=key)
+
+    def evict(self, keep: str | None = None) -> list[str]:
+        """Remove least recently used entries until the cache fits max_bytes."""
+        entries = self.entries()
+        total = sum(e["size"] for e in entries)
+        evicted = []
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry["key"] == keep:
+                continue
+            self.remove(entry["key"])
+            total -= entry["size"]
+            evicted.append(entry["key"])
+        return evicted
+
+    def remove(self, key: str) -> None:
+        for path in (self.entry_path(key), self.entry_path(key).with_suffix(".json")):
+            path.unlink(missing_ok=True)
+
+    def clear(self) -> int:
+        """Remove every entry; returns the number removed."""
+        entries = self.entries()
+        for entry in entries:
+            self.remove(entry["key"])
+        return len(entries)
+
+
+# Active cache (enable_cache); None = loaders run uncached
+_CACHE: LoaderCache | None = None
+
+
+def enable_cache(config: dict) -> LoaderCache:
+    """Memoize the @memoize'd loaders to paths.cache_dir from now on."""
+    global _CACHE
+    _CACHE = LoaderCache.from_config(config)
+    return _CACHE
+
+
+def disable_cache() -> None:
+    """Run the loaders uncached again."""
+    global _CACHE
+    _CACHE = None
+
+
+def _write_result(result, path: Path) -> str:
+    """Write a DataFrame or a list of dicts as Parquet; returns its kind."""
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if isinstance(result, pd.DataFrame):
+        result.to_parquet(path)
+        return "frame"
+    if isinstance(result, list) and all(isinstance(r, dict) for r in result):
+        pq.write_table(pa.Table.from_pylist(result), path)
+        return "records"
+    raise TypeError(f"Cannot cache a {type(result).__name__} result (DataFrame or list of dicts only)")
+
+
+def _read_result(path: Path):
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    if table.schema.pandas_metadata is not None:
+        return table.to_pandas()
+    # Records: keys missing from a record were stored as nulls
+    return [{k: v for k, v in row.items() if v is not None} for row in table.to_pylist()]
+
+
+def _canonical(value):
+    """JSON fallback for argument values."""
+    if isinstance(value, (set, frozenset)):
+        return sorted(map(str, value))
+    if isinstance(value, Path):
+        return str(value)
+    return repr(value)
+
+
+def fingerprint(paths) -> list[list]:
+    """
+    (path, size, mtime_ns) of each input file; directories count as all the
+    files below them.
+
+    Raises:
+        FileNotFoundError: if an input does not exist
+    """
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.is_file()))
+        else:
+            files.append(path)
+    prints = []
+    for path in files:
+        stat = path.stat()
+        prints.append([str(path.resolve()), stat.st_size, stat.st_mtime_ns])
+    return prints
+
+
+@functools.lru_cache(maxsize=None)
+def _function_id(func) -> str:
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = ""
+    return f"{func.__module__}.{func.__qualname__}:{hashlib.sha256(source.encode()).hexdigest()}"
+
+
+def memoize(inputs, ignore: tuple[str, ...] = ()):
+    """
+    Decorator: cache a loader's result while a cache is enabled.
+
+    Args:
+        inputs: Called with the loader's arguments (by name); returns the
+            input files or directories whose fingerprints enter the key
+        ignore: Argument names left out of the key
+
+    The loader must return a DataFrame or a list of dicts.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = _CACHE
+            if cache is None:
+                return func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            try:
+                files = fingerprint(inputs(**bound.arguments))
+            except FileNotFoundError:
+                # Let the loader report missing inputs itself
+                return func(*args, **kwargs)
+            arguments = {k: v for k, v in bound.arguments.items() if k not in ignore}
+            payload = json.dumps(
+                {"function": _function_id(func), "arguments": arguments, "inputs": files},
+                sort_keys=True, default=_canonical
+            )
+            key = hashlib.sha256(payload.encode()).hexdigest()
+
+            start = time.perf_counter()
+            result = cache.get(key)
+            if result is not None:
+                print(f"    Using cached: {func.__qualname__} ({key[:12]}, {time.perf_counter() - start:.1f}s)")
+                return result
+
+            result = func(*args, **kwargs)
+            cache.put(key, result, {
+                "function": f"{func.__module__}.{func.__qualname__}",
+                "arguments": json.loads(json.dumps(arguments, default=_canonical))
+                if len(payload) < 10_000 else "(large)",
+                "inputs": len(files),
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "seconds": round(time.perf_counter() - start, 2),
+            })
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def print_cache(config: dict) -> None:
+    """Print the cached entries, most recently used first."""
+    cache = LoaderCache.from_config(config)
+    entries = cache.entries()
+    total = sum(e["size"] for e in entries)
+    print(f"{cache.root}: {len(entries)} entries, {total / 1e6:,.1f} MB (cap {cache.max_bytes / (1 << 30):,.1f} GB)")
+    for entry in reversed(entries):
+        used = datetime.fromtimestamp(entry["last_used"]).isoformat(sep=" ", timespec="seconds")
+        print(f"  {entry['key'][:12]}  {used}  {entry['size'] / 1e6:>9,.1f} MB  {entry.get('function', '?')}")
+
+
+def add_cache_arguments(parser) -> None:
+    """cache subcommands (info, clear)."""
+    actions = parser.add_subparsers(dest="action", required=True, metavar="action")
+    actions.add_parser("info", help="List cached loader results")
+    actions.add_parser("clear", help="Remove all cached loader results")
+
+
+def cache_from_args(args, config: dict) -> None:
+    """Run a parsed cache subcommand."""
+    if args.action == "info":
+        print_cache(config)
+    else:
+        cache = LoaderCache.from_config(config)
+        print(f"Removed {cache.clear()} entries from {cache.root}")
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Disk cache of loader results")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    config = load_config()
+    cache_from_args(args, config)
+
+
+if __name__ == "__main__":
+    main()
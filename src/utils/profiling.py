@@ -0,0 +1,186 @@
+"""Optional per-step profiling (--profile) for pipeline entry points."""
+
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.utils.config import ensure_dir
+
+PROFILE_HELP = "Write cProfile + tracemalloc output to <processed_dir>/profiles/"
+
+
+def add_profile_argument(parser) -> None:
+    """Add the standard --profile flag to an argparse parser."""
+    parser.add_argument("--profile", action="store_true", help=PROFILE_HELP)
+
+
+@contextmanager
+def profile_step(name: str, config: dict, enabled: bool = True, top_n: int = 30):
+    """
+    Profile the enclosed block with cProfile and tracemalloc.
+
+    Writes to <processed_dir>/profiles/:
+    - <name>.prof: cProfile stats (pstats / snakeviz / gprof2dot)
+    - <name>.tracemalloc: tracemalloc snapshot (tracemalloc.Snapshot.load)
+    - <name>_summary.txt: wall time, peak traced memory, top-N functions by
+      cumulative and own time, top-N allocation sites
+
+    Only the current thread is profiled (not thread or process-pool
+    workers; see profile_tasks for the task graph).
+    tracemalloc sees Python and NumPy allocations but not Arrow buffers.
+
+    Args:
+        name: Step name (file prefix)
+        config: Configuration dict
+        enabled: If False, the block runs unprofiled
+        top_n: Entries per table in the summary
+    """
+    if not enabled:
+        yield
+        return
+
+    import cProfile
+    import tracemalloc
+
+    profiles_dir = ensure_dir(Path(config["paths"]["processed_dir"]) / "profiles")
+
+    tracemalloc.start(10)
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _write_profile(profiles_dir, name, [profiler], time.perf_counter() - start, top_n)
+
+
+@contextmanager
+def profile_tasks(name: str, config: dict, tasks: list, enabled: bool = True, top_n: int = 30):
+    """
+    Profile a task graph run on a thread pool (scheduler.run_tasks).
+
+    Up to Python 3.11 cProfile only traces the thread that enables it, so
+    each task gets its own profiler, enabled inside the worker that runs it,
+    and its stats go to <name>_<task>.prof. From 3.12 cProfile runs on
+    sys.monitoring, which traces every thread but allows one active
+    profiler, so a single profiler covers the whole graph. If a task's
+    profiler cannot be enabled anyway, that task is only timed.
+
+    Yields the tasks with wrapped functions. On exit the stats are merged
+    into <name>.prof and <name>_summary.txt (as in profile_step), with the
+    wall time of every task. tracemalloc is process-wide and covers every
+    worker.
+
+    Args:
+        name: File prefix
+        config: Configuration dict
+        tasks: scheduler.Task list
+        enabled: If False, the tasks are yielded unchanged
+        top_n: Entries per table in the summary
+    """
+    if not enabled:
+        yield tasks
+        return
+
+    import cProfile
+    import dataclasses
+    import functools
+    import sys
+    import tracemalloc
+
+    profiles_dir = ensure_dir(Path(config["paths"]["processed_dir"]) / "profiles")
+    per_task = sys.version_info < (3, 12)
+    profilers, timings = [], {}
+
+    def wrap(task):
+        @functools.wraps(task.fn)
+        def fn(**kwargs):
+            profiler = cProfile.Profile() if per_task else None
+            if profiler is not None:
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # Another profiler is active (sys.monitoring allows one)
+                    profiler = None
+            start = time.perf_counter()
+            try:
+                return task.fn(**kwargs)
+            finally:
+                timings[task.name] = time.perf_counter() - start
+                if profiler is not None:
+                    profiler.disable()
+                    profilers.append(profiler)
+                    profiler.dump_stats(profiles_dir / f"{name}_{task.name}.prof")
+        return dataclasses.replace(task, fn=fn)
+
+    graph_profiler = None if per_task else cProfile.Profile()
+    tracemalloc.start(10)
+    start = time.perf_counter()
+    if graph_profiler is not None:
+        try:
+            graph_profiler.enable()
+        except ValueError:
+            graph_profiler = None
+    try:
+        yield [wrap(task) for task in tasks]
+    finally:
+        if graph_profiler is not None:
+            graph_profiler.disable()
+            profilers.append(graph_profiler)
+        _write_profile(profiles_dir, name, profilers, time.perf_counter() - start, top_n, timings)
+
+
+def _write_profile(
+    profiles_dir: Path,
+    name: str,
+    profilers: list,
+    elapsed: float,
+    top_n: int,
+    timings: dict[str, float] | None = None
+) -> None:
+    """Stop tracemalloc and write <name>.prof, .tracemalloc and _summary.txt."""
+    import io
+    import pstats
+    import tracemalloc
+
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    snapshot.dump(str(profiles_dir / f"{name}.tracemalloc"))
+    lines = [
+        f"Profile: {name}",
+        f"Wall time: {elapsed:.2f} s",
+        f"Traced memory: {current / 1e6:.1f} MB at end, {peak / 1e6:.1f} MB peak",
+    ]
+    if len(profilers) > 1:
+        lines.append(f"Tasks profiled: {len(profilers)} (per-task stats in {name}_<task>.prof)")
+    if timings:
+        lines.append("\n## Task wall times\n")
+        for task, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+            lines.append(f"{seconds:>10.2f} s  {task}")
+    if profilers:
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        stats.dump_stats(profiles_dir / f"{name}.prof")
+
+        for sort_key in ("cumulative", "tottime"):
+            buf = io.StringIO()
+            stats.stream = buf
+            stats.strip_dirs().sort_stats(sort_key).print_stats(top_n)
+            lines.append(f"\n## Top {top_n} functions by {sort_key} time\n")
+            lines.append(buf.getvalue().strip())
+
+    lines.append(f"\n## Top {top_n} allocation sites (live at end of step)\n")
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    for stat in snapshot.statistics("lineno")[:top_n]:
+        lines.append(f"{stat.size / 1e6:>10.2f} MB {stat.count:>9,} blocks  {stat.traceback}")
+
+    summary_path = profiles_dir / f"{name}_summary.txt"
+    summary_path.write_text("\n".join(lines) + "\n")
+    print(f"  Profile: {summary_path}")
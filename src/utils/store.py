@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Versioned, content-addressed store for pipeline outputs.
+
+Each commit records one version of the outputs in processed_dir (the
+store.include patterns) with the Open Targets release, the MeSH year and a
+hash of the configuration. Files are split into chunks that are named by the
+SHA-256 of their content and stored once, zlib-compressed:
+
+    <store_dir>/chunks/ab/abcdef...     chunk bytes
+    <store_dir>/versions/<id>.json      manifest: run metadata, file → chunk list
+
+Text outputs (TSV/CSV/JSON) are cut after lines whose own hash matches a
+mask (content-defined chunking). A row added or changed between releases
+only changes the chunk it falls in. The sorted final TSVs of consecutive
+releases therefore share most of their chunks. Other files are cut into
+fixed-size blocks.
+
+The store lives outside processed_dir (paths.store_dir, default
+data/store), so `make clean` leaves it alone. Checkout rebuilds any
+version from its manifest and skips files that already have the right
+content.
+
+Usage:
+    python -m src store commit -m "25.12 rerun"
+    python -m src store list
+    python -m src store checkout 25.12 --output /tmp/ot_25_12
+"""
+
+import hashlib
+import json
+import os
+import re
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from src.utils.config import load_config, ensure_dir
+from src.utils.catalog import INPUTS, input_path
+
+# Outputs committed when store.include is not set (relative to processed_dir)
+DEFAULT_INCLUDE = ["*.tsv", "crosswalks/*.csv", "summaries/*.csv"]
+
+TEXT_SUFFIXES = {".tsv", ".csv", ".json", ".txt"}
+
+# Content-defined chunking of text files: a line ends a chunk when the low
+# CHUNK_MASK bits of its CRC-32 are zero (about one line in 256), within
+# MIN_CHUNK..MAX_CHUNK bytes
+CHUNK_MASK = (1 << 8) - 1
+MIN_CHUNK = 4 << 10
+MAX_CHUNK = 1 << 20
+
+# Fixed block size for other files
+BLOCK_SIZE = 1 << 20
+
+
+def store_dir(config: dict) -> Path:
+    """Root of the store (paths.store_dir, default <data_dir>/store)."""
+    paths = config["paths"]
+    return Path(paths.get("store_dir") or Path(paths["data_dir"]) / "store")
+
+
+def config_hash(config: dict) -> str:
+    """SHA-256 of the configuration, without machine-specific paths."""
+    settings = {k: v for k, v in config.items() if k != "paths" and not k.startswith("_")}
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def mesh_file(config: dict) -> Path | None:
+    """The MeSH descriptor file the pipeline reads, symlinks resolved (None if missing)."""
+    path = input_path(config, INPUTS["mesh"])
+    return path.resolve() if path.exists() else None
+
+
+def mesh_year(config: dict) -> str | None:
+    """MeSH release year of the resolved descriptor file (d2026.bin → 2026)."""
+    path = mesh_file(config)
+    match = re.fullmatch(r"d(\d{4})\.bin", path.name) if path is not None else None
+    return match.group(1) if match else None
+
+
+def chunk_boundaries(data: bytes, text: bool):
+    """
+    End offsets of the chunks of a file.
+
+    Args:
+        data: File content
+        text: Cut at content-defined line boundaries (else fixed blocks)
+
+    Returns:
+        Increasing int64 offsets, the last one len(data)
+    """
+    import numpy as np
+
+    size = len(data)
+    if not text:
+        return np.append(np.arange(BLOCK_SIZE, size, BLOCK_SIZE), size).astype("int64")
+    if size <= MIN_CHUNK:
+        return np.array([size], dtype="int64")
+
+    lines = data.split(b"\n")
+    ends = np.minimum(np.cumsum(np.fromiter(map(len, lines), dtype="int64", count=len(lines)) + 1), size)
+    hashes = np.fromiter(map(zlib.crc32, lines), dtype="uint32", count=len(lines))
+    candidates = ends[(hashes & CHUNK_MASK) == 0]
+
+    cuts, start = [], 0
+    for cut in np.append(candidates, size):
+        # Over-long stretches without a candidate end at the last line that fits
+        while cut - start > MAX_CHUNK:
+            forced = ends[np.searchsorted(ends, start + MAX_CHUNK, side="right") - 1]
+            forced = forced if forced > start else start + MAX_CHUNK
+            cuts.append(forced)
+            start = forced
+        if cut - start >= MIN_CHUNK or cut == size:
+            if cut > start:
+                cuts.append(cut)
+            start = cut
+    return np.array(cuts, dtype="int64")
+
+
+def _chunk_path(root: Path, digest: str) -> Path:
+    return root / "chunks" / digest[:2] / digest
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write via a temporary file so readers never see a partial file."""
+    ensure_dir(path.parent)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def add_file(root: Path, path: Path) -> tuple[dict, int]:
+    """
+    Store a file's chunks.
+
+    Returns:
+        (manifest entry {size, sha256, chunks}, bytes of new chunks written)
+    """
+    data = path.read_bytes()
+    chunks, written, start = [], 0, 0
+    for end in chunk_boundaries(data, path.suffix.lower() in TEXT_SUFFIXES):
+        chunk = data[start:end]
+        digest = hashlib.sha256(chunk).hexdigest()
+        chunk_path = _chunk_path(root, digest)
+        if not chunk_path.exists():
+            compressed = zlib.compress(chunk, 6)
+            _write_atomic(chunk_path, compressed)
+            written += len(compressed)
+        chunks.append(digest)
+        start = end
+    return {"size": len(data), "sha256": hashlib.sha256(data).hexdigest(), "chunks": chunks}, written
+
+
+def output_files(config: dict) -> list[Path]:
+    """Outputs in processed_dir matching store.include (relative, sorted)."""
+    processed_dir = Path(config["paths"]["processed_dir"])
+    patterns = config.get("store", {}).get("include") or DEFAULT_INCLUDE
+    files = set()
+    for pattern in patterns:
+        files.update(p.relative_to(processed_dir) for p in processed_dir.glob(pattern) if p.is_file())
+    return sorted(files)
+
+
+def commit(config: dict, message: str | None = None, verbose: bool = True) -> dict:
+    """
+    Record the current outputs as a version.
+
+    The version ID is a hash of the run metadata and file contents, so
+    committing unchanged outputs again returns the existing version.
+
+    Args:
+        config: Configuration dict
+        message: Free-text note stored in the manifest
+        verbose: Print progress messages
+
+    Returns:
+        Version manifest
+    """
+    root = store_dir(config)
+    processed_dir = Path(config["paths"]["processed_dir"])
+    files = output_files(config)
+    if not files:
+        raise FileNotFoundError(f"No outputs to commit in {processed_dir}. Run the pipeline first")
+
+    if verbose:
+        print(f"  Storing {len(files)} files from {processed_dir}...")
+    entries, written = {}, 0
+    for rel in files:
+        entries[rel.as_posix()], new_bytes = add_file(root, processed_dir / rel)
+        written += new_bytes
+
+    mesh_path = mesh_file(config)
+    manifest = {
+        "ot_release": str(config.get("opentargets", {}).get("version")),
+        "mesh_year": mesh_year(config),
+        "mesh_file": mesh_path.name if mesh_path is not None else None,
+        "config_hash": config_hash(config),
+        "files": entries,
+    }
+    version = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:12]
+    manifest_path = root / "versions" / f"{version}.json"
+
+    if manifest_path.exists():
+        if verbose:
+            print(f"  Unchanged: version {version} already stored")
+        return json.loads(manifest_path.read_text())
+
+    created = datetime.now().isoformat(timespec="milliseconds")
+    manifest = {"id": version, "created": created, "message": message, **manifest}
+    # Manifest last: a version only exists once all of its chunks do
+    _write_atomic(manifest_path, (json.dumps(manifest, indent=2) + "\n").encode())
+
+    if verbose:
+        total = sum(e["size"] for e in entries.values())
+        print(f"  Version {version}: OT {manifest['ot_release']}, MeSH {manifest['mesh_year']}, "
+              f"config {manifest['config_hash'][:8]}")
+        print(f"    {total:,} bytes of outputs, {written:,} bytes of new chunks")
+    return manifest
+
+
+def list_versions(config: dict) -> list[dict]:
+    """All version manifests, oldest first."""
+    versions_dir = store_dir(config) / "versions"
+    manifests = [json.loads(p.read_text()) for p in versions_dir.glob("*.json")] if versions_dir.is_dir() else []
+    return sorted(manifests, key=lambda m: (m["created"], m["id"]))
+
+
+def resolve_version(config: dict, ref: str) -> dict:
+    """
+    Find a version by ID, unique ID prefix, or OT release (latest wins).
+
+    Raises:
+        ValueError: if ref matches no version or an ambiguous ID prefix
+    """
+    versions = list_versions(config)
+    by_id = [m for m in versions if m["id"].startswith(ref)]
+    if len(by_id) == 1:
+        return by_id[0]
+    if len(by_id) > 1:
+        raise ValueError(f"Ambiguous version {ref}: {', '.join(m['id'] for m in by_id)}")
+    by_release = [m for m in versions if m["ot_release"] == ref]
+    if by_release:
+        return by_release[-1]
+    raise ValueError(f"No stored version matches {ref}. See: python -m src store list")
+
+
+def _file_matches(path: Path, entry: dict) -> bool:
+    """Whether path already holds entry's content."""
+    if not path.is_file() or path.stat().st_size != entry["size"]:
+        return False
+    return hashlib.sha256(path.read_bytes()).hexdigest() == entry["sha256"]
+
+
+def checkout(config: dict, ref: str, output_dir: Path | None = None, verbose: bool = True) -> Path:
+    """
+    Restore a version's files.
+
+    Args:
+        config: Configuration dict
+        ref: Version ID (or prefix) or OT release
+        output_dir: Target directory (default: processed_dir)
+        verbose: Print progress messages
+
+    Returns:
+        The target directory
+    """
+    root = store_dir(config)
+    manifest = resolve_version(config, ref)
+    output_dir = ensure_dir(Path(output_dir or config["paths"]["processed_dir"]))
+
+    restored = 0
+    for rel, entry in manifest["files"].items():
+        path = output_dir / rel
+        if _file_matches(path, entry):
+            continue
+        data = b"".join(zlib.decompress(_chunk_path(root, digest).read_bytes()) for digest in entry["chunks"])
+        if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            raise ValueError(f"Store is corrupt: {rel} of version {manifest['id']} does not match its checksum")
+        _write_atomic(path, data)
+        restored += 1
+
+    if verbose:
+        print(f"  Version {manifest['id']} (OT {manifest['ot_release']}, MeSH {manifest['mesh_year']}) → {output_dir}")
+        print(f"    {restored} files restored, {len(manifest['files']) - restored} already up to date")
+    return output_dir
+
+
+def print_versions(config: dict) -> None:
+    """Table of stored versions and the space saved by deduplication."""
+    versions = list_versions(config)
+    if not versions:
+        print(f"No versions stored in {store_dir(config)}")
+        return
+
+    print(f"{'version':<14}{'created':<21}{'OT':<8}{'MeSH':<6}{'config':<10}{'files':>6}{'bytes':>15}  message")
+    logical = 0
+    for m in versions:
+        size = sum(e["size"] for e in m["files"].values())
+        logical += size
+        print(f"{m['id']:<14}{m['created'][:19]:<21}{m['ot_release']:<8}{str(m['mesh_year']):<6}"
+              f"{m['config_hash'][:8]:<10}{len(m['files']):>6}{size:>15,}  {m.get('message') or ''}")
+
+    stored = sum(p.stat().st_size for p in (store_dir(config) / "chunks").glob("*/*"))
+    print(f"\n{len(versions)} versions, {logical:,} bytes of outputs in {stored:,} bytes of chunks")
+
+
+def add_store_arguments(parser) -> None:
+    """store subcommands (commit, list, checkout)."""
+    actions = parser.add_subparsers(dest="action", required=True, metavar="action")
+    commit_parser = actions.add_parser("commit", help="Record the current outputs as a version")
+    commit_parser.add_argument("-m", "--message", default=None, help="Note stored with the version")
+    actions.add_parser("list", help="List stored versions")
+    checkout_parser = actions.add_parser("checkout", help="Restore a version's outputs")
+    checkout_parser.add_argument("version", help="Version ID (or prefix) or OT release")
+    checkout_parser.add_argument("-o", "--output", default=None, help="Target directory (default: processed_dir)")
+
+
+def store_from_args(args, config: dict) -> None:
+    """Run a parsed store subcommand."""
+    verbose = not getattr(args, "quiet", False)
+    if args.action == "commit":
+        commit(config, args.message, verbose)
+    elif args.action == "list":
+        print_versions(config)
+    else:
+        checkout(config, args.version, Path(args.output) if args.output else None, verbose)
+
+
+def main():
+    """CLI entry point."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Versioned store for pipeline outputs")
+    add_store_arguments(parser)
+    args = parser.parse_args()
+
+    config = load_config()
+    store_from_args(args, config)
+
+
+if __name__ == "__main__":
+    main()